@@ -0,0 +1,252 @@
+"""Content negotiated compression of API responses
+
+``CompressionMiddleware`` (see ``app.middleware``) picks the encoding of a
+response from the client's ``Accept-Encoding``: zstd, then Brotli, then
+gzip when the client accepts them equally. zstd and Brotli are offered
+when the zstandard and brotli packages are installed. Streamed responses
+are compressed chunk by chunk as they are sent. Each encoding counts the
+bytes it took in and sent out and the CPU time it spent, for
+``/metrics`` and the diagnostics.
+"""
+
+import threading
+import time
+import zlib
+from collections import Counter
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# Content types that are compressed already
+COMPRESSED_CONTENT_TYPES = {
+    'application/gzip',
+    'application/zip',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+class Gzip:
+    """gzip at ``COMPRESSION_GZIP_LEVEL``"""
+    name = 'gzip'
+
+    def __init__(self, level):
+        self.level = level
+
+    def compressor(self):
+        """Return an object with ``compress(chunk)`` and ``flush()``"""
+        # wbits 31 writes the gzip header and trailer
+        return zlib.compressobj(self.level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        """Return ``data`` compressed"""
+        compressor = self.compressor()
+        return compressor.compress(data) + compressor.flush()
+
+
+class _BrotliCompressor:
+    """``brotli.Compressor`` with the zlib compressor interface"""
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        """Return the compressed output ready so far"""
+        return self._compressor.process(data)
+
+    def flush(self):
+        """Return the rest of the compressed output"""
+        return self._compressor.finish()
+
+
+class Brotli:
+    """Brotli at ``COMPRESSION_BROTLI_LEVEL``"""
+    name = 'br'
+
+    def __init__(self, level):
+        self.level = level
+
+    def compressor(self):
+        """Return an object with ``compress(chunk)`` and ``flush()``"""
+        return _BrotliCompressor(self.level)
+
+    def compress(self, data):
+        """Return ``data`` compressed"""
+        return brotli.compress(data, quality=self.level)
+
+
+class Zstd:
+    """zstd at ``COMPRESSION_ZSTD_LEVEL``"""
+    name = 'zstd'
+
+    def __init__(self, level):
+        self.level = level
+
+    def compressor(self):
+        """Return an object with ``compress(chunk)`` and ``flush()``"""
+        return zstandard.ZstdCompressor(level=self.level).compressobj()
+
+    def compress(self, data):
+        """Return ``data`` compressed"""
+        return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+
+def available_codecs():
+    """Return the installed encodings, most preferred first"""
+    codecs = []
+    if zstandard is not None:
+        codecs.append(Zstd(settings.COMPRESSION_ZSTD_LEVEL))
+    if brotli is not None:
+        codecs.append(Brotli(settings.COMPRESSION_BROTLI_LEVEL))
+    codecs.append(Gzip(settings.COMPRESSION_GZIP_LEVEL))
+
+    return codecs
+
+
+def parse_accept_encoding(header):
+    """Return the quality of each coding in an ``Accept-Encoding``"""
+    qualities = {}
+    for part in header.split(','):
+        coding, *params = [item.strip() for item in part.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+
+    return qualities
+
+
+def negotiate(header, codecs):
+    """Return the codec to encode a response in, None to send it as is
+
+    The codec the client gives the highest quality wins, ties go to the
+    order of ``codecs``. ``*`` stands for every coding not listed.
+    """
+    qualities = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for codec in codecs:
+        quality = qualities.get(codec.name, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = codec, quality
+
+    return best
+
+
+class CompressionStats:
+    """Bytes in, bytes out and CPU time of each encoding in this worker"""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, encoding, size, compressed, cpu):
+        """Count a compressed response"""
+        with self._lock:
+            counts = self._counts.setdefault(encoding, Counter())
+            counts['responses'] += 1
+            counts['input_bytes'] += size
+            counts['output_bytes'] += compressed
+            counts['cpu_seconds'] += cpu
+
+    def reset(self):
+        """Zero the counters"""
+        with self._lock:
+            self._counts.clear()
+
+    def snapshot(self):
+        """Return the counters, bytes saved and ratio by encoding"""
+        with self._lock:
+            counts = {
+                encoding: dict(values)
+                for encoding, values in self._counts.items()
+            }
+
+        for values in counts.values():
+            values['saved_bytes'] = (
+                values['input_bytes'] - values['output_bytes']
+            )
+            values['ratio'] = (
+                values['output_bytes'] / values['input_bytes']
+                if values['input_bytes'] else 1.0
+            )
+
+        return counts
+
+    def render(self, prefix='ayushpi_'):
+        """Return the counters in the Prometheus text format"""
+        counts = self.snapshot()
+        series = (
+            ('compressed_responses_total', 'responses',
+             'Responses compressed'),
+            ('compression_input_bytes_total', 'input_bytes',
+             'Response bytes before compression'),
+            ('compression_output_bytes_total', 'output_bytes',
+             'Response bytes after compression'),
+            ('compression_cpu_seconds_total', 'cpu_seconds',
+             'CPU time spent compressing responses'),
+        )
+        lines = []
+        for name, key, help_text in series:
+            name = f'{prefix}{name}'
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for encoding, values in sorted(counts.items()):
+                lines.append(f'{name}{{encoding="{encoding}"}} {values[key]}')
+
+        return '\n'.join(lines) + '\n'
+
+
+compression_stats = CompressionStats()
+
+
+def compress(codec, data):
+    """Return ``data`` compressed with ``codec``, counting it"""
+    start = time.thread_time()
+    compressed = codec.compress(data)
+    compression_stats.record(
+        codec.name, len(data), len(compressed), time.thread_time() - start,
+    )
+
+    return compressed
+
+
+def compress_stream(codec, chunks):
+    """Yield the chunks of a streamed response compressed with ``codec``
+
+    Compressed output is sent as soon as the compressor produces it, and
+    the stream is counted once it is exhausted.
+    """
+    compressor = codec.compressor()
+    size = compressed = 0
+    cpu = 0.0
+    try:
+        for chunk in chunks:
+            start = time.thread_time()
+            data = compressor.compress(chunk)
+            cpu += time.thread_time() - start
+            size += len(chunk)
+            if data:
+                compressed += len(data)
+                yield data
+
+        start = time.thread_time()
+        data = compressor.flush()
+        cpu += time.thread_time() - start
+        compressed += len(data)
+        yield data
+    finally:
+        compression_stats.record(codec.name, size, compressed, cpu)
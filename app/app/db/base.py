@@ -0,0 +1,155 @@
+"""PostgreSQL backend with connection health checks and pooling
+
+Django's backend with two additions, both configured in ``DATABASES``:
+
+- ``CONN_HEALTH_CHECKS``: a connection kept open between requests by
+  ``CONN_MAX_AGE`` is checked with ``SELECT 1`` before its first use in
+  each request, and reopened if the server dropped it, rather than failing
+  the request. Same setting and behaviour as Django 4.1's.
+- ``POOL_SIZE``: when above 0, connections are checked out of a pool
+  shared by the threads of the process (see ``app.db.pool``) and closing
+  one returns it to the pool, so threads reuse connections without each
+  keeping its own. ``POOL_TIMEOUT`` and ``POOL_MAX_LIFETIME`` tune it.
+  Use it with ``CONN_MAX_AGE`` 0, so connections go back after each
+  request.
+"""
+
+import threading
+from collections import Counter
+
+from django.db.backends.postgresql import base
+
+from app.db.pool import ConnectionPool
+
+# Pools by database alias and connection parameters
+_pools = {}
+_pools_lock = threading.Lock()
+
+_health_checks = Counter()
+_health_checks_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict, conn_params):
+    """Return the pool of a database, or None when pooling is off"""
+    if not settings_dict.get('POOL_SIZE'):
+        return None
+
+    key = (alias, repr(sorted(conn_params.items())))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(
+                settings_dict['POOL_SIZE'],
+                timeout=settings_dict.get('POOL_TIMEOUT', 30),
+                max_lifetime=settings_dict.get('POOL_MAX_LIFETIME', 3600),
+                health_checks=settings_dict.get('CONN_HEALTH_CHECKS', False),
+            )
+
+        return _pools[key]
+
+
+def close_pools():
+    """Close the idle connections of every pool and drop the pools"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def pool_stats():
+    """Return the stats of each pool by database alias"""
+    with _pools_lock:
+        pools = list(_pools.items())
+
+    return {alias: pool.stats() for (alias, _), pool in pools}
+
+
+def health_check_stats():
+    """Return how many persistent connections were checked and reopened"""
+    with _health_checks_lock:
+        return {
+            'checks': _health_checks['check'],
+            'failures': _health_checks['failure'],
+        }
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL connection with health checks and optional pooling"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+
+    @property
+    def health_check_enabled(self):
+        """Whether reused connections are checked before use"""
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    def get_new_connection(self, conn_params):
+        """Open a connection, or check one out of the pool"""
+        pool = get_pool(self.alias, self.settings_dict, conn_params)
+        if pool is None:
+            return super().get_new_connection(conn_params)
+
+        connection = pool.getconn(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params,
+            )
+        )
+        # Set by the parent when it opens a connection
+        self.isolation_level = connection.isolation_level
+        return connection
+
+    def _close(self):
+        """Close the connection, or return it to the pool"""
+        pool = None
+        if self.connection is not None:
+            pool = get_pool(
+                self.alias, self.settings_dict, self.get_connection_params(),
+            )
+        if pool is None:
+            return super()._close()
+
+        with self.wrap_database_errors:
+            pool.putconn(self.connection)
+
+    def connect(self):
+        """Connect, a new connection needs no health check"""
+        self.health_check_done = True
+        super().connect()
+
+    def close_if_health_check_failed(self):
+        """Close the connection if it is reused and the server dropped it"""
+        if (self.connection is None or not self.health_check_enabled
+                or self.health_check_done):
+            return
+
+        usable = self.is_usable()
+        with _health_checks_lock:
+            _health_checks['check'] += 1
+            if not usable:
+                _health_checks['failure'] += 1
+        if not usable:
+            self.close()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        """Close the connection at request boundaries if needed, and check
+        it again before its next use"""
+        if self.connection is not None:
+            self.health_check_done = False
+        super().close_if_unusable_or_obsolete()
+
+    def set_autocommit(self, autocommit,
+                       force_begin_transaction_with_broken_autocommit=False):
+        """Set autocommit, on a checked connection"""
+        if not self.in_atomic_block:
+            self.close_if_health_check_failed()
+        super().set_autocommit(
+            autocommit, force_begin_transaction_with_broken_autocommit,
+        )
+
+    def _cursor(self, name=None):
+        """Return a cursor, on a checked connection"""
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
@@ -0,0 +1,167 @@
+"""Connections shared by the threads of a worker process"""
+
+import threading
+import time
+from collections import deque
+
+from psycopg2 import (
+    Error,
+    OperationalError,
+)
+from psycopg2.extensions import (
+    TRANSACTION_STATUS_IDLE,
+    TRANSACTION_STATUS_UNKNOWN,
+)
+
+
+class ConnectionPool:
+    """A bounded pool of psycopg2 connections
+
+    At most ``max_size`` connections exist at once. A thread asking for one
+    while they are all checked out waits up to ``timeout`` seconds. Idle
+    connections older than ``max_lifetime`` seconds, or failing the health
+    check when ``health_checks`` is set, are closed and replaced.
+    """
+
+    def __init__(self, max_size, timeout=30, max_lifetime=3600,
+                 health_checks=True):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_checks = health_checks
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        # Most recently returned last, so a few connections stay warm
+        self._idle = deque()
+        self._created_at = {}
+        self._checked_out = 0
+        self._waiting = 0
+        self._created = 0
+        self._recycled = 0
+
+    def getconn(self, connect):
+        """Check out a connection, opening one with ``connect()`` if none
+        is idle"""
+        with self._lock:
+            self._waiting += 1
+        try:
+            acquired = self._slots.acquire(timeout=self.timeout)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        if not acquired:
+            raise OperationalError(
+                f'No database connection free after {self.timeout}s, '
+                f'all {self.max_size} are in use'
+            )
+
+        try:
+            connection = self._take_idle() or self._open(connect)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._checked_out += 1
+        return connection
+
+    def putconn(self, connection):
+        """Return a checked out connection, closing it if it is broken"""
+        try:
+            reusable = self._reset(connection)
+            with self._lock:
+                self._checked_out -= 1
+                if reusable:
+                    self._idle.append(connection)
+            if not reusable:
+                self._discard(connection)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Close the idle connections"""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for connection in idle:
+            self._discard(connection, recycled=False)
+
+    def stats(self):
+        """Return the pool's size and counters"""
+        with self._lock:
+            return {
+                'max_size': self.max_size,
+                'size': len(self._created_at),
+                'idle': len(self._idle),
+                'checked_out': self._checked_out,
+                'waiting': self._waiting,
+                'created': self._created,
+                'recycled': self._recycled,
+            }
+
+    def _open(self, connect):
+        """Return a new connection"""
+        connection = connect()
+        with self._lock:
+            self._created_at[connection] = time.monotonic()
+            self._created += 1
+
+        return connection
+
+    def _take_idle(self):
+        """Return a usable idle connection, or None"""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection = self._idle.pop()
+                created_at = self._created_at.get(connection, 0)
+
+            if self._usable(connection, created_at):
+                return connection
+            self._discard(connection)
+
+    def _usable(self, connection, created_at):
+        """Return whether an idle connection can be handed out"""
+        if (connection.closed
+                or time.monotonic() - created_at > self.max_lifetime):
+            return False
+        if not self.health_checks:
+            return True
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not connection.autocommit:
+                connection.rollback()
+        except Error:
+            return False
+
+        return True
+
+    def _reset(self, connection):
+        """End any transaction left open, return whether the connection
+        can be reused"""
+        if connection.closed:
+            return False
+
+        status = connection.get_transaction_status()
+        if status == TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except Error:
+                return False
+
+        return True
+
+    def _discard(self, connection, recycled=True):
+        """Close a connection and forget it"""
+        with self._lock:
+            self._created_at.pop(connection, None)
+            if recycled:
+                self._recycled += 1
+        try:
+            connection.close()
+        except Error:
+            pass
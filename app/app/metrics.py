@@ -0,0 +1,267 @@
+"""Request timings and their per-route histograms
+
+``TimingMiddleware`` (see ``app.middleware``) opens a ``RequestTiming``
+for each request. Database queries, building the response data and
+rendering it add their time to it while the request runs, wherever they
+run: Django queries through an execute wrapper installed on every
+connection, the async reads of ``medicine.async_db`` and the renderers
+through ``timed()``, serializers through ``TimedDataMixin`` and the list
+readers through ``timed_serialize()``. The finished
+timing is added to this worker's histograms, labelled by route and
+method, which are rendered in the Prometheus text format for scraping.
+"""
+
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+DURATION_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(9))
+QUANTILES = (0.5, 0.95, 0.99)
+
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """Where the time of one request went"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db = 0.0
+        self.queries = 0
+        self.serialize = 0.0
+        self.render = 0.0
+
+    def elapsed(self):
+        """Return the seconds since the request started"""
+        return time.perf_counter() - self.start
+
+
+@contextmanager
+def request_timing():
+    """Time the wrapped request, yielding its ``RequestTiming``"""
+    timing = RequestTiming()
+    token = _current.set(timing)
+    try:
+        yield timing
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed(part):
+    """Add the time of the wrapped block to ``part`` of the current
+    request's timing, counting a query when ``part`` is ``'db'``"""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(
+            timing, part,
+            getattr(timing, part) + time.perf_counter() - start,
+        )
+        if part == 'db':
+            timing.queries += 1
+
+
+@contextmanager
+def timed_serialize():
+    """Add the time of the wrapped block to the current request's
+    serialization time, less the queries it ran, which count as ``db``"""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+
+    start, db = time.perf_counter(), timing.db
+    try:
+        yield
+    finally:
+        timing.serialize += time.perf_counter() - start - (timing.db - db)
+
+
+class TimedDataMixin:
+    """Time building a serializer's ``data`` as serialization"""
+
+    @property
+    def data(self):
+        with timed_serialize():
+            return super().data
+
+
+def timed_render(render):
+    """Decorate a renderer's ``render()`` to time it"""
+    @functools.wraps(render)
+    def wrapper(*args, **kwargs):
+        with timed('render'):
+            return render(*args, **kwargs)
+
+    return wrapper
+
+
+def _time_query(execute, sql, params, many, context):
+    """Execute wrapper adding the query to the request timing"""
+    with timed('db'):
+        return execute(sql, params, many, context)
+
+
+def instrument(connection, **kwargs):
+    """Time the queries of a database connection"""
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+def instrument_connections():
+    """Time the queries of every connection, present and future"""
+    connection_created.connect(instrument)
+    for connection in connections.all():
+        instrument(connection)
+
+
+class Histogram:
+    """Cumulative bucket counts of observed values"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        """Count one value"""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """Return (upper bound, count of values up to it) per bucket"""
+        total, rows = 0, []
+        for bound, count in zip((*self.buckets, float('inf')), self.counts):
+            total += count
+            rows.append((bound, total))
+
+        return rows
+
+    def quantile(self, q):
+        """Estimate the ``q`` quantile by interpolating in its bucket"""
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        lower = 0
+        for index, (bound, total) in enumerate(self.cumulative()):
+            if total >= rank:
+                if bound == float('inf'):
+                    return self.buckets[-1]
+                below = total - self.counts[index]
+                return lower + (bound - lower) * (
+                    (rank - below) / self.counts[index]
+                )
+            lower = bound
+
+        return self.buckets[-1]
+
+
+class RouteMetrics:
+    """Per route and method histograms of this worker's requests"""
+    series = (
+        ('request_duration_seconds', 'Request wall time',
+         DURATION_BUCKETS),
+        ('request_db_seconds', 'Time spent in database queries',
+         DURATION_BUCKETS),
+        ('request_serialize_seconds',
+         'Time spent building the response data, queries excluded',
+         DURATION_BUCKETS),
+        ('request_render_seconds', 'Time spent rendering the response',
+         DURATION_BUCKETS),
+        ('request_queries', 'Database queries per request', QUERY_BUCKETS),
+        ('response_size_bytes', 'Response body size', SIZE_BUCKETS),
+    )
+
+    def __init__(self, prefix='ayushpi_'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, route, method, timing, elapsed, size):
+        """Add a finished request"""
+        values = (
+            elapsed, timing.db, timing.serialize, timing.render,
+            timing.queries, size,
+        )
+        with self._lock:
+            histograms = self._routes.get((route, method))
+            if histograms is None:
+                histograms = self._routes[(route, method)] = [
+                    Histogram(buckets) for _, _, buckets in self.series
+                ]
+            for histogram, value in zip(histograms, values):
+                histogram.observe(value)
+
+    def reset(self):
+        """Drop every histogram"""
+        with self._lock:
+            self._routes.clear()
+
+    def percentiles(self):
+        """Return the request duration quantiles by (route, method)"""
+        with self._lock:
+            return {
+                key: {q: histograms[0].quantile(q) for q in QUANTILES}
+                for key, histograms in self._routes.items()
+            }
+
+    def render(self):
+        """Return the histograms in the Prometheus text format"""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = []
+            for index, (name, help_text, _) in enumerate(self.series):
+                name = f'{self.prefix}{name}'
+                lines += [
+                    f'# HELP {name} {help_text}',
+                    f'# TYPE {name} histogram',
+                ]
+                for (route, method), histograms in routes:
+                    histogram = histograms[index]
+                    labels = f'route="{route}",method="{method}"'
+                    for bound, total in histogram.cumulative():
+                        le = '+Inf' if bound == float('inf') else bound
+                        lines.append(
+                            f'{name}_bucket{{{labels},le="{le}"}} {total}'
+                        )
+                    lines += [
+                        f'{name}_sum{{{labels}}} {histogram.sum}',
+                        f'{name}_count{{{labels}}} {histogram.count}',
+                    ]
+
+            name = f'{self.prefix}request_duration_quantile_seconds'
+            lines += [
+                f'# HELP {name} Estimated request wall time quantiles',
+                f'# TYPE {name} gauge',
+            ]
+            for (route, method), histograms in routes:
+                for q in QUANTILES:
+                    lines.append(
+                        f'{name}{{route="{route}",method="{method}",'
+                        f'quantile="{q}"}} {histograms[0].quantile(q)}'
+                    )
+
+        return '\n'.join(lines) + '\n'
+
+
+route_metrics = RouteMetrics()
@@ -1,19 +1,263 @@
+import asyncio
+import re
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.module_loading import import_string
+
+from app import (
+    compression,
+    metrics,
+)
+
+
+class CORSMiddleware(MiddlewareMixin):
+    """Answer CORS preflights and add CORS headers to responses
+
+    Goes first in ``MIDDLEWARE``, so preflights (``OPTIONS`` requests with
+    an ``Origin`` and an ``Access-Control-Request-Method``) are answered
+    before any other middleware runs, and other ``OPTIONS`` requests reach
+    their views. Any origin is allowed while ``CORS_ALLOWED_ORIGINS`` is
+    empty; otherwise only the listed ones are, each echoed back with
+    ``Vary: Origin`` so shared caches keep one response per origin.
+    Preflights carry ``Access-Control-Max-Age`` so browsers reuse them for
+    ``CORS_PREFLIGHT_MAX_AGE`` seconds. The headers of each origin are
+    built once, when the middleware is loaded.
+    """
+    # MiddlewareMixin makes the middleware async capable, so async views
+    # are not run in a thread of their own under ASGI
+
+    allow_methods = 'GET, POST, PUT, PATCH, DELETE, OPTIONS'
+    allow_headers = 'Content-Type, Authorization'
 
-class CORSMiddleware:
     def __init__(self, get_response):
-        self.get_response = get_response
+        super().__init__(get_response)
+        origins = settings.CORS_ALLOWED_ORIGINS
+        self.vary = bool(origins)
+        # Headers of every response by allowed origin, None for any
+        self.origin_headers = {
+            origin: {
+                'Access-Control-Allow-Origin': origin or '*',
+                'Access-Control-Allow-Credentials': 'true',
+            }
+            for origin in (origins or [None])
+        }
+        self.preflight_headers = {
+            'Access-Control-Allow-Methods': self.allow_methods,
+            'Access-Control-Allow-Headers': self.allow_headers,
+            'Access-Control-Max-Age': str(settings.CORS_PREFLIGHT_MAX_AGE),
+        }
+
+    def headers_for(self, request):
+        """Return the CORS headers for the request's origin, None if it is
+        not allowed"""
+        if not self.vary:
+            return self.origin_headers[None]
+
+        return self.origin_headers.get(request.META.get('HTTP_ORIGIN'))
+
+    def process_request(self, request):
+        if (request.method != 'OPTIONS'
+                or 'HTTP_ORIGIN' not in request.META
+                or 'HTTP_ACCESS_CONTROL_REQUEST_METHOD' not in request.META):
+            return None
+
+        response = HttpResponse()
+        if self.headers_for(request) is not None:
+            for header, value in self.preflight_headers.items():
+                response[header] = value
+
+        return response
+
+    def process_response(self, request, response):
+        headers = self.headers_for(request)
+        if headers is not None:
+            for header, value in headers.items():
+                response[header] = value
+        if self.vary:
+            patch_vary_headers(response, ['Origin'])
+
+        return response
+
+
+class SiteMiddleware(MiddlewareMixin):
+    """Run ``SITE_MIDDLEWARE`` for every path outside the API
+
+    The API authenticates with tokens and needs no sessions, CSRF or
+    messages, so requests under ``API_PATH_PREFIX`` only go through
+    ``API_MIDDLEWARE`` (slash redirects and ``Content-Length``) while the
+    admin and the rest of the site keep the full stack. The
+    ``process_view`` hooks of either chain (the CSRF check) are run from
+    here, for the paths of that chain only.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.site_response, self.site_view_hooks = self.chain(
+            settings.SITE_MIDDLEWARE, get_response,
+        )
+        self.api_response, self.api_view_hooks = self.chain(
+            settings.API_MIDDLEWARE, get_response,
+        )
+
+        if asyncio.iscoroutinefunction(get_response):
+            # Skipped API requests must not hop to a thread for the hooks
+            self.process_view = self.aprocess_view
+
+    @staticmethod
+    def chain(paths, get_response):
+        """Return the middleware at ``paths`` wrapped around
+        ``get_response`` and their ``process_view`` hooks"""
+        view_hooks = []
+        for path in reversed(paths):
+            middleware = import_string(path)(get_response)
+            for hook in ('process_exception', 'process_template_response'):
+                if hasattr(middleware, hook):
+                    raise ImproperlyConfigured(
+                        f'{path} has {hook}(), which SiteMiddleware does '
+                        'not run. Add it to MIDDLEWARE instead.'
+                    )
+            if hasattr(middleware, 'process_view'):
+                view_hooks.insert(0, middleware.process_view)
+            get_response = middleware
+
+        return get_response, view_hooks
+
+    def is_api(self, request):
+        """Whether the request goes through the lean API stack"""
+        return (settings.LEAN_API_MIDDLEWARE
+                and request.path_info.startswith(settings.API_PATH_PREFIX))
 
     def __call__(self, request):
-        if request.method == 'OPTIONS':
-            response = HttpResponse()
-        else:
+        if self.is_api(request):
+            return self.api_response(request)
+
+        return self.site_response(request)
+
+    def view_hooks(self, request):
+        """Return the ``process_view`` hooks of the request's chain"""
+        if self.is_api(request):
+            return self.api_view_hooks
+
+        return self.site_view_hooks
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        for hook in self.view_hooks(request):
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+
+    async def aprocess_view(self, request, view_func, view_args,
+                            view_kwargs):
+        if not self.view_hooks(request):
+            return None
+
+        return await sync_to_async(SiteMiddleware.process_view)(
+            self, request, view_func, view_args, view_kwargs,
+        )
+
+
+class TimingMiddleware(MiddlewareMixin):
+    """Time each request and report it in a ``Server-Timing`` header
+
+    Records the wall time, database time and query count, serialization
+    and render time and response size of every request into
+    ``app.metrics.route_metrics``, labelled by the resolved view name and
+    method. Goes right after ``CORSMiddleware`` in ``MIDDLEWARE``, so the
+    wall time covers the rest of the stack and leaves out the preflights
+    CORS answers.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        metrics.instrument_connections()
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        with metrics.request_timing() as timing:
             response = self.get_response(request)
+            return self.finish(request, response, timing)
+
+    async def __acall__(self, request):
+        with metrics.request_timing() as timing:
+            response = await self.get_response(request)
+            return self.finish(request, response, timing)
+
+    def finish(self, request, response, timing):
+        """Record the request and add its Server-Timing header"""
+        elapsed = timing.elapsed()
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        size = 0 if response.streaming else len(response.content)
+        metrics.route_metrics.observe(
+            route, request.method, timing, elapsed, size,
+        )
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timing.db * 1000:.1f};desc="{timing.queries} queries"',
+            f'serialize;dur={timing.serialize * 1000:.1f}',
+            f'render;dur={timing.render * 1000:.1f}',
+            f'total;dur={elapsed * 1000:.1f}',
+        ])
+
+        return response
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress API responses in the best encoding the client accepts
+
+    Responses under ``API_PATH_PREFIX`` of at least
+    ``COMPRESSION_MIN_SIZE`` bytes, and every streamed one, are encoded
+    with zstd, Brotli or gzip as negotiated by ``app.compression``.
+    Responses that would not get smaller, or are compressed already, are
+    sent as they are.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.codecs = compression.available_codecs()
+
+    def process_response(self, request, response):
+        if (not settings.COMPRESSION_ENABLED
+                or not request.path_info.startswith(settings.API_PATH_PREFIX)
+                or response.has_header('Content-Encoding')):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0]
+        if content_type in compression.COMPRESSED_CONTENT_TYPES:
+            return response
+        if (not response.streaming
+                and len(response.content) < settings.COMPRESSION_MIN_SIZE):
+            return response
+
+        patch_vary_headers(response, ['Accept-Encoding'])
+        codec = compression.negotiate(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''), self.codecs,
+        )
+        # Async streams (Django 4.2+) are sent as they are
+        if codec is None or getattr(response, 'is_async', False):
+            return response
+
+        if response.streaming:
+            response.streaming_content = compression.compress_stream(
+                codec, response.streaming_content,
+            )
+            del response['Content-Length']
+        else:
+            content = compression.compress(codec, response.content)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
 
-        # Add CORS headers to all responses
-        response["Access-Control-Allow-Origin"] = "*"
-        response["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
-        response["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
-        response["Access-Control-Allow-Credentials"] = "true"
+        # The encoded body is no longer byte for byte the one tagged
+        if response.has_header('ETag'):
+            response['ETag'] = re.sub(r'^"', 'W/"', response['ETag'])
+        response['Content-Encoding'] = codec.name
 
         return response
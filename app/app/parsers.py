@@ -0,0 +1,48 @@
+"""Parsers for the REST API, the counterparts of ``app.renderers``"""
+
+import codecs
+
+import orjson
+
+from django.conf import settings
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import (
+    BaseParser,
+    JSONParser,
+)
+
+from app import renderers
+from app.renderers import msgpack
+
+
+class ORJSONParser(JSONParser):
+    """JSON parser using orjson"""
+    renderer_class = renderers.ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse the incoming bytestream as JSON"""
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        try:
+            data = stream.read()
+            if codecs.lookup(encoding).name != 'utf-8':
+                data = data.decode(encoding)
+            return orjson.loads(data)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackParser(BaseParser):
+    """Parses MessagePack-serialized data"""
+    media_type = 'application/msgpack'
+    renderer_class = renderers.MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse the incoming bytestream as MessagePack"""
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        # Unhashable map keys raise TypeError
+        except (TypeError, ValueError) as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
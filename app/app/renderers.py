@@ -0,0 +1,77 @@
+"""Renderers for the REST API
+
+``ORJSONRenderer`` replaces DRF's ``JSONRenderer`` and encodes with orjson.
+``MessagePackRenderer`` is offered for ``Accept: application/msgpack`` when
+msgpack is installed.
+"""
+
+import orjson
+
+from rest_framework.renderers import (
+    BaseRenderer,
+    JSONRenderer,
+)
+from rest_framework.utils.encoders import JSONEncoder
+
+from app.metrics import timed_render
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+ORJSON_OPTIONS = (
+    # Keep DRF's formatting of datetimes, see _default()
+    orjson.OPT_PASSTHROUGH_DATETIME
+    | orjson.OPT_NON_STR_KEYS
+)
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    """Encode what orjson and msgpack cannot (lazy strings, datetimes,
+    decimals, querysets...) the way DRF's JSON encoder does"""
+    return _encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSON renderer using orjson, with the output of JSONRenderer"""
+
+    @timed_render
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render `data` into compact JSON bytes"""
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        # Indented output is for people (the browsable API), leave it to
+        # the stdlib encoder
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(
+                data, accepted_media_type, renderer_context,
+            )
+
+        ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        # Like JSONRenderer, keep the output a strict JavaScript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+                b'\xe2\x80\xa9', b'\\u2029',
+            )
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renderer which serializes to MessagePack"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    @timed_render
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render `data` into MessagePack bytes"""
+        if data is None:
+            return b''
+
+        return msgpack.packb(data, default=_default, use_bin_type=True)
@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/3.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
+import importlib.util
 import os
 from pathlib import Path
 
@@ -29,10 +30,17 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
-# CORS_ALLOWED_ORIGINS = [
-#     'http://127.0.0.1:5500/',
-#     'https://myapiproxy-d7201751d458.herokuapp.com/' # Allow requests from your frontend domain
-# ]
+# Comma separated origins allowed to call the API from a browser, for
+# example http://127.0.0.1:5500,https://myapiproxy-d7201751d458.herokuapp.com
+# Any origin is allowed when empty
+CORS_ALLOWED_ORIGINS = [
+    origin.strip().rstrip('/')
+    for origin in os.environ.get('CORS_ALLOWED_ORIGINS', '').split(',')
+    if origin.strip()
+]
+# Seconds browsers may reuse a preflight response
+CORS_PREFLIGHT_MAX_AGE = int(os.environ.get('CORS_PREFLIGHT_MAX_AGE', 86400))
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -42,6 +50,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'rest_framework.authtoken',
     'rest_framework',
@@ -52,19 +61,42 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so preflights are answered before any other middleware runs
+    'app.middleware.CORSMiddleware',
+    # Next, so its timings cover the rest of the stack
+    'app.middleware.TimingMiddleware',
+    'app.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
     # 'corsheaders.middleware.CorsMiddleware',
-    'app.middleware.CORSMiddleware',
-    'django.middleware.common.CommonMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Runs SITE_MIDDLEWARE outside API_PATH_PREFIX
+    'app.middleware.SiteMiddleware',
+]
+
+# Middleware the admin and the rest of the site need but the token
+# authenticated API does not
+SITE_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-# CORS_ALLOW_ALL_ORIGINS = True
+# Middleware the API keeps from SITE_MIDDLEWARE: redirects to the URL with
+# a trailing slash and Content-Length
+API_MIDDLEWARE = [
+    'django.middleware.common.CommonMiddleware',
+]
+
+# Requests under API_PATH_PREFIX run API_MIDDLEWARE instead of
+# SITE_MIDDLEWARE, 0 runs SITE_MIDDLEWARE everywhere
+API_PATH_PREFIX = '/api/'
+LEAN_API_MIDDLEWARE = bool(int(os.environ.get('LEAN_API_MIDDLEWARE', 1)))
+
+# The admin checks only look for its middleware in MIDDLEWARE, it is in
+# SITE_MIDDLEWARE
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
 
 ROOT_URLCONF = 'app.urls'
 
@@ -92,15 +124,50 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # Django's PostgreSQL backend plus health checks and pooling
+        'ENGINE': 'app.db',
         'HOST': os.environ.get('DB_HOST'),
         'USER': os.environ.get('DB_USER'),
         'NAME': os.environ.get('DB_NAME'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # Seconds a connection is kept open between requests, checked
+        # with SELECT 1 before it is reused
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': bool(
+            int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1))
+        ),
+        # Connections shared by the threads of a process, 0 turns the
+        # pool off. Set DB_CONN_MAX_AGE=0 with it
+        'POOL_SIZE': int(os.environ.get('DB_POOL_SIZE', 0)),
+        'POOL_TIMEOUT': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'POOL_MAX_LIFETIME': int(
+            os.environ.get('DB_POOL_MAX_LIFETIME', 3600)
+        ),
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Local memory by default, set CACHE_BACKEND and CACHE_LOCATION to share
+# the cache (and catalog versions) between workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Whether every worker sees the same cache, as with Redis or Memcached
+CACHE_SHARED = not CACHES['default']['BACKEND'].endswith(
+    ('.LocMemCache', '.DummyCache'),
+)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -150,4 +217,76 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'app.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'app.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
+
+# MessagePack is negotiated through Accept/Content-Type when msgpack is
+# installed
+if importlib.util.find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append(
+        'app.renderers.MessagePackRenderer',
+    )
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append(
+        'app.parsers.MessagePackParser',
+    )
+
+# Keyset pagination, used when a list request sends `cursor` or `page_size`
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 50))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 500))
+
+# Per-worker symptom -> medicine index answering the `symptoms` filter
+SYMPTOM_INDEX_ENABLED = bool(int(os.environ.get('SYMPTOM_INDEX_ENABLED', 0)))
+SYMPTOM_INDEX_MAX_USERS = int(os.environ.get('SYMPTOM_INDEX_MAX_USERS', 1000))
+
+# Per-user cache of medicine and symptom list/detail responses, on by
+# default only with a shared cache: with a per-process one, the other
+# workers keep serving their copies for RESPONSE_CACHE_TIMEOUT seconds
+# after a write.
+RESPONSE_CACHE_ENABLED = bool(int(
+    os.environ.get('RESPONSE_CACHE_ENABLED', int(CACHE_SHARED))
+))
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 60))
+
+# Largest list accepted by POST /api/medicine/medicines/bulk/
+MEDICINE_BULK_MAX_ITEMS = int(os.environ.get('MEDICINE_BULK_MAX_ITEMS', 1000))
+
+# Medicines read per server-side cursor fetch by the catalog export
+MEDICINE_EXPORT_CHUNK_SIZE = int(
+    os.environ.get('MEDICINE_EXPORT_CHUNK_SIZE', 1000)
+)
+
+# Token -> user cache in front of token authentication, in-process and
+# optionally in the default cache so workers share it. Other workers keep
+# authenticating a deleted token or deactivated user from their in-process
+# copy for up to TOKEN_CACHE_LOCAL_TIMEOUT seconds.
+TOKEN_CACHE_ENABLED = bool(int(os.environ.get('TOKEN_CACHE_ENABLED', 1)))
+TOKEN_CACHE_TIMEOUT = int(os.environ.get('TOKEN_CACHE_TIMEOUT', 30))
+TOKEN_CACHE_LOCAL_TIMEOUT = int(
+    os.environ.get('TOKEN_CACHE_LOCAL_TIMEOUT', 5)
+)
+TOKEN_CACHE_MAX_SIZE = int(os.environ.get('TOKEN_CACHE_MAX_SIZE', 10000))
+TOKEN_CACHE_SHARED = bool(int(os.environ.get('TOKEN_CACHE_SHARED', 0)))
+
+# Connections per ASGI worker for the async read endpoints
+ASYNC_DB_POOL_SIZE = int(os.environ.get('ASYNC_DB_POOL_SIZE', 10))
+
+# Compress API responses of at least COMPRESSION_MIN_SIZE bytes with the
+# best of zstd, Brotli and gzip the client accepts (zstd and Brotli when
+# the zstandard and brotli packages are installed)
+COMPRESSION_ENABLED = bool(int(os.environ.get('COMPRESSION_ENABLED', 1)))
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+# Higher levels compress smaller but cost more CPU per response
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_LEVEL = int(os.environ.get('COMPRESSION_BROTLI_LEVEL', 5))
+COMPRESSION_ZSTD_LEVEL = int(os.environ.get('COMPRESSION_ZSTD_LEVEL', 3))
+
+# Bearer token required to scrape /metrics, open when empty
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
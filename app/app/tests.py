@@ -2,9 +2,81 @@
 Sample test cases
 """
 
-from django.test import SimpleTestCase
+import gzip
+from datetime import (
+    datetime,
+    timezone,
+)
+from decimal import Decimal
+from io import BytesIO
+from unittest import skipUnless
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import (
+    Client,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.http import (
+    HttpResponse,
+    StreamingHttpResponse,
+)
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+
+from rest_framework import status
+from rest_framework.exceptions import (
+    ErrorDetail,
+    ParseError,
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
 
 from app import calc
+from app.compression import (
+    Gzip,
+    brotli,
+    compression_stats,
+    negotiate,
+    zstandard,
+)
+from app.db.base import (
+    DatabaseWrapper,
+    close_pools,
+    health_check_stats,
+    pool_stats,
+)
+from app.db.pool import ConnectionPool
+from app.metrics import (
+    Histogram,
+    request_timing,
+    route_metrics,
+)
+from app.middleware import (
+    CompressionMiddleware,
+    SiteMiddleware,
+)
+from app.parsers import (
+    MessagePackParser,
+    ORJSONParser,
+)
+from app.renderers import (
+    MessagePackRenderer,
+    ORJSONRenderer,
+    msgpack,
+)
+from core.models import Medicine
+from medicine.serializers import MedicineSerializer
+
+MEDICINES_URL = reverse('medicine:medicine-list')
+DIAGNOSTICS_URL = reverse('diagnostics')
+METRICS_URL = reverse('metrics')
 
 class CalcTests(SimpleTestCase):
 
@@ -16,3 +88,677 @@ class CalcTests(SimpleTestCase):
     def test_subtract_numbers(self):
         """Test that values are subtracted and returned"""
         self.assertEqual(calc.subtract(11, 5), 6)
+
+
+class RendererTests(SimpleTestCase):
+    """Test the orjson and MessagePack renderers and parsers"""
+
+    def setUp(self):
+        self.data = {
+            'name': 'Medicine ✓',
+            'dosage': gettext_lazy('Dosage'),
+            'errors': [ErrorDetail('Invalid.', code='invalid')],
+            'created': datetime(2023, 9, 22, 7, 13, 5, 123456,
+                                tzinfo=timezone.utc),
+            'price': Decimal('1.50'),
+            'separator': 'a\u2028b',
+            'symptoms': [{'id': 1, 'name': 'Fever'}],
+            1: None,
+        }
+
+    def test_orjson_matches_json_renderer(self):
+        """Test orjson output is byte-identical to DRF's renderer"""
+        self.assertEqual(
+            ORJSONRenderer().render(self.data),
+            JSONRenderer().render(self.data),
+        )
+
+    def test_orjson_indent(self):
+        """Test indented output is still rendered"""
+        context = {'indent': 4}
+
+        self.assertEqual(
+            ORJSONRenderer().render(self.data, renderer_context=context),
+            JSONRenderer().render(self.data, renderer_context=context),
+        )
+
+    def test_orjson_parser(self):
+        """Test parsing JSON and rejecting invalid documents"""
+        parser = ORJSONParser()
+
+        data = parser.parse(BytesIO('{"name": "✓", "n": [1]}'.encode()))
+
+        self.assertEqual(data, {'name': '✓', 'n': [1]})
+        with self.assertRaises(ParseError):
+            parser.parse(BytesIO(b'{"name": NaN}'))
+
+    @skipUnless(msgpack, 'msgpack is not installed')
+    def test_msgpack_round_trip(self):
+        """Test MessagePack encodes what JSON does"""
+        data = {'name': 'Medicine ✓', 'dosage': gettext_lazy('Dosage')}
+
+        encoded = MessagePackRenderer().render(data)
+
+        self.assertEqual(
+            MessagePackParser().parse(BytesIO(encoded)),
+            {'name': 'Medicine ✓', 'dosage': 'Dosage'},
+        )
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(BytesIO(encoded + b'\xc1'))
+
+
+@skipUnless(msgpack, 'msgpack is not installed')
+class MessagePackAPITests(TestCase):
+    """Test negotiating MessagePack with the API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_msgpack_request_and_response(self):
+        """Test creating and listing medicines as MessagePack"""
+        payload = {
+            'name': 'Sample medicine',
+            'ref_text': 'AFI',
+            'dispensing_size': '200 ml',
+            'dosage': '12 - 24 ml',
+            'precautions': 'NS',
+            'preferred_use': 'Both',
+            'symptoms': [{'name': 'Fever'}],
+        }
+        res = self.client.post(
+            MEDICINES_URL, msgpack.packb(payload),
+            content_type='application/msgpack',
+            HTTP_ACCEPT='application/msgpack',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(res.content)['name'], payload['name'])
+
+        res = self.client.get(MEDICINES_URL, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(msgpack.unpackb(res.content), res.data)
+
+    def test_json_by_default(self):
+        """Test JSON is still served without an Accept header"""
+        res = self.client.get(MEDICINES_URL)
+
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(res.json(), [])
+
+
+def backend_pid(wrapper):
+    """Return the server process ID of a wrapper's connection"""
+    with wrapper.cursor() as cursor:
+        cursor.execute('SELECT pg_backend_pid()')
+        return cursor.fetchone()[0]
+
+
+class DatabaseBackendTests(TestCase):
+    """Test the health checked and pooled database backend"""
+
+    def wrapper(self, **settings):
+        """Return a new connection to the test database"""
+        wrapper = DatabaseWrapper(
+            {**connection.settings_dict, **settings},
+        )
+        self.addCleanup(close_pools)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_dropped_connection_reopened(self):
+        """Test a persistent connection the server dropped is replaced"""
+        wrapper = self.wrapper(CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=True)
+        pid = backend_pid(wrapper)
+        before = health_check_stats()
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+        # A new request starts
+        wrapper.close_if_unusable_or_obsolete()
+
+        self.assertNotEqual(backend_pid(wrapper), pid)
+        after = health_check_stats()
+        self.assertEqual(after['checks'], before['checks'] + 1)
+        self.assertEqual(after['failures'], before['failures'] + 1)
+
+    def test_persistent_connection_reused(self):
+        """Test a healthy persistent connection is kept between requests"""
+        wrapper = self.wrapper(CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=True)
+        pid = backend_pid(wrapper)
+
+        wrapper.close_if_unusable_or_obsolete()
+
+        self.assertEqual(backend_pid(wrapper), pid)
+
+    def test_pooled_connection_shared(self):
+        """Test closing a pooled connection hands it to the next wrapper"""
+        first = self.wrapper(POOL_SIZE=2, CONN_MAX_AGE=0)
+        pid = backend_pid(first)
+        first.close()
+
+        second = self.wrapper(POOL_SIZE=2, CONN_MAX_AGE=0)
+
+        self.assertEqual(backend_pid(second), pid)
+
+    def test_pool_stats(self):
+        """Test the pool counts its connections"""
+        first = self.wrapper(POOL_SIZE=2, CONN_MAX_AGE=0)
+        second = self.wrapper(POOL_SIZE=2, CONN_MAX_AGE=0)
+        backend_pid(first)
+        backend_pid(second)
+        first.close()
+
+        stats = pool_stats()['default']
+
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['idle'], 1)
+        self.assertEqual(stats['checked_out'], 1)
+        self.assertEqual(stats['created'], 2)
+
+
+class ConnectionPoolTests(TestCase):
+    """Test the connection pool"""
+
+    def setUp(self):
+        self.params = connection.get_connection_params()
+        self.pool = ConnectionPool(1, timeout=0.05)
+        self.addCleanup(self.pool.close)
+
+    def connect(self):
+        """Open a raw connection to the test database"""
+        return psycopg2.connect(**self.params)
+
+    def test_timeout_when_exhausted(self):
+        """Test waiting for a connection gives up after the timeout"""
+        conn = self.pool.getconn(self.connect)
+        self.addCleanup(self.pool.putconn, conn)
+
+        with self.assertRaises(psycopg2.OperationalError):
+            self.pool.getconn(self.connect)
+
+    def test_broken_connection_recycled(self):
+        """Test a connection closed while checked out is not reused"""
+        conn = self.pool.getconn(self.connect)
+        conn.close()
+
+        self.pool.putconn(conn)
+        other = self.pool.getconn(self.connect)
+        self.addCleanup(self.pool.putconn, other)
+
+        self.assertIsNot(other, conn)
+
+        stats = self.pool.stats()
+        self.assertEqual(stats['created'], 2)
+        self.assertEqual(stats['recycled'], 1)
+
+    def test_open_transaction_rolled_back(self):
+        """Test a connection is returned to the pool outside a transaction"""
+        conn = self.pool.getconn(self.connect)
+        conn.cursor().execute('SELECT 1')
+
+        self.pool.putconn(conn)
+
+        self.assertEqual(
+            conn.get_transaction_status(), TRANSACTION_STATUS_IDLE,
+        )
+
+
+class DiagnosticsTests(TestCase):
+    """Test the diagnostics endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_admin_required(self):
+        """Test only admins see the diagnostics"""
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123',
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(DIAGNOSTICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_diagnostics(self):
+        """Test the connection and cache stats are reported"""
+        admin = get_user_model().objects.create_superuser(
+            email='admin@example.com', password='test123',
+        )
+        self.client.force_authenticate(admin)
+
+        res = self.client.get(DIAGNOSTICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        database = res.data['databases']['default']
+        self.assertEqual(
+            database['health_checks'],
+            connection.settings_dict['CONN_HEALTH_CHECKS'],
+        )
+        self.assertIn('failures', res.data['health_checks'])
+        self.assertIsInstance(res.data['async_pools'], list)
+        self.assertEqual(
+            set(res.data['caches']),
+            {'responses', 'tokens', 'symptom_index'},
+        )
+
+
+class SiteMiddlewareTests(TestCase):
+    """Test API requests skip the site middleware"""
+
+    def seen_request(self, path):
+        """Return the request a view gets through SiteMiddleware"""
+        seen = []
+
+        def view(request):
+            seen.append(request)
+            return HttpResponse()
+
+        SiteMiddleware(view)(RequestFactory().get(path))
+        return seen[0]
+
+    def test_api_skips_site_middleware(self):
+        """Test API requests get no session or user from the middleware"""
+        request = self.seen_request('/api/medicine/medicines/')
+
+        self.assertFalse(hasattr(request, 'session'))
+        self.assertFalse(hasattr(request, 'user'))
+
+    def test_site_runs_site_middleware(self):
+        """Test other requests go through the full stack"""
+        request = self.seen_request('/admin/login/')
+
+        self.assertTrue(hasattr(request, 'session'))
+        self.assertTrue(hasattr(request, 'user'))
+
+    @override_settings(LEAN_API_MIDDLEWARE=False)
+    def test_lean_stack_disabled(self):
+        """Test the full stack can be kept for the API"""
+        request = self.seen_request('/api/medicine/medicines/')
+
+        self.assertTrue(hasattr(request, 'session'))
+
+    def test_api_slash_redirect(self):
+        """Test API URLs without their trailing slash are redirected"""
+        res = Client().get(MEDICINES_URL.rstrip('/'), {'symptoms': 'Fever'})
+
+        self.assertEqual(res.status_code, status.HTTP_301_MOVED_PERMANENTLY)
+        self.assertEqual(res['Location'], f'{MEDICINES_URL}?symptoms=Fever')
+
+    def test_api_content_length(self):
+        """Test API responses carry their Content-Length"""
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123',
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+
+        res = client.get(MEDICINES_URL)
+
+        self.assertEqual(int(res['Content-Length']), len(res.content))
+
+    def test_admin_csrf_checked(self):
+        """Test the CSRF check still guards the admin"""
+        client = Client(enforce_csrf_checks=True)
+
+        res = client.post(
+            '/admin/login/', {'username': 'a', 'password': 'b'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_api_security_headers(self):
+        """Test API responses keep the CORS and security headers"""
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123',
+        )
+        client = APIClient(enforce_csrf_checks=True)
+        client.force_authenticate(user)
+
+        res = client.get(MEDICINES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Access-Control-Allow-Origin'], '*')
+        self.assertEqual(res['X-Frame-Options'], 'DENY')
+        self.assertEqual(res['X-Content-Type-Options'], 'nosniff')
+        self.assertNotIn('csrftoken', res.cookies)
+
+
+class CORSMiddlewareTests(TestCase):
+    """Test CORS preflights and headers"""
+
+    def preflight(self, origin='http://127.0.0.1:5500'):
+        """Send a CORS preflight for a medicine list GET"""
+        return Client().options(
+            MEDICINES_URL, HTTP_ORIGIN=origin,
+            HTTP_ACCESS_CONTROL_REQUEST_METHOD='GET',
+            HTTP_ACCESS_CONTROL_REQUEST_HEADERS='authorization',
+        )
+
+    def test_preflight_short_circuited(self):
+        """Test preflights are answered before other middleware and views"""
+        with self.assertNumQueries(0):
+            res = self.preflight()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['Access-Control-Allow-Origin'], '*')
+        self.assertIn('PATCH', res['Access-Control-Allow-Methods'])
+        self.assertEqual(
+            res['Access-Control-Allow-Headers'], 'Content-Type, Authorization',
+        )
+        self.assertEqual(res['Access-Control-Max-Age'], '86400')
+        self.assertNotIn('Server-Timing', res)
+        self.assertNotIn('X-Frame-Options', res)
+        self.assertFalse(res.has_header('Vary'))
+
+    @override_settings(CORS_PREFLIGHT_MAX_AGE=600)
+    def test_preflight_max_age(self):
+        """Test the preflight max age can be configured"""
+        self.assertEqual(self.preflight()['Access-Control-Max-Age'], '600')
+
+    def test_options_without_preflight_reaches_view(self):
+        """Test other OPTIONS requests are answered by the view"""
+        res = Client().options(MEDICINES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['Access-Control-Allow-Origin'], '*')
+
+    @override_settings(CORS_ALLOWED_ORIGINS=[
+        'http://127.0.0.1:5500', 'https://app.example.com',
+    ])
+    def test_allowed_origins(self):
+        """Test only allowed origins are echoed back, varying on Origin"""
+        for origin in ('http://127.0.0.1:5500', 'https://app.example.com'):
+            res = self.preflight(origin)
+
+            self.assertEqual(res['Access-Control-Allow-Origin'], origin)
+            self.assertEqual(res['Access-Control-Max-Age'], '86400')
+            self.assertEqual(res['Vary'], 'Origin')
+
+        res = self.preflight('https://evil.example.com')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Access-Control-Allow-Origin', res)
+        self.assertNotIn('Access-Control-Allow-Methods', res)
+        self.assertEqual(res['Vary'], 'Origin')
+
+    @override_settings(CORS_ALLOWED_ORIGINS=['https://app.example.com'])
+    def test_allowed_origin_response_headers(self):
+        """Test responses carry the origin's headers and keep their Vary"""
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123',
+        )
+        client = APIClient(HTTP_ORIGIN='https://app.example.com')
+        client.force_authenticate(user)
+
+        res = client.get(MEDICINES_URL)
+
+        self.assertEqual(
+            res['Access-Control-Allow-Origin'], 'https://app.example.com',
+        )
+        self.assertEqual(res['Access-Control-Allow-Credentials'], 'true')
+        self.assertIn('Origin', res['Vary'])
+        self.assertIn('Accept', res['Vary'])
+        self.assertNotIn('Access-Control-Max-Age', res)
+
+
+class HistogramTests(SimpleTestCase):
+    """Test the request histograms"""
+
+    def test_quantiles_interpolated(self):
+        """Test quantiles are estimated within their bucket"""
+        histogram = Histogram((1, 2, 4))
+        for value in (0.5, 1.5, 1.5, 3):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.quantile(0.5), 1.5)
+        self.assertEqual(histogram.quantile(1), 4)
+        self.assertEqual(
+            histogram.cumulative(),
+            [(1, 1), (2, 3), (4, 4), (float('inf'), 4)],
+        )
+
+    def test_overflow_capped(self):
+        """Test values above the last bucket report its bound"""
+        histogram = Histogram((1, 2))
+        histogram.observe(10)
+
+        self.assertEqual(histogram.quantile(0.99), 2)
+
+
+class TimingMiddlewareTests(TestCase):
+    """Test request timings and the metrics endpoint"""
+
+    def setUp(self):
+        route_metrics.reset()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_header(self):
+        """Test responses report their database, serialization and render
+        time"""
+        Medicine.objects.create(user=self.user, name='Sample medicine')
+
+        res = self.client.get(MEDICINES_URL, {'page_size': 5})
+
+        parts = dict(
+            part.split(';', 1)
+            for part in res['Server-Timing'].split(', ')
+        )
+        self.assertEqual(
+            set(parts), {'db', 'serialize', 'render', 'total'},
+        )
+        self.assertIn('desc="2 queries"', parts['db'])
+
+    def test_serialize_time_excludes_queries(self):
+        """Test building serializer data is timed without its queries"""
+        for i in range(3):
+            Medicine.objects.create(user=self.user, name=f'Medicine {i}')
+
+        with request_timing() as timing:
+            data = MedicineSerializer(
+                Medicine.objects.all(), many=True,
+            ).data
+
+        self.assertEqual(len(data), 3)
+        # The medicines, then the symptoms of each
+        self.assertEqual(timing.queries, 4)
+        self.assertGreater(timing.serialize, 0)
+        self.assertLess(timing.serialize + timing.db, timing.elapsed())
+
+    def test_metrics_per_route(self):
+        """Test the metrics endpoint reports each route and method"""
+        self.client.get(MEDICINES_URL)
+        self.client.get(MEDICINES_URL)
+        self.client.post(MEDICINES_URL, {})
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        body = res.content.decode()
+        self.assertIn(
+            'ayushpi_request_duration_seconds_count'
+            '{route="medicine:medicine-list",method="GET"} 2',
+            body,
+        )
+        self.assertIn(
+            'ayushpi_request_queries_count'
+            '{route="medicine:medicine-list",method="POST"} 1',
+            body,
+        )
+        self.assertIn('quantile="0.99"', body)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        """Test the metrics endpoint can require a bearer token"""
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class NegotiateTests(SimpleTestCase):
+    """Test choosing the encoding of a response"""
+
+    codecs = [Gzip(6)]
+
+    def test_negotiate(self):
+        """Test the accepted coding with the highest quality is chosen"""
+        gzip_codec = self.codecs[0]
+        cases = [
+            ('gzip, deflate', gzip_codec),
+            ('GZIP;q=0.5', gzip_codec),
+            ('*', gzip_codec),
+            ('deflate, *;q=0.1', gzip_codec),
+            ('gzip;q=0, *', None),
+            ('gzip;q=invalid', None),
+            ('identity', None),
+            ('', None),
+        ]
+        for header, expected in cases:
+            self.assertIs(negotiate(header, self.codecs), expected, header)
+
+    def test_ties_go_to_preferred_codec(self):
+        """Test equally accepted codings are picked in codec order"""
+        class Brotli:
+            name = 'br'
+
+        brotli_codec = Brotli()
+        codecs = [brotli_codec, *self.codecs]
+
+        self.assertIs(negotiate('gzip, br', codecs), brotli_codec)
+        self.assertIs(negotiate('gzip, br;q=0.5', codecs), codecs[1])
+
+
+@override_settings(COMPRESSION_ENABLED=True, COMPRESSION_MIN_SIZE=1024)
+class CompressionMiddlewareTests(TestCase):
+    """Test API responses are compressed"""
+
+    def setUp(self):
+        compression_stats.reset()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123',
+        )
+        self.client.force_authenticate(self.user)
+        Medicine.objects.bulk_create(
+            Medicine(
+                user=self.user, name=f'Medicine {i}', ref_text='AFI',
+                precautions='Not to be used during pregnancy',
+            )
+            for i in range(50)
+        )
+
+    def test_large_response_gzipped(self):
+        """Test large API responses are gzipped when accepted"""
+        plain = self.client.get(MEDICINES_URL)
+
+        res = self.client.get(MEDICINES_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertEqual(int(res['Content-Length']), len(res.content))
+        self.assertLess(len(res.content), len(plain.content) / 4)
+        self.assertEqual(gzip.decompress(res.content), plain.content)
+        self.assertNotIn('Content-Encoding', plain)
+        stats = compression_stats.snapshot()['gzip']
+        self.assertEqual(stats['responses'], 1)
+        self.assertEqual(stats['input_bytes'], len(plain.content))
+        self.assertEqual(stats['output_bytes'], len(res.content))
+        self.assertGreater(stats['saved_bytes'], 0)
+
+    def test_small_response_not_compressed(self):
+        """Test responses below the threshold are sent as they are"""
+        res = self.client.get(
+            MEDICINES_URL, {'page_size': 1}, HTTP_ACCEPT_ENCODING='gzip',
+        )
+
+        self.assertNotIn('Content-Encoding', res)
+        self.assertEqual(compression_stats.snapshot(), {})
+
+    @override_settings(COMPRESSION_ENABLED=False)
+    def test_disabled(self):
+        """Test compression can be turned off"""
+        res = self.client.get(MEDICINES_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertNotIn('Content-Encoding', res)
+
+    def test_outside_api_not_compressed(self):
+        """Test only API responses are compressed"""
+        middleware = CompressionMiddleware(
+            lambda request: HttpResponse(b'x' * 4096),
+        )
+        request = RequestFactory().get(
+            '/admin/', HTTP_ACCEPT_ENCODING='gzip',
+        )
+
+        self.assertNotIn('Content-Encoding', middleware(request))
+
+    def test_streaming_response_compressed(self):
+        """Test streamed responses are compressed as they are sent"""
+        chunks = [b'{"name": "Medicine %d"}\n' % i for i in range(1000)]
+        middleware = CompressionMiddleware(
+            lambda request: StreamingHttpResponse(iter(chunks)),
+        )
+        request = RequestFactory().get(
+            MEDICINES_URL, HTTP_ACCEPT_ENCODING='gzip',
+        )
+
+        res = middleware(request)
+        body = b''.join(res.streaming_content)
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', res)
+        self.assertEqual(gzip.decompress(body), b''.join(chunks))
+        stats = compression_stats.snapshot()['gzip']
+        self.assertEqual(stats['input_bytes'], len(b''.join(chunks)))
+        self.assertEqual(stats['output_bytes'], len(body))
+
+    @skipUnless(brotli, 'brotli is not installed')
+    def test_brotli(self):
+        """Test Brotli is preferred to gzip"""
+        plain = self.client.get(MEDICINES_URL)
+
+        res = self.client.get(
+            MEDICINES_URL, HTTP_ACCEPT_ENCODING='gzip, deflate, br',
+        )
+
+        self.assertEqual(res['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(res.content), plain.content)
+
+    @skipUnless(zstandard, 'zstandard is not installed')
+    def test_zstd(self):
+        """Test zstd is preferred to Brotli and gzip"""
+        plain = self.client.get(MEDICINES_URL)
+
+        res = self.client.get(
+            MEDICINES_URL, HTTP_ACCEPT_ENCODING='gzip, br, zstd',
+        )
+
+        self.assertEqual(res['Content-Encoding'], 'zstd')
+        self.assertEqual(
+            zstandard.ZstdDecompressor().decompress(res.content),
+            plain.content,
+        )
+
+    def test_metrics(self):
+        """Test compression counters are exported"""
+        self.client.get(MEDICINES_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertIn(
+            'ayushpi_compressed_responses_total{encoding="gzip"} 1',
+            res.content.decode(),
+        )
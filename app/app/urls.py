@@ -21,6 +21,11 @@ from drf_spectacular.views import (
 from django.contrib import admin
 from django.urls import path, include
 
+from app.views import (
+    DiagnosticsView,
+    metrics,
+)
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
@@ -31,4 +36,10 @@ urlpatterns = [
     ),
     path('api/user/', include('user.urls')),
     path('api/medicine/', include('medicine.urls')),
+    path(
+        'api/diagnostics/',
+        DiagnosticsView.as_view(),
+        name='diagnostics',
+    ),
+    path('metrics', metrics, name='metrics'),
 ]
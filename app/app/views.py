@@ -0,0 +1,99 @@
+"""Views of the app project"""
+
+from drf_spectacular.utils import (
+    extend_schema,
+    OpenApiTypes,
+)
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from app.compression import compression_stats
+from app.db.base import (
+    health_check_stats,
+    pool_stats,
+)
+from app.metrics import route_metrics
+from core.cache import render_cache_stats
+from medicine import async_db
+from medicine.cache import response_cache_stats
+from medicine.symptom_index import symptom_index
+from user.authentication import (
+    CachedTokenAuthentication,
+    token_cache_stats,
+)
+
+
+class DiagnosticsView(APIView):
+    """Report this worker's database connections, caches and response
+    compression"""
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    def get(self, request):
+        """Return the connection pools, cache and compression counters"""
+        pools = pool_stats()
+        databases = {
+            alias: {
+                'conn_max_age': connections[alias].settings_dict[
+                    'CONN_MAX_AGE'
+                ],
+                'health_checks': connections[alias].settings_dict.get(
+                    'CONN_HEALTH_CHECKS', False,
+                ),
+                'pool': pools.get(alias),
+            }
+            for alias in connections
+        }
+
+        return Response({
+            'databases': databases,
+            'health_checks': health_check_stats(),
+            'async_pools': async_db.pool_stats(),
+            'routes': {
+                f'{method} {route}': {
+                    f'p{round(q * 100)}': value
+                    for q, value in quantiles.items()
+                }
+                for (route, method), quantiles in (
+                    route_metrics.percentiles().items()
+                )
+            },
+            'compression': compression_stats.snapshot(),
+            'caches': {
+                'responses': response_cache_stats.snapshot(),
+                'tokens': token_cache_stats.snapshot(),
+                'symptom_index': symptom_index.stats(),
+            },
+        })
+
+
+def metrics(request):
+    """Return this worker's request histograms, compression and cache
+    counters for Prometheus
+
+    When ``METRICS_TOKEN`` is set the scraper must send it as a bearer
+    token.
+    """
+    if settings.METRICS_TOKEN:
+        expected = f'Bearer {settings.METRICS_TOKEN}'
+        if not constant_time_compare(
+                request.META.get('HTTP_AUTHORIZATION', ''), expected):
+            return HttpResponse(status=401)
+
+    return HttpResponse(
+        route_metrics.render()
+        + compression_stats.render()
+        + render_cache_stats({
+            'responses': response_cache_stats,
+            'tokens': token_cache_stats,
+        }),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,53 @@
+"""Helpers shared by the caches of the API"""
+
+import threading
+from collections import Counter
+
+
+class CacheStats:
+    """Hit and miss counters for this worker"""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, outcome):
+        """Count a cache hit or miss"""
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def reset(self):
+        """Zero the counters"""
+        with self._lock:
+            self._counts.clear()
+
+    def snapshot(self):
+        """Return the counters and the hit rate"""
+        with self._lock:
+            hits, misses = self._counts['hit'], self._counts['miss']
+
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+        }
+
+
+def render_cache_stats(caches, prefix='ayushpi_'):
+    """Return the counters of the named caches in the Prometheus text
+    format"""
+    name = f'{prefix}cache_requests_total'
+    lines = [
+        f'# HELP {name} Cache lookups by outcome',
+        f'# TYPE {name} counter',
+    ]
+    for cache_name, stats in sorted(caches.items()):
+        counts = stats.snapshot()
+        for outcome, key in (('hit', 'hits'), ('miss', 'misses')):
+            lines.append(
+                f'{name}{{cache="{cache_name}",outcome="{outcome}"}} '
+                f'{counts[key]}'
+            )
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,114 @@
+"""
+Django command to benchmark the per-request cost of the middleware
+"""
+
+import time
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import path
+
+# The stack every request went through before SITE_MIDDLEWARE
+FULL_MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'app.middleware.CORSMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+PATHS = ['/api/medicine/medicines/', '/admin/login/']
+
+
+def empty_view(request, *args, **kwargs):
+    """Answer without doing any work, so only the middleware is timed"""
+    return HttpResponse()
+
+
+# Requests are routed here rather than to the real views
+urlpatterns = [path(route.lstrip('/'), empty_view) for route in PATHS]
+
+
+def build_handler(middleware):
+    """Return a request handler running the given middleware"""
+    with override_settings(MIDDLEWARE=middleware):
+        handler = BaseHandler()
+        handler.load_middleware()
+
+    return handler
+
+
+class Command(BaseCommand):
+    """Django command to time requests through each middleware stack"""
+    help = (
+        'Send requests to an empty view through the full and the lean '
+        'middleware stacks and report the overhead of each per request.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=2000,
+            help='Requests per stack and path',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Runs per stack and path, the fastest is reported',
+        )
+
+    def time_requests(self, handler, route, count, repeat):
+        """Return the fastest time per request to ``route`` in seconds"""
+        factory = RequestFactory()
+        best = float('inf')
+        for _ in range(repeat):
+            requests = [
+                factory.get(route, HTTP_AUTHORIZATION='Token benchmark')
+                for _ in range(count)
+            ]
+            for request in requests:
+                request.urlconf = __name__
+            start = time.perf_counter()
+            for request in requests:
+                handler.get_response(request)
+            best = min(best, (time.perf_counter() - start) / count)
+
+        return best
+
+    def handle(self, *args, **options):
+        """Django command to benchmark the middleware"""
+        stacks = [
+            ('none', []),
+            ('full', FULL_MIDDLEWARE),
+            ('current', settings.MIDDLEWARE),
+        ]
+        self.stdout.write(
+            f'{options["requests"]} requests, best of {options["repeat"]} '
+            'runs'
+        )
+        self.stdout.write(
+            f'{"path":<28}{"stack":<10}{"us/request":>12}{"overhead":>10}'
+        )
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            handlers = [
+                (label, build_handler(middleware))
+                for label, middleware in stacks
+            ]
+            for route in PATHS:
+                baseline = None
+                for label, handler in handlers:
+                    seconds = self.time_requests(
+                        handler, route, options['requests'],
+                        options['repeat'],
+                    )
+                    baseline = seconds if baseline is None else baseline
+                    self.stdout.write(
+                        f'{route:<28}{label:<10}{seconds * 1e6:>12.1f}'
+                        f'{(seconds - baseline) * 1e6:>10.1f}'
+                    )
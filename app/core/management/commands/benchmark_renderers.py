@@ -0,0 +1,104 @@
+"""
+Django command to benchmark the API renderers and parsers
+"""
+
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from app.parsers import (
+    MessagePackParser,
+    ORJSONParser,
+)
+from app.renderers import (
+    MessagePackRenderer,
+    ORJSONRenderer,
+    msgpack,
+)
+from core.models import Medicine
+from medicine.seed import seed_catalog
+from medicine.serializers import MedicineSerializer
+
+
+def best_time(func, repeat):
+    """Return the fastest of ``repeat`` calls of ``func`` in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+class Command(BaseCommand):
+    """Django command to compare the renderers on a medicine list"""
+    help = (
+        'Render and parse a seeded medicine list with each renderer and '
+        'parser and report sizes and timings.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--medicines', type=int, default=2000,
+            help='Medicines in the rendered list',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Runs per renderer, the fastest is reported',
+        )
+
+    def payload(self, medicines):
+        """Return a medicine list as the list endpoint serializes it"""
+        with transaction.atomic():
+            user = seed_catalog(
+                'benchmark-renderers@example.com', medicines=medicines,
+            )
+            queryset = Medicine.objects.filter(user=user).prefetch_related(
+                'symptoms',
+            ).order_by('-name', 'id')
+            data = MedicineSerializer(queryset, many=True).data
+            transaction.set_rollback(True)
+
+        return data
+
+    def handle(self, *args, **options):
+        """Django command to benchmark the renderers"""
+        data = self.payload(options['medicines'])
+        pairs = [
+            ('json (stdlib)', JSONRenderer(), JSONParser()),
+            ('orjson', ORJSONRenderer(), ORJSONParser()),
+        ]
+        if msgpack is not None:
+            pairs.append(
+                ('msgpack', MessagePackRenderer(), MessagePackParser()),
+            )
+        else:
+            self.stdout.write('msgpack is not installed, skipping it')
+
+        self.stdout.write(
+            f'{len(data)} medicines, best of {options["repeat"]} runs'
+        )
+        self.stdout.write(
+            f'{"format":<15}{"bytes":>10}{"render ms":>12}{"parse ms":>12}'
+            f'{"speedup":>10}'
+        )
+        baseline = None
+        for label, renderer, parser in pairs:
+            body = renderer.render(data)
+            render = best_time(
+                lambda: renderer.render(data), options['repeat'],
+            )
+            parse = best_time(
+                lambda: parser.parse(BytesIO(body)), options['repeat'],
+            )
+            baseline = baseline or render
+            self.stdout.write(
+                f'{label:<15}{len(body):>10}{render * 1000:>12.2f}'
+                f'{parse * 1000:>12.2f}{baseline / render:>9.1f}x'
+            )
@@ -0,0 +1,176 @@
+"""
+Django command to check the query plans of the hot API queries
+"""
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.db import (
+    connection,
+    transaction,
+)
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+)
+
+from rest_framework.test import (
+    APIRequestFactory,
+    force_authenticate,
+)
+
+from core.models import (
+    Medicine,
+    Symptom,
+)
+from medicine.pagination import KeysetPagination
+from medicine.seed import seed_catalog
+from medicine.views import (
+    MedicineViewSet,
+    SymptomViewSet,
+)
+
+SORT_NODES = {'Sort', 'Incremental Sort'}
+
+
+def plan_problems(plan, allow_sort=False):
+    """Return the sequential scans and sorts in an EXPLAIN (FORMAT JSON)
+    plan node and its children"""
+    problems = []
+    node_type = plan['Node Type']
+    if node_type == 'Seq Scan':
+        problems.append(f'Seq Scan on {plan["Relation Name"]}')
+    elif node_type in SORT_NODES and not allow_sort:
+        problems.append(
+            f'{node_type} on {", ".join(plan.get("Sort Key", []))}'
+        )
+    for child in plan.get('Plans', []):
+        problems += plan_problems(child, allow_sort)
+
+    return problems
+
+
+class Command(BaseCommand):
+    """Django command to EXPLAIN the queries the API runs"""
+    help = (
+        'Run the hot API queries against a seeded catalog and fail if any '
+        'plan falls back to a sequential scan or an explicit sort.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--medicines', type=int, default=2000,
+            help='Medicines in the seeded catalog',
+        )
+        parser.add_argument(
+            '--symptoms', type=int, default=200,
+            help='Symptoms in the seeded catalog',
+        )
+
+    def hot_requests(self, user):
+        """Return the requests to check as (label, viewset, action, kwargs,
+        params, allow_sort)"""
+        medicines = Medicine.objects.filter(user=user).order_by('-name', 'id')
+        middle = medicines[medicines.count() // 2]
+        cursor = KeysetPagination().encode_cursor([middle.name, middle.id])
+        names = ','.join(
+            Symptom.objects.filter(user=user).values_list(
+                'name', flat=True,
+            )[:3]
+        )
+
+        # Results ranked per request are sorted by design
+        return [
+            ('medicine list', MedicineViewSet, 'list', {}, {}, False),
+            ('medicine page', MedicineViewSet, 'list', {},
+             {'cursor': cursor, 'page_size': 50}, False),
+            ('medicine detail', MedicineViewSet, 'retrieve',
+             {'pk': middle.id}, {}, False),
+            ('medicine symptoms filter', MedicineViewSet, 'list', {},
+             {'symptoms': names}, True),
+            ('medicine symptoms filter, match all', MedicineViewSet, 'list',
+             {}, {'symptoms': names, 'match': 'all'}, True),
+            ('medicine search', MedicineViewSet, 'list', {},
+             {'q': middle.name}, True),
+            ('symptom list', SymptomViewSet, 'list', {}, {}, False),
+            ('symptom names filter', SymptomViewSet, 'list', {},
+             {'symptom_names': names}, False),
+            ('symptom assigned only', SymptomViewSet, 'list', {},
+             {'assigned_only': 1}, True),
+        ]
+
+    def capture(self, user, viewset, action, kwargs, params):
+        """Return the SELECT statements a viewset action runs"""
+        request = APIRequestFactory().get('/', params)
+        force_authenticate(request, user=user)
+        view = viewset.as_view({'get': action})
+        with CaptureQueriesContext(connection) as context:
+            response = view(request, **kwargs)
+            response.render()
+        if response.status_code != 200:
+            raise CommandError(
+                f'{viewset.__name__}.{action} returned '
+                f'{response.status_code}'
+            )
+
+        return [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].lstrip().upper().startswith('SELECT')
+        ]
+
+    def explain(self, sql, allow_sort):
+        """Return the plan problems of one statement"""
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0][0]['Plan']
+
+        return plan_problems(plan, allow_sort)
+
+    def handle(self, *args, **options):
+        """Django command to check the query plans"""
+        failures = []
+        settings = override_settings(
+            RESPONSE_CACHE_ENABLED=False,
+            SYMPTOM_INDEX_ENABLED=False,
+            # The requests are dispatched in-process, not served
+            ALLOWED_HOSTS=['testserver'],
+        )
+        with settings, transaction.atomic():
+            user = seed_catalog(
+                'query-plans@example.com',
+                medicines=options['medicines'],
+                symptoms=options['symptoms'],
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'ANALYZE core_medicine, core_symptom, '
+                    'core_medicine_symptoms'
+                )
+                # A plan keeps a scan or sort only when no index can
+                # replace it, whatever the size of the seeded tables
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('SET LOCAL enable_sort = off')
+
+            for label, viewset, action, kwargs, params, allow_sort in (
+                    self.hot_requests(user)):
+                problems = []
+                for sql in self.capture(user, viewset, action, kwargs,
+                                        params):
+                    problems += self.explain(sql, allow_sort)
+                if problems:
+                    failures.append(label)
+                    self.stdout.write(self.style.ERROR(
+                        f'{label}: {"; ".join(problems)}'
+                    ))
+                else:
+                    self.stdout.write(f'{label}: ok')
+
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(
+                f'{len(failures)} queries without an index plan: '
+                f'{", ".join(failures)}'
+            )
+        self.stdout.write(self.style.SUCCESS('All query plans use indexes'))
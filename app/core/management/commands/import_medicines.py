@@ -0,0 +1,154 @@
+"""
+Django command to import the medicine catalog from an Excel sheet
+"""
+
+import time
+from itertools import (
+    chain,
+    groupby,
+)
+
+from openpyxl import load_workbook
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.db import transaction
+
+from core.models import Medicine
+from medicine.bulk import (
+    MEDICINE_FIELDS,
+    link_symptoms,
+    resolve_symptoms,
+)
+from medicine.signals import catalog_changed
+
+# First cell of the header row of final_data.xlsx
+HEADER_NAME = 'Name of Medicine'
+
+
+def _cell(value):
+    """Return a sheet cell as text, empty cells as an empty string"""
+    return '' if value is None else str(value).strip()
+
+
+def read_medicines(path):
+    """Stream medicines and their symptom names from the sheet
+
+    Uses the layout api_push.py reads: one row per symptom with name, ref
+    text, dispensing size, dosage, precautions, preferred use and the
+    symptom, consecutive rows of a medicine sharing its name. The header
+    row of final_data.xlsx is skipped, sheets without one (like the
+    catalog export) are read from their first row.
+    """
+    workbook = load_workbook(path, read_only=True)
+    try:
+        rows = (
+            [_cell(value) for value in row[:7]]
+            for row in workbook.active.iter_rows(values_only=True)
+            if row and row[0] is not None
+        )
+        first = next(rows, None)
+        if first is None:
+            return
+        if first[0].casefold() != HEADER_NAME.casefold():
+            rows = chain([first], rows)
+
+        for _, medicine_rows in groupby(rows, key=lambda row: row[0]):
+            medicine_rows = list(medicine_rows)
+            medicine = dict(zip(MEDICINE_FIELDS, medicine_rows[0][:6]))
+            # Trailing empty cells may be left out of a row
+            symptoms = [
+                row[6] for row in medicine_rows if len(row) > 6 and row[6]
+            ]
+            yield medicine, list(dict.fromkeys(symptoms)), len(medicine_rows)
+    finally:
+        workbook.close()
+
+
+class Command(BaseCommand):
+    """Django command to import medicines straight into the database"""
+    help = 'Import medicines and symptoms from an Excel sheet for a user.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Excel file, e.g. final_data.xlsx')
+        parser.add_argument(
+            '--user', required=True,
+            help='Email of the user the medicines are imported for',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Medicines written per bulk insert',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Run the import and roll it back',
+        )
+
+    def _write_batch(self, user, batch, symptom_ids, counts):
+        """Bulk insert a batch of medicines, their new symptoms and links"""
+        new_names = {
+            name for _, symptoms in batch for name in symptoms
+            if name not in symptom_ids
+        }
+        if new_names:
+            resolved = resolve_symptoms(user, new_names)
+            symptom_ids.update(
+                (name, symptom.id) for name, symptom in resolved.items()
+            )
+
+        medicines = Medicine.objects.bulk_create(
+            Medicine(user=user, **fields) for fields, _ in batch
+        )
+        links = [
+            (medicine.id, symptom_ids[name])
+            for medicine, (_, symptoms) in zip(medicines, batch)
+            for name in symptoms
+        ]
+        link_symptoms(links)
+
+        counts['medicines'] += len(medicines)
+        counts['links'] += len(links)
+
+    def handle(self, *args, **options):
+        """Django command to import medicines"""
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {options["user"]}')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        start = time.perf_counter()
+        counts = {'rows': 0, 'medicines': 0, 'links': 0}
+        symptom_ids = {}
+        with transaction.atomic():
+            batch = []
+            for medicine, symptoms, rows in read_medicines(options['path']):
+                counts['rows'] += rows
+                batch.append((medicine, symptoms))
+                if len(batch) >= batch_size:
+                    self._write_batch(user, batch, symptom_ids, counts)
+                    batch = []
+            if batch:
+                self._write_batch(user, batch, symptom_ids, counts)
+
+            if options['dry_run']:
+                transaction.set_rollback(True)
+            else:
+                transaction.on_commit(lambda: catalog_changed(user.id))
+
+        elapsed = time.perf_counter() - start
+        rate = counts['rows'] / elapsed if elapsed else 0
+        summary = (
+            f'{counts["medicines"]} medicines, {len(symptom_ids)} symptoms '
+            f'and {counts["links"]} links from {counts["rows"]} rows in '
+            f'{elapsed:.2f}s ({rate:.0f} rows/sec)'
+        )
+        if options['dry_run']:
+            self.stdout.write(f'Dry run, rolled back {summary}')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Imported {summary}'))
@@ -0,0 +1,85 @@
+"""
+Django command to seed the users and catalogs the load test runs against
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.db import transaction
+
+from medicine.seed import seed_catalog
+
+
+def load_test_email(prefix, index):
+    """Return the email of the ``index``-th load test user"""
+    return f'{prefix}-{index}@example.com'
+
+
+class Command(BaseCommand):
+    """Django command to create load test users with seeded catalogs"""
+    help = (
+        'Create users, each with a catalog of medicines and symptoms sized '
+        'like final_data.xlsx, for load_test.py to log in as. Users left '
+        'by a previous run are replaced, so every run starts from the '
+        'same data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=10,
+            help='Users to create',
+        )
+        parser.add_argument(
+            '--medicines', type=int, default=700,
+            help='Medicines per user',
+        )
+        parser.add_argument(
+            '--symptoms', type=int, default=200,
+            help='Symptoms per user',
+        )
+        parser.add_argument(
+            '--links', type=int, default=3,
+            help='Symptoms per medicine',
+        )
+        parser.add_argument(
+            '--prefix', default='loadtest',
+            help='Users are named <prefix>-<n>@example.com',
+        )
+        parser.add_argument(
+            '--password', default='loadtest',
+            help='Password of every user',
+        )
+
+    def handle(self, *args, **options):
+        """Django command to seed the load test data"""
+        if options['users'] < 1:
+            raise CommandError('At least one user is required.')
+        if len(options['password']) < 5:
+            raise CommandError('The password must be at least 5 characters.')
+
+        prefix = options['prefix']
+        with transaction.atomic():
+            deleted, _ = get_user_model().objects.filter(
+                email__startswith=f'{prefix}-',
+                email__endswith='@example.com',
+            ).delete()
+            if deleted:
+                self.stdout.write(f'Deleted {deleted} rows of a previous run')
+
+            for index in range(options['users']):
+                seed_catalog(
+                    load_test_email(prefix, index),
+                    medicines=options['medicines'],
+                    symptoms=options['symptoms'],
+                    links=options['links'],
+                    password=options['password'],
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {options["users"]} users with {options["medicines"]} '
+            f'medicines and {options["symptoms"]} symptoms each '
+            f'({load_test_email(prefix, 0)} to '
+            f'{load_test_email(prefix, options["users"] - 1)})'
+        ))
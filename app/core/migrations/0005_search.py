@@ -0,0 +1,107 @@
+# Generated by Django 3.2.25 on 2026-10-18 00:33
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+MEDICINE_SEARCH_TRIGGER = """
+CREATE FUNCTION core_medicine_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.preferred_use, '')), 'B') ||
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.precautions, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_medicine_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON core_medicine
+    FOR EACH ROW EXECUTE PROCEDURE core_medicine_search_vector_update();
+
+UPDATE core_medicine SET id = id;
+"""
+
+SYMPTOM_SEARCH_TRIGGER = """
+CREATE FUNCTION core_symptom_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := to_tsvector('pg_catalog.english', coalesce(NEW.name, ''));
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_symptom_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON core_symptom
+    FOR EACH ROW EXECUTE PROCEDURE core_symptom_search_vector_update();
+
+UPDATE core_symptom SET id = id;
+"""
+
+# pg_trgm ships with the contrib package, which not every Postgres install
+# has. The trigram indexes are skipped when it is missing and the search
+# falls back to full-text matching only (see medicine.search).
+TRIGRAM_INDEXES = """
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'
+    ) THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX medicine_name_trgm_idx
+            ON core_medicine USING gin (name gin_trgm_ops);
+        CREATE INDEX symptom_name_trgm_idx
+            ON core_symptom USING gin (name gin_trgm_ops);
+    END IF;
+END
+$$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_auto_20230922_0713'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicine',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='symptom',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='medicine_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='symptom',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='symptom_search_idx'),
+        ),
+        migrations.RunSQL(
+            MEDICINE_SEARCH_TRIGGER,
+            reverse_sql="""
+            DROP TRIGGER core_medicine_search_vector_trigger ON core_medicine;
+            DROP FUNCTION core_medicine_search_vector_update();
+            """,
+        ),
+        migrations.RunSQL(
+            SYMPTOM_SEARCH_TRIGGER,
+            reverse_sql="""
+            DROP TRIGGER core_symptom_search_vector_trigger ON core_symptom;
+            DROP FUNCTION core_symptom_search_vector_update();
+            """,
+        ),
+        migrations.RunSQL(
+            TRIGRAM_INDEXES,
+            reverse_sql="""
+            DROP INDEX IF EXISTS medicine_name_trgm_idx;
+            DROP INDEX IF EXISTS symptom_name_trgm_idx;
+            """,
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 3.2.25 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+def normalize(name):
+    """Frozen copy of core.models.normalize_symptom_name"""
+    return ' '.join(name.split()).casefold()
+
+
+def merge_duplicate_symptoms(apps, schema_editor):
+    """Fill normalized_name and merge symptoms sharing it per user
+
+    The oldest symptom of each group is kept, links to the others are
+    moved to it before they are deleted.
+    """
+    Symptom = apps.get_model('core', 'Symptom')
+    Medicine = apps.get_model('core', 'Medicine')
+    through = Medicine.symptoms.through
+
+    kept, duplicates, symptoms = {}, {}, []
+    for symptom in Symptom.objects.order_by('id').iterator():
+        symptom.normalized_name = normalize(symptom.name)
+        key = (symptom.user_id, symptom.normalized_name)
+        if key in kept:
+            duplicates[symptom.id] = kept[key]
+        else:
+            kept[key] = symptom.id
+            symptoms.append(symptom)
+    Symptom.objects.bulk_update(
+        symptoms, ['normalized_name'], batch_size=1000,
+    )
+    if not duplicates:
+        return
+
+    links = through.objects.filter(
+        symptom_id__in=duplicates,
+    ).values_list('medicine_id', 'symptom_id')
+    through.objects.bulk_create(
+        [
+            through(medicine_id=medicine_id, symptom_id=duplicates[symptom_id])
+            for medicine_id, symptom_id in links.iterator()
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    Symptom.objects.filter(id__in=duplicates).delete()
+    # Run the deferred foreign key checks before the table is altered
+    schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='symptom',
+            name='normalized_name',
+            field=models.TextField(default='', editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(
+            merge_duplicate_symptoms, migrations.RunPython.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='symptom',
+            constraint=models.UniqueConstraint(
+                fields=('user', 'normalized_name'),
+                name='symptom_user_normalized_name_uniq',
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.25 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_symptom_normalized_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(
+                fields=['user', '-name', 'id'], name='medicine_user_name_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='symptom',
+            index=models.Index(
+                fields=['user', '-name', 'id'], name='symptom_user_name_idx',
+            ),
+        ),
+        # The auto-created through table only indexes (medicine, symptom)
+        # and each column alone, joins from a symptom to its medicines
+        # read the pair from this index without visiting the table.
+        migrations.RunSQL(
+            'CREATE INDEX core_medicine_symptoms_symptom_medicine_idx '
+            'ON core_medicine_symptoms (symptom_id, medicine_id);',
+            'DROP INDEX core_medicine_symptoms_symptom_medicine_idx;',
+        ),
+    ]
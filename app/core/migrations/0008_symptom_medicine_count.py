@@ -0,0 +1,92 @@
+# Generated by Django 3.2.25 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+# Statement level triggers read the links a statement inserted or deleted
+# from its transition table, so a bulk insert updates each symptom once.
+# The symptom rows are locked in ID order first, writers linking the same
+# symptoms in a different order would otherwise deadlock.
+MEDICINE_COUNT_TRIGGERS = """
+CREATE FUNCTION core_symptom_medicine_count_update() RETURNS trigger AS $$
+DECLARE
+    sign integer := CASE TG_OP WHEN 'INSERT' THEN 1 ELSE -1 END;
+BEGIN
+    PERFORM 1 FROM core_symptom
+        WHERE id IN (SELECT symptom_id FROM changed_links)
+        ORDER BY id FOR UPDATE;
+    UPDATE core_symptom
+        SET medicine_count = medicine_count + sign * links.count
+        FROM (
+            SELECT symptom_id, count(*) AS count
+            FROM changed_links GROUP BY symptom_id
+        ) AS links
+        WHERE core_symptom.id = links.symptom_id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_medicine_symptoms_insert_trigger
+    AFTER INSERT ON core_medicine_symptoms
+    REFERENCING NEW TABLE AS changed_links
+    FOR EACH STATEMENT EXECUTE PROCEDURE core_symptom_medicine_count_update();
+
+CREATE TRIGGER core_medicine_symptoms_delete_trigger
+    AFTER DELETE ON core_medicine_symptoms
+    REFERENCING OLD TABLE AS changed_links
+    FOR EACH STATEMENT EXECUTE PROCEDURE core_symptom_medicine_count_update();
+
+UPDATE core_symptom SET medicine_count = links.count
+    FROM (
+        SELECT symptom_id, count(*) AS count
+        FROM core_medicine_symptoms GROUP BY symptom_id
+    ) AS links
+    WHERE core_symptom.id = links.symptom_id;
+"""
+
+# The search vector only depends on the name, counting a link must not
+# rebuild it
+SYMPTOM_SEARCH_TRIGGER = """
+DROP TRIGGER core_symptom_search_vector_trigger ON core_symptom;
+
+CREATE TRIGGER core_symptom_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name ON core_symptom
+    FOR EACH ROW EXECUTE PROCEDURE core_symptom_search_vector_update();
+"""
+
+REVERSE_SYMPTOM_SEARCH_TRIGGER = """
+DROP TRIGGER core_symptom_search_vector_trigger ON core_symptom;
+
+CREATE TRIGGER core_symptom_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON core_symptom
+    FOR EACH ROW EXECUTE PROCEDURE core_symptom_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='symptom',
+            name='medicine_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(
+            SYMPTOM_SEARCH_TRIGGER,
+            reverse_sql=REVERSE_SYMPTOM_SEARCH_TRIGGER,
+        ),
+        migrations.RunSQL(
+            MEDICINE_COUNT_TRIGGERS,
+            reverse_sql="""
+            DROP TRIGGER core_medicine_symptoms_insert_trigger
+                ON core_medicine_symptoms;
+            DROP TRIGGER core_medicine_symptoms_delete_trigger
+                ON core_medicine_symptoms;
+            DROP FUNCTION core_symptom_medicine_count_update();
+            """,
+        ),
+    ]
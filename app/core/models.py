@@ -1,6 +1,8 @@
 """Database Models."""
 
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import (
     AbstractBaseUser,
@@ -8,6 +10,12 @@ from django.contrib.auth.models import (
     BaseUserManager,
 )
 
+def normalize_symptom_name(name):
+    """Return the key symptom names are matched on: case-folded, with
+    whitespace collapsed"""
+    return ' '.join(name.split()).casefold()
+
+
 class UserManager(BaseUserManager):
     """Manager for Users."""
 
@@ -56,6 +64,17 @@ class Medicine(models.Model):
     precautions = models.TextField(max_length=255)
     preferred_use = models.CharField(max_length=255)
     symptoms = models.ManyToManyField('Symptom')
+    # Maintained by a database trigger, see migration 0005
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='medicine_search_idx'),
+            # Serves the list filter and its default ordering
+            models.Index(
+                fields=['user', '-name', 'id'], name='medicine_user_name_idx',
+            ),
+        ]
 
     def __str__(self):
         """Return string representation of medicine."""
@@ -64,10 +83,42 @@ class Medicine(models.Model):
 class Symptom(models.Model):
     """Symptoms for medicines"""
     name = models.TextField(max_length=400)
+    # Set from name on save, bulk writes must set it themselves
+    normalized_name = models.TextField(editable=False)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # Maintained by a database trigger, see migration 0005
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Medicines linked to the symptom, maintained by database triggers on
+    # the through table, see migration 0008
+    medicine_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='symptom_search_idx'),
+            models.Index(
+                fields=['user', '-name', 'id'], name='symptom_user_name_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'normalized_name'],
+                name='symptom_user_normalized_name_uniq',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Normalize the name before saving."""
+        self.normalized_name = normalize_symptom_name(self.name)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # Writing back a count read earlier would undo links made since
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'medicine_count'
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         """Return string representation of symptom."""
@@ -0,0 +1,99 @@
+"""
+Test helpers shared across the API test suites
+"""
+
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APIClient
+
+from core.models import Medicine
+
+
+def create_medicine(user, **params):
+    """Create and return a sample medicine"""
+    defaults = {
+        'name': 'Sample medicine',
+        'ref_text': 'AFI',
+        'dispensing_size': '200 ml',
+        'dosage': '12 - 24 ml',
+        'precautions': 'NS',
+        'preferred_use': 'Both',
+    }
+    defaults.update(params)
+
+    return Medicine.objects.create(user=user, **defaults)
+
+
+class AuthenticatedAPIMixin:
+    """Give each test an ``APIClient`` authenticated as ``self.user``
+
+    Mix into a ``TestCase`` or ``TransactionTestCase``.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(self.user)
+
+
+class QueryBudgetMixin:
+    """Assertions that keep endpoint query counts flat as data grows
+
+    Mix into a ``TestCase`` that has an authenticated ``self.client``.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, budget):
+        """Fail if the wrapped block runs more than ``budget`` queries"""
+        with CaptureQueriesContext(connection) as ctx:
+            yield ctx
+
+        executed = len(ctx.captured_queries)
+        if executed > budget:
+            queries = '\n'.join(
+                f'{i}. {query["sql"]}'
+                for i, query in enumerate(ctx.captured_queries, start=1)
+            )
+            self.fail(
+                f'{executed} queries executed, budget is {budget}:\n'
+                f'{queries}'
+            )
+
+    def count_queries(self, url, params=None):
+        """GET ``url`` and return how many queries the request ran"""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url, params)
+
+        self.assertEqual(res.status_code, 200, res.content)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, url, grow, budget, params=None):
+        """Assert the query count of ``url`` does not scale with its rows
+
+        ``grow`` is called with no arguments to add more rows to the
+        response (or to its nested relations) between the two measurements.
+        """
+        # Writes invalidate cached responses once they commit
+        with self.captureOnCommitCallbacks(execute=True):
+            grow()
+        small = self.count_queries(url, params)
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(5):
+                grow()
+        large = self.count_queries(url, params)
+
+        self.assertEqual(
+            small, large,
+            f'{url} ran {small} queries before and {large} after '
+            'growing the result set',
+        )
+        self.assertLessEqual(large, budget)
+        return large
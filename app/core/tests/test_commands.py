@@ -4,8 +4,13 @@ Test custom Django management commands.
 
 # Importing the 'patch' function from the 'unittest.mock' module for 
 # mocking and patching during unit testing.
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
+from openpyxl import Workbook
+
 # Importing the 'OperationalError' class from the 'psycopg2' 
 # module and aliasing it as 'Psycopg2Error' for handling 
 # database-related errors.
@@ -13,7 +18,9 @@ from psycopg2 import OperationalError as Psycopg2Error
 
 # Importing the 'call_command' function from the 'django.core.management' 
 # module for calling Django management commands programmatically.
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
 
 # Importing the 'OperationalError' class from the 'django.db.utils' 
 # module for handling database-related errors in Django applications.
@@ -21,7 +28,27 @@ from django.db.utils import OperationalError
 
 # Importing the 'SimpleTestCase' class from the 'django.test' 
 # module for creating simple test cases in Django testing.
-from django.test import SimpleTestCase
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+)
+
+from core.management.commands.check_query_plans import plan_problems
+from core.models import (
+    Medicine,
+    Symptom,
+)
+
+SHEET_ROWS = [
+    ('Name of Medicine', 'Reference text', 'Dispensing Pack Size', 'Dose',
+     'Precaution/ Contraindication', 'Preferred use (OPD/ IPD)',
+     ' Normal Understandable Term'),
+    ('Medicine 1', 'AFI', '200 ml', '12 - 24 ml', None, 'Both', 'Fever'),
+    ('Medicine 1', 'AFI', '200 ml', '12 - 24 ml', None, 'Both', 'Cough'),
+    ('Medicine 1', 'AFI', '200 ml', '12 - 24 ml', None, 'Both', 'Cough'),
+    ('Medicine 2', 'AFI', '100 ml', '5 ml', 'NS', 'Adult', 'Cough'),
+    ('Medicine 2', 'AFI', '100 ml', '5 ml', 'NS', 'Adult', None),
+]
 
 @patch('core.management.commands.wait_for_db.Command.check')
 class CommandTests(SimpleTestCase):
@@ -51,3 +78,176 @@ class CommandTests(SimpleTestCase):
         patched_check.assert_called_with(databases= ['default'])
 
 
+class ImportMedicinesCommandTests(TestCase):
+    """Test importing medicines from an Excel sheet"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        workbook = Workbook()
+        for row in SHEET_ROWS:
+            workbook.active.append(row)
+        tmp = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False)
+        tmp.close()
+        workbook.save(tmp.name)
+        self.path = tmp.name
+        self.addCleanup(os.remove, tmp.name)
+
+    def test_import_medicines(self):
+        """Test medicines, deduplicated symptoms and links are imported"""
+        Symptom.objects.create(user=self.user, name='Fever')
+        out = StringIO()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command(
+                'import_medicines', self.path, user=self.user.email,
+                batch_size=1, stdout=out,
+            )
+
+        medicines = Medicine.objects.filter(user=self.user).order_by('name')
+        self.assertEqual(
+            [m.name for m in medicines], ['Medicine 1', 'Medicine 2'],
+        )
+        m1, m2 = medicines
+        self.assertEqual(m1.dosage, '12 - 24 ml')
+        self.assertEqual(m1.precautions, '')
+        self.assertEqual(
+            set(m1.symptoms.values_list('name', flat=True)),
+            {'Fever', 'Cough'},
+        )
+        self.assertEqual(
+            list(m2.symptoms.values_list('name', flat=True)), ['Cough'],
+        )
+        self.assertEqual(Symptom.objects.filter(user=self.user).count(), 2)
+        self.assertIn('2 medicines', out.getvalue())
+        self.assertIn('from 5 rows', out.getvalue())
+        self.assertIn('rows/sec', out.getvalue())
+
+    def test_dry_run(self):
+        """Test a dry run writes nothing"""
+        out = StringIO()
+
+        call_command(
+            'import_medicines', self.path, user=self.user.email,
+            dry_run=True, stdout=out,
+        )
+
+        self.assertFalse(Medicine.objects.exists())
+        self.assertFalse(Symptom.objects.exists())
+        self.assertIn('Dry run', out.getvalue())
+
+    def test_unknown_user(self):
+        """Test importing for an unknown user fails"""
+        with self.assertRaises(CommandError):
+            call_command(
+                'import_medicines', self.path, user='nobody@example.com',
+            )
+
+
+class CheckQueryPlansCommandTests(TestCase):
+    """Test checking the query plans of the API"""
+
+    def test_query_plans_use_indexes(self):
+        """Test no hot query scans or sorts a whole table"""
+        out = StringIO()
+
+        call_command(
+            'check_query_plans', medicines=100, symptoms=20, stdout=out,
+        )
+
+        self.assertIn('All query plans use indexes', out.getvalue())
+        self.assertFalse(Medicine.objects.exists())
+
+    def test_plan_problems(self):
+        """Test sequential scans and sorts are found in nested plans"""
+        plan = {
+            'Node Type': 'Sort',
+            'Sort Key': ['name DESC', 'id'],
+            'Plans': [
+                {'Node Type': 'Seq Scan', 'Relation Name': 'core_medicine'},
+            ],
+        }
+
+        self.assertEqual(
+            plan_problems(plan),
+            ['Sort on name DESC, id', 'Seq Scan on core_medicine'],
+        )
+        self.assertEqual(
+            plan_problems(plan, allow_sort=True),
+            ['Seq Scan on core_medicine'],
+        )
+
+
+class BenchmarkRenderersCommandTests(TestCase):
+    """Test benchmarking the renderers"""
+
+    def test_benchmark_renderers(self):
+        """Test every renderer is reported and nothing is kept"""
+        out = StringIO()
+
+        call_command('benchmark_renderers', medicines=5, repeat=1, stdout=out)
+
+        self.assertIn('json (stdlib)', out.getvalue())
+        self.assertIn('orjson', out.getvalue())
+        self.assertFalse(Medicine.objects.exists())
+
+
+class BenchmarkMiddlewareCommandTests(SimpleTestCase):
+    """Test benchmarking the middleware"""
+
+    def test_benchmark_middleware(self):
+        """Test each stack is timed on each path"""
+        out = StringIO()
+
+        call_command('benchmark_middleware', requests=2, repeat=1, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        for stack in ('none', 'full', 'current'):
+            self.assertEqual(
+                sum(1 for line in lines if f' {stack} ' in line), 2,
+            )
+
+
+class SeedLoadTestCommandTests(TestCase):
+    """Test seeding the load test users"""
+
+    def test_seed_load_test(self):
+        """Test users are created with catalogs and a usable password"""
+        call_command(
+            'seed_load_test', users=2, medicines=4, symptoms=3, links=2,
+            password='secret', stdout=StringIO(),
+        )
+
+        users = get_user_model().objects.filter(
+            email__startswith='loadtest-',
+        ).order_by('email')
+        self.assertEqual(
+            [user.email for user in users],
+            ['loadtest-0@example.com', 'loadtest-1@example.com'],
+        )
+        self.assertTrue(users[0].check_password('secret'))
+        self.assertEqual(Medicine.objects.filter(user=users[0]).count(), 4)
+        self.assertEqual(Symptom.objects.filter(user=users[1]).count(), 3)
+        self.assertEqual(
+            Medicine.symptoms.through.objects.filter(
+                medicine__user=users[0],
+            ).count(),
+            8,
+        )
+
+    def test_seed_load_test_replaces_previous_run(self):
+        """Test seeding again replaces the users of a previous run"""
+        options = {'users': 2, 'medicines': 2, 'symptoms': 2}
+        call_command('seed_load_test', stdout=StringIO(), **options)
+
+        call_command('seed_load_test', stdout=StringIO(), **options)
+
+        self.assertEqual(
+            get_user_model().objects.filter(
+                email__startswith='loadtest-',
+            ).count(),
+            2,
+        )
+        self.assertEqual(Medicine.objects.count(), 4)
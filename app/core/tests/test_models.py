@@ -4,6 +4,7 @@ from decimal import Decimal
 
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError
 
 from core import models
 
@@ -85,6 +86,17 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(symptom), symptom.name)
 
+    def test_symptom_normalized_name(self):
+        """Test symptom names are normalized and unique per user"""
+        user = get_user_model().objects.create_user(
+            'test@example.com',
+            'testpass123',
+        )
+        symptom = models.Symptom.objects.create(
+            user = user,
+            name = '  High   FEVER ',
+        )
 
-
-
+        self.assertEqual(symptom.normalized_name, 'high fever')
+        with self.assertRaises(IntegrityError):
+            models.Symptom.objects.create(user = user, name = 'high fever')
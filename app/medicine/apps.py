@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MedicineConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'medicine'
+
+    def ready(self):
+        """Connect the catalog invalidation signals"""
+        from medicine import signals  # noqa: F401
@@ -0,0 +1,162 @@
+"""Non-blocking database reads for the async read endpoints
+
+Django's ORM only runs queries synchronously, so an async view calling it
+would hold a thread for the whole query. The async views build their
+querysets with the ORM as usual and run the SQL they compile to on a
+psycopg 3 connection instead, awaiting the database without a thread.
+
+Connections come from a per event loop pool of at most
+``ASYNC_DB_POOL_SIZE`` connections, checked before reuse when the
+database has ``CONN_HEALTH_CHECKS``. Requests that are not served by an
+event loop of their own (an async view under WSGI runs in a throwaway
+loop) use a single connection closed after the request instead.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+
+from psycopg import (
+    AsyncClientCursor,
+    AsyncConnection,
+)
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool
+
+from app.metrics import timed
+
+# Event loop -> task opening its pool
+_pools = {}
+
+
+def _conninfo(using='default'):
+    """Return the connection string of a Django database"""
+    db = connections[using].settings_dict
+    params = {
+        'dbname': db['NAME'],
+        'user': db['USER'],
+        'password': db['PASSWORD'],
+        'host': db['HOST'],
+        'port': db['PORT'],
+    }
+    return make_conninfo(**{name: value for name, value in params.items()
+                            if value})
+
+
+def _connection_kwargs():
+    """Return the options of async connections
+
+    Reads run in autocommit like Django's, and parameters are merged into
+    the statement client side like psycopg2 does, so the SQL Django
+    compiles runs unchanged.
+    """
+    return {'autocommit': True, 'cursor_factory': AsyncClientCursor}
+
+
+async def _open_pool():
+    """Return an open connection pool for the running loop"""
+    db = connections['default'].settings_dict
+    check = None
+    if db.get('CONN_HEALTH_CHECKS'):
+        check = AsyncConnectionPool.check_connection
+    pool = AsyncConnectionPool(
+        _conninfo(),
+        min_size=1,
+        max_size=settings.ASYNC_DB_POOL_SIZE,
+        kwargs=_connection_kwargs(),
+        check=check,
+        max_lifetime=db.get('POOL_MAX_LIFETIME', 3600),
+        open=False,
+    )
+    await pool.open()
+    return pool
+
+
+def _get_pool():
+    """Return an awaitable of the running loop's pool, opening it once"""
+    loop = asyncio.get_running_loop()
+    if loop not in _pools:
+        _pools[loop] = loop.create_task(_open_pool())
+
+    return _pools[loop]
+
+
+async def close_pool():
+    """Close the running loop's pool, if it has one"""
+    task = _pools.pop(asyncio.get_running_loop(), None)
+    if task is not None:
+        pool = await task
+        await pool.close()
+
+
+def pool_stats():
+    """Return the stats of the open pools, one per event loop"""
+    stats = []
+    for task in list(_pools.values()):
+        if not task.done() or task.cancelled() or task.exception():
+            continue
+        counters = task.result().get_stats()
+        size = counters.get('pool_size', 0)
+        idle = counters.get('pool_available', 0)
+        stats.append({
+            'max_size': counters.get('pool_max', 0),
+            'size': size,
+            'idle': idle,
+            'checked_out': size - idle,
+            'waiting': counters.get('requests_waiting', 0),
+            'created': counters.get('connections_num', 0),
+            'recycled': (
+                counters.get('connections_lost', 0)
+                + counters.get('returns_bad', 0)
+            ),
+        })
+
+    return stats
+
+
+@asynccontextmanager
+async def connection(pooled=True):
+    """Yield an async connection, from the loop's pool when ``pooled``"""
+    if pooled:
+        pool = await _get_pool()
+        async with pool.connection() as conn:
+            yield conn
+    else:
+        conn = await AsyncConnection.connect(
+            _conninfo(), **_connection_kwargs(),
+        )
+        async with conn:
+            yield conn
+
+
+async def _execute(conn, queryset):
+    """Return the rows of a queryset's SQL run on ``conn``"""
+    try:
+        sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    except EmptyResultSet:
+        return []
+
+    with timed('db'):
+        cursor = await conn.execute(sql, params)
+        return await cursor.fetchall()
+
+
+async def fetch_values(conn, queryset):
+    """Return the rows of a ``values()`` queryset as dicts
+
+    The columns read by the async views are plain text and numbers, so no
+    field converters are applied.
+    """
+    query = queryset.query
+    names = [
+        *query.extra_select, *query.values_select, *query.annotation_select,
+    ]
+    return [dict(zip(names, row)) for row in await _execute(conn, queryset)]
+
+
+async def fetch_rows(conn, queryset):
+    """Return the rows of a ``values_list()`` queryset as tuples"""
+    return await _execute(conn, queryset)
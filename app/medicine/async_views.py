@@ -0,0 +1,162 @@
+"""Async read endpoints for medicine API
+
+ASGI versions of the medicine list and detail and of the symptom list.
+Each request is authenticated, and its query built, by the DRF viewset of
+the sync endpoint, so filters, search, ordering, pagination, the response
+cache and the rendered JSON are all the same. The query itself runs on
+``medicine.async_db``, so one ASGI worker keeps many reads in flight
+instead of one per thread.
+"""
+
+from functools import partial
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse
+
+from rest_framework.exceptions import (
+    APIException,
+    MethodNotAllowed,
+    NotFound,
+)
+from rest_framework.response import Response
+
+from app.metrics import timed_serialize
+from medicine import async_db
+from medicine.views import (
+    MedicineViewSet,
+    SymptomViewSet,
+)
+
+
+class AsyncRead:
+    """One read request served through a viewset's list reader"""
+
+    def __init__(self, viewset_class, action, request, **kwargs):
+        self.view = view = viewset_class(
+            action=action, action_map={'get': action}, args=(),
+            kwargs=kwargs, format_kwarg=None,
+        )
+        # What as_view() and dispatch() set up on a view
+        view.get = getattr(view, action)
+        view.headers = view.default_response_headers
+        self.request = view.request = view.initialize_request(
+            request, **kwargs,
+        )
+        self.action = action
+        self.django_request = request
+        self.cache_key = None
+        self.cached = None
+        self.reader = None
+        self.queryset = None
+        self.page_queryset = None
+
+    def prepare(self):
+        """Authenticate the request and build its query, without running it
+
+        Authentication and the cache lookup may hit the database or the
+        cache synchronously, so this runs in a thread.
+        """
+        view = self.view
+        if self.request.method not in ('GET', 'HEAD'):
+            raise MethodNotAllowed(self.request.method)
+        view.initial(self.request)
+
+        self.cache_key, self.cached = view.lookup_response_cache(
+            self.request,
+        )
+        if self.cached is not None:
+            return
+
+        self.reader = view.get_list_reader()
+        queryset = self.reader.values(
+            view.filter_queryset(view.get_queryset()),
+        )
+        if self.action == 'retrieve':
+            queryset = queryset.filter(pk=view.kwargs['pk'])
+        elif view.paginator is not None:
+            self.page_queryset = view.paginator.page_queryset(
+                queryset, self.request, view,
+            )
+        self.queryset = queryset
+
+    async def read(self, conn):
+        """Return the response data, reading it on ``conn``"""
+        reader = self.reader
+        fetch = partial(async_db.fetch_rows, conn)
+        if self.page_queryset is not None:
+            paginator = self.view.paginator
+            rows = paginator.paginate_rows(
+                await async_db.fetch_values(conn, self.page_queryset),
+            )
+            with timed_serialize():
+                data = await reader.adata(rows, fetch)
+            return paginator.get_paginated_response(data).data
+
+        rows = await async_db.fetch_values(conn, self.queryset)
+        with timed_serialize():
+            data = await reader.adata(rows, fetch)
+        if self.action != 'retrieve':
+            return data
+        if not data:
+            raise NotFound()
+
+        return data[0]
+
+    def render(self, response):
+        """Return the DRF response rendered into a plain HttpResponse
+
+        Rendering here keeps it on the event loop, Django would render a
+        deferred response in a thread.
+        """
+        response = self.view.finalize_response(self.request, response)
+        content = response.rendered_content
+        return HttpResponse(
+            content, status=response.status_code,
+            headers=dict(response.items()),
+        )
+
+    async def respond(self):
+        """Serve the request"""
+        try:
+            await sync_to_async(self.prepare)()
+            if self.cached is not None:
+                response = Response(self.cached)
+                response['X-Cache'] = 'HIT'
+                return self.render(response)
+
+            # Under WSGI the view runs in a loop of its own per request
+            pooled = isinstance(self.django_request, ASGIRequest)
+            async with async_db.connection(pooled=pooled) as conn:
+                data = await self.read(conn)
+        except APIException as exc:
+            return self.render(self.view.handle_exception(exc))
+
+        response = Response(data)
+        if self.cache_key is not None:
+            await sync_to_async(cache.set)(
+                self.cache_key, data, settings.RESPONSE_CACHE_TIMEOUT,
+            )
+            response['X-Cache'] = 'MISS'
+
+        return self.render(response)
+
+
+async def medicine_list(request):
+    """List the user's medicines like GET /medicines/"""
+    return await AsyncRead(MedicineViewSet, 'list', request).respond()
+
+
+async def medicine_detail(request, pk):
+    """Return one medicine like GET /medicines/<id>/"""
+    return await AsyncRead(
+        MedicineViewSet, 'retrieve', request, pk=pk,
+    ).respond()
+
+
+async def symptom_list(request):
+    """List the user's symptoms like GET /symptoms/"""
+    return await AsyncRead(SymptomViewSet, 'list', request).respond()
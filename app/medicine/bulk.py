@@ -0,0 +1,141 @@
+"""Set-based writes for medicine API"""
+
+from django.db import transaction
+
+from core.models import (
+    Medicine,
+    Symptom,
+    normalize_symptom_name,
+)
+from medicine.signals import catalog_changed
+
+MEDICINE_FIELDS = [
+    'name', 'ref_text', 'dispensing_size', 'dosage', 'precautions',
+    'preferred_use',
+]
+
+
+def resolve_symptoms(user, names):
+    """Return a map of name to the user's symptom, creating missing ones
+
+    Names are matched on their normalized form, so "Fever" and " fever"
+    resolve to the same symptom. Runs one indexed SELECT for every
+    requested name and, for the names the user does not have yet, one bulk
+    INSERT that skips names a concurrent writer created in the meantime
+    followed by a SELECT of the inserted rows.
+    """
+    keys = {}
+    for name in names:
+        keys.setdefault(name, normalize_symptom_name(name))
+    if not keys:
+        return {}
+
+    by_key = {
+        symptom.normalized_name: symptom
+        for symptom in Symptom.objects.filter(
+            user=user, normalized_name__in=set(keys.values()),
+        )
+    }
+
+    missing = {}
+    for name, key in keys.items():
+        if key not in by_key:
+            missing.setdefault(key, name)
+    if missing:
+        Symptom.objects.bulk_create(
+            [
+                Symptom(user=user, name=name, normalized_name=key)
+                for key, name in missing.items()
+            ],
+            ignore_conflicts=True,
+        )
+        by_key.update(
+            (symptom.normalized_name, symptom)
+            for symptom in Symptom.objects.filter(
+                user=user, normalized_name__in=missing,
+            )
+        )
+
+    return {name: by_key[key] for name, key in keys.items()}
+
+
+def link_symptoms(links):
+    """Insert (medicine ID, symptom ID) pairs into the through table"""
+    through = Medicine.symptoms.through
+    through.objects.bulk_create(
+        [
+            through(medicine_id=medicine_id, symptom_id=symptom_id)
+            for medicine_id, symptom_id in set(links)
+        ],
+        ignore_conflicts=True,
+    )
+
+
+@transaction.atomic
+def bulk_write_medicines(user, items, upsert=False):
+    """Create, or with ``upsert`` update by name, medicines in bulk
+
+    ``items`` are validated medicine dicts with an optional ``symptoms``
+    list. Medicines, symptoms and their links are each written with a
+    single bulk statement. Upserted medicines sent with symptoms have
+    their symptoms replaced. A name several of the user's medicines share
+    cannot tell which one to update, so such items are skipped. Returns
+    ``(medicine, created)`` pairs in input order, ``(None, False)`` for
+    the skipped items.
+    """
+    existing, shared = {}, set()
+    if upsert:
+        medicines = Medicine.objects.filter(
+            user=user, name__in={item['name'] for item in items},
+        )
+        for medicine in medicines:
+            if medicine.name in existing:
+                shared.add(medicine.name)
+            existing[medicine.name] = medicine
+        items = [
+            None if item['name'] in shared else item for item in items
+        ]
+
+    symptoms = resolve_symptoms(user, (
+        symptom['name']
+        for item in items if item is not None
+        for symptom in item.get('symptoms', [])
+    ))
+
+    results, to_create, to_update, relinked = [], [], [], []
+    for item in items:
+        if item is None:
+            results.append((None, False))
+            continue
+        medicine = existing.get(item['name'])
+        created = medicine is None
+        if created:
+            medicine = Medicine(user=user)
+            to_create.append(medicine)
+        else:
+            to_update.append(medicine)
+            if 'symptoms' in item:
+                relinked.append(medicine.id)
+
+        for field in MEDICINE_FIELDS:
+            if field in item:
+                setattr(medicine, field, item[field])
+        results.append((medicine, created))
+
+    Medicine.objects.bulk_create(to_create)
+    Medicine.objects.bulk_update(to_update, MEDICINE_FIELDS)
+    if relinked:
+        Medicine.symptoms.through.objects.filter(
+            medicine_id__in=relinked,
+        ).delete()
+
+    link_symptoms(
+        (medicine.id, symptoms[symptom['name']].id)
+        for (medicine, _), item in zip(results, items)
+        if item is not None
+        for symptom in item.get('symptoms', [])
+    )
+
+    # Bulk statements send no model signals
+    transaction.on_commit(lambda: catalog_changed(user.id))
+    return results
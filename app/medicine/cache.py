@@ -0,0 +1,82 @@
+"""Response cache for medicine API
+
+List and retrieve responses are cached per user under their catalog
+version (see ``medicine.catalog``). Writes bump the version, so older
+entries are simply never read again and expire on their own.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from rest_framework.response import Response
+
+from core.cache import CacheStats
+from medicine.catalog import get_catalog_version
+
+RESPONSE_KEY = 'medicine:response:{user_id}:{version}:{digest}'
+
+response_cache_stats = CacheStats()
+
+
+class CachedResponseMixin:
+    """Cache successful list and retrieve responses per catalog version"""
+
+    def get_response_cache_key(self, request, version):
+        """Return the cache key for the request under a catalog version"""
+        params = sorted(request.query_params.lists())
+        raw = f'{request.get_host()}{request.path}?{params}'
+        return RESPONSE_KEY.format(
+            user_id=request.user.id,
+            version=version,
+            digest=hashlib.sha1(raw.encode()).hexdigest(),
+        )
+
+    def lookup_response_cache(self, request):
+        """Return the request's cache key and its cached data, if any
+
+        The key is None when the response cache is disabled.
+        """
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return None, None
+
+        # Read the version before computing, so a write racing with this
+        # request leaves the entry under the version it has already bumped
+        version = get_catalog_version(request.user.id)
+        key = self.get_response_cache_key(request, version)
+        cached = cache.get(key)
+        response_cache_stats.record('miss' if cached is None else 'hit')
+
+        return key, cached
+
+    def cached_response(self, action, request, *args, **kwargs):
+        """Return the cached response for the request or compute it"""
+        key, cached = self.lookup_response_cache(request)
+        if key is None:
+            return action(request, *args, **kwargs)
+
+        if cached is not None:
+            response = Response(cached)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = action(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """List the objects, from the cache when possible"""
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(CachedResponseMixin):
+    """Also cache retrieve responses"""
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve an object, from the cache when possible"""
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs,
+        )
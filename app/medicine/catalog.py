@@ -0,0 +1,40 @@
+"""Per-user catalog versions for medicine API
+
+Every write to a user's medicines or symptoms bumps their catalog version,
+so anything derived from the catalog can be keyed on the version and goes
+stale in O(1) instead of being hunted down and deleted. Versions live in
+the default cache, so they are shared between workers whenever the cache
+backend is.
+"""
+
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = 'medicine:catalog-version:{}'
+
+
+def _initial_version():
+    """Return a starting version that never repeats an evicted one"""
+    return time.time_ns()
+
+
+def get_catalog_version(user_id):
+    """Return the current catalog version for the user"""
+    key = VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+
+    return version
+
+
+def bump_catalog_version(user_id):
+    """Mark the user's catalog as changed and return the new version"""
+    key = VERSION_KEY.format(user_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), timeout=None)
+        return cache.get(key)
@@ -0,0 +1,201 @@
+"""Pagination for medicine API"""
+
+import binascii
+import json
+from base64 import (
+    urlsafe_b64decode,
+    urlsafe_b64encode,
+)
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Opt-in keyset (cursor) pagination over a unique ordering
+
+    Pages are only returned when the request sends ``cursor`` or
+    ``page_size``, otherwise the full list is rendered as before. Each
+    cursor encodes the ordering values of the last row served, and the
+    next page is fetched with a ``WHERE`` on those values rather than an
+    ``OFFSET``, so deep pages cost the same as the first one and rows
+    inserted meanwhile never shift a page. The view's ordering must end
+    with a unique column (``id``).
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = ('-name', 'id')
+    invalid_cursor_message = _('Invalid cursor')
+
+    def get_page_size(self, request):
+        """Return the requested page size clamped to the configured cap"""
+        max_page_size = settings.API_MAX_PAGE_SIZE
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return min(settings.API_PAGE_SIZE, max_page_size)
+
+        return max(1, min(page_size, max_page_size))
+
+    def get_ordering(self, view):
+        """Return the ordering the view lists its rows in"""
+        if hasattr(view, 'get_ordering'):
+            return tuple(view.get_ordering())
+
+        return self.ordering
+
+    def encode_cursor(self, position):
+        """Return an opaque cursor for the given ordering values"""
+        data = json.dumps(position, separators=(',', ':')).encode()
+        return urlsafe_b64encode(data).decode('ascii')
+
+    def decode_cursor(self, request):
+        """Return the ordering values encoded in the request cursor"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            position = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+        except (binascii.Error, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if (not isinstance(position, list)
+                or len(position) != len(self.ordering)
+                or not all(
+                    isinstance(value, (str, int, float))
+                    and not isinstance(value, bool)
+                    for value in position
+                )
+                or not isinstance(position[-1], int)):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position
+
+    def _after(self, position):
+        """Return a filter for rows strictly after ``position``"""
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {
+                previous.lstrip('-'): value
+                for previous, value in zip(self.ordering, position[:index])
+            }
+            condition |= Q(**equal, **{f'{name}__{lookup}': position[index]})
+
+        return condition
+
+    def get_position(self, row):
+        """Return the ordering values of a model instance or values() row"""
+        names = [field.lstrip('-') for field in self.ordering]
+        if isinstance(row, dict):
+            return [row[name] for name in names]
+
+        return [getattr(row, name) for name in names]
+
+    def page_queryset(self, queryset, request, view=None):
+        """Return the query of one page plus one row, without running it
+
+        Returns None when pagination is not asked. The rows read from the
+        query are trimmed to the page by ``paginate_rows()``.
+        """
+        params = request.query_params
+        if (self.cursor_query_param not in params
+                and self.page_size_query_param not in params):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self._after(position))
+            except (TypeError, ValueError):
+                # A value that does not fit its column
+                raise NotFound(self.invalid_cursor_message)
+
+        return queryset[:self.page_size + 1]
+
+    def paginate_rows(self, rows):
+        """Return the page out of the rows read from ``page_queryset()``"""
+        rows = list(rows)
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.last_position = self.get_position(rows[-1]) if rows else None
+
+        return rows
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return one page of rows, or None when pagination is not asked"""
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+
+        return self.paginate_rows(queryset)
+
+    def get_next_link(self):
+        """Return the URL of the next page, if any"""
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(
+            url, self.page_size_query_param, self.page_size,
+        )
+        return replace_query_param(
+            url, self.cursor_query_param,
+            self.encode_cursor(self.last_position),
+        )
+
+    def get_paginated_response(self, data):
+        """Return the page with a link to the next one"""
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        """Describe the paginated response for the API schema"""
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        """Describe the pagination query parameters for the API schema"""
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Pagination cursor from a previous page',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': (
+                    'Number of results per page, capped at '
+                    f'{settings.API_MAX_PAGE_SIZE}'
+                ),
+                'schema': {'type': 'integer'},
+            },
+        ]
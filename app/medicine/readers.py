@@ -0,0 +1,163 @@
+"""Read path for list responses that skips the serializers
+
+Lists are the hot read of the API. A list reader selects the rendered
+columns with ``values()`` and builds the response dicts directly, so no
+model instances or serializer fields are created per row, while the data
+is exactly what the viewset's serializer returns. Viewsets opt in by
+setting ``list_reader`` (see ``ListReaderMixin``). ``select()`` narrows a
+reader to a sparse fieldset, reading only the columns it renders.
+"""
+
+import copy
+from collections import defaultdict
+from operator import itemgetter
+
+from rest_framework.response import Response
+
+from app.metrics import timed_serialize
+from core.models import Medicine
+
+
+class ListReader:
+    """Build list data for a serializer rendering plain columns"""
+    # Serializer fields, in the order it renders them
+    columns = ()
+    # Read even when not rendered, for the ordering and pagination cursor
+    key_columns = ('id', 'name')
+
+    def select(self, fields):
+        """Return a copy rendering only the given serializer fields"""
+        reader = copy.copy(self)
+        reader.columns = tuple(
+            column for column in self.columns if column in fields
+        )
+        return reader
+
+    def values(self, queryset):
+        """Return the queryset as dicts of the columns and annotations
+
+        Annotations are kept for the ordering and the pagination cursor.
+        """
+        columns = dict.fromkeys((*self.key_columns, *self.columns))
+        return queryset.prefetch_related(None).values(
+            *columns, *queryset.query.annotations,
+        )
+
+    def data(self, rows):
+        """Return the response data of values() rows"""
+        return [
+            {column: row[column] for column in self.columns} for row in rows
+        ]
+
+    async def adata(self, rows, fetch):
+        """Return the response data of values() rows, reading any related
+        rows with the async ``fetch(queryset)``"""
+        return self.data(rows)
+
+
+class SymptomListReader(ListReader):
+    """List data of ``SymptomSerializer``"""
+    columns = ('id', 'name')
+
+
+class SymptomCountListReader(ListReader):
+    """List data of ``SymptomCountSerializer``"""
+    columns = ('id', 'name', 'medicine_count')
+
+
+class MedicineListReader(ListReader):
+    """List data of ``MedicineSerializer``, nested symptoms included"""
+    columns = (
+        'id', 'name', 'ref_text', 'dispensing_size', 'dosage',
+        'precautions', 'preferred_use',
+    )
+    with_symptoms = True
+    with_match_count = True
+
+    def select(self, fields):
+        """Return a copy rendering only the given serializer fields, the
+        symptoms are only read when they are among them"""
+        reader = super().select(fields)
+        reader.with_symptoms = 'symptoms' in fields
+        reader.with_match_count = 'match_count' in fields
+        return reader
+
+    def links(self, medicine_ids):
+        """Return the query of the medicines' (medicine ID, symptom ID,
+        symptom name) links"""
+        return Medicine.symptoms.through.objects.filter(
+            medicine_id__in=medicine_ids,
+        ).values_list('medicine_id', 'symptom_id', 'symptom__name')
+
+    def symptoms(self, links):
+        """Return a map of medicine ID to its symptoms in ID order
+
+        The links are read in one query like the prefetch. Each medicine's
+        few symptoms are sorted here, an ORDER BY would sort every link.
+        """
+        symptoms = defaultdict(list)
+        for medicine_id, symptom_id, name in links:
+            symptoms[medicine_id].append({'id': symptom_id, 'name': name})
+        for items in symptoms.values():
+            items.sort(key=itemgetter('id'))
+
+        return symptoms
+
+    def build(self, rows, symptoms):
+        """Return the response data of values() rows and their symptoms"""
+        data = []
+        for row in rows:
+            item = {column: row[column] for column in self.columns}
+            if self.with_symptoms:
+                item['symptoms'] = symptoms.get(row['id'], [])
+            # Only annotated when the list is filtered by symptoms
+            if self.with_match_count and 'match_count' in row:
+                item['match_count'] = row['match_count']
+            data.append(item)
+
+        return data
+
+    def data(self, rows):
+        """Return the response data of values() rows with their symptoms"""
+        rows = list(rows)
+        links = ()
+        if rows and self.with_symptoms:
+            links = self.links([row['id'] for row in rows])
+
+        return self.build(rows, self.symptoms(links))
+
+    async def adata(self, rows, fetch):
+        """Return the response data of values() rows with their symptoms,
+        reading the links with the async ``fetch(queryset)``"""
+        links = ()
+        if rows and self.with_symptoms:
+            links = await fetch(self.links([row['id'] for row in rows]))
+
+        return self.build(rows, self.symptoms(links))
+
+
+class ListReaderMixin:
+    """Serve the list action from the viewset's ``list_reader``
+
+    Without a reader the list goes through the serializer as usual.
+    """
+    list_reader = None
+
+    def get_list_reader(self):
+        """Return the reader of the request"""
+        return self.list_reader
+
+    def list(self, request, *args, **kwargs):
+        """List the objects from values() rows"""
+        if self.list_reader is None:
+            return super().list(request, *args, **kwargs)
+
+        reader = self.get_list_reader()
+        queryset = reader.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        with timed_serialize():
+            data = reader.data(queryset if page is None else page)
+        if page is not None:
+            return self.get_paginated_response(data)
+
+        return Response(data)
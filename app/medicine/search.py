@@ -0,0 +1,72 @@
+"""Full-text and fuzzy search for medicine API"""
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramSimilarity,
+)
+from django.db import connections
+from django.db.models import (
+    F,
+    FloatField,
+    Q,
+)
+from django.db.models.functions import Greatest
+
+# Must match the configuration the search vector triggers use
+SEARCH_CONFIG = 'english'
+
+_trigram_available = {}
+
+
+def trigram_available(using='default'):
+    """Return whether pg_trgm is installed, checked once per process"""
+    if using not in _trigram_available:
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+            )
+            _trigram_available[using] = cursor.fetchone() is not None
+
+    return _trigram_available[using]
+
+
+def _search(queryset, text, related=()):
+    """Filter to rows whose own name or search vector, or the search
+    vector of one of their ``related`` rows, match the text"""
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    match = Q(search_vector=query)
+    rank = SearchRank(F('search_vector'), query)
+
+    if trigram_available(queryset.db):
+        match = match | Q(name__trigram_similar=text)
+        rank = Greatest(
+            rank, TrigramSimilarity('name', text), output_field=FloatField(),
+        )
+
+    if related:
+        # A join or subquery OR-ed into the match rules out a bitmap scan
+        # of the indexes, as branches of a UNION each use their own
+        ids = queryset.filter(match).values('id').union(*(
+            queryset.filter(**{f'{name}__search_vector': query}).values('id')
+            for name in related
+        ))
+        match = Q(id__in=ids)
+
+    return queryset.filter(match).annotate(search_rank=rank)
+
+
+def search_medicines(queryset, text):
+    """Search medicines by their text fields and their symptom names
+
+    Matches use the GIN indexed search vectors, plus the trigram index
+    on the name when pg_trgm is installed so typos still match. Rows are
+    annotated with ``search_rank`` for ordering.
+    """
+    return _search(queryset, text, related=('symptoms',))
+
+
+def search_names(queryset, text):
+    """Search rows such as symptoms by their name, annotated with
+    ``search_rank``"""
+    return _search(queryset, text)
@@ -0,0 +1,46 @@
+"""Generated catalogs for load tests and query plan checks"""
+
+from django.contrib.auth import get_user_model
+
+from core.models import (
+    Medicine,
+    Symptom,
+    normalize_symptom_name,
+)
+from medicine.bulk import link_symptoms
+
+
+def seed_catalog(email, medicines=2000, symptoms=200, links=3,
+                 password=None):
+    """Create a user with a catalog of medicines and symptoms
+
+    Each medicine is linked to ``links`` symptoms, spread evenly over the
+    symptoms. Field values are sized like the sheet the catalog is
+    imported from. Returns the user.
+    """
+    user = get_user_model().objects.create_user(
+        email=email, password=password,
+    )
+    symptom_rows = Symptom.objects.bulk_create(
+        Symptom(
+            user=user, name=f'Symptom {i}',
+            normalized_name=normalize_symptom_name(f'Symptom {i}'),
+        )
+        for i in range(symptoms)
+    )
+    medicine_rows = Medicine.objects.bulk_create(
+        Medicine(
+            user=user, name=f'Medicine {i}', ref_text=f'AFI Part-I 1:{i}',
+            dispensing_size='200 ml', dosage='12 - 24 ml in divided doses',
+            precautions='Not to be used during pregnancy and lactation',
+            preferred_use='Both',
+        )
+        for i in range(medicines)
+    )
+    link_symptoms(
+        (medicine.id, symptom_rows[(i + offset) % symptoms].id)
+        for i, medicine in enumerate(medicine_rows)
+        for offset in range(min(links, symptoms))
+    )
+
+    return user
@@ -1,56 +1,121 @@
 """Serializers for medicine API"""
 
+from operator import attrgetter
+
+from django.db import models
+
 from rest_framework import serializers
 
+from app.metrics import TimedDataMixin
 from core.models import (
     Medicine,
     Symptom,
+    normalize_symptom_name,
 )
+from medicine.bulk import resolve_symptoms
+
+
+class TimedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    """List serializer timing its data as serialization"""
+
 
-class SymptomSerializer(serializers.ModelSerializer):
+class SymptomSerializer(TimedDataMixin, serializers.ModelSerializer):
     """Serializer for symptoms"""
 
     class Meta:
         model = Symptom
         fields = ['id', 'name']
         read_only_fields = ['id']
+        list_serializer_class = TimedListSerializer
+
+    def validate_name(self, value):
+        """Reject renaming a symptom onto another one of the user's"""
+        # Nested in a medicine, names resolve to existing symptoms instead
+        if self.parent is not None:
+            return value
+
+        duplicates = Symptom.objects.filter(
+            user=self.context['request'].user,
+            normalized_name=normalize_symptom_name(value),
+        )
+        if self.instance is not None:
+            duplicates = duplicates.exclude(id=self.instance.id)
+        if duplicates.exists():
+            raise serializers.ValidationError(
+                'A symptom with this name already exists.'
+            )
+
+        return value
+
+
+class SymptomCountSerializer(SymptomSerializer):
+    """Serializer for symptoms with how many medicines use them"""
 
-class MedicineSerializer(serializers.ModelSerializer):
+    class Meta(SymptomSerializer.Meta):
+        fields = SymptomSerializer.Meta.fields + ['medicine_count']
+        read_only_fields = SymptomSerializer.Meta.read_only_fields + [
+            'medicine_count',
+        ]
+
+
+class MedicineSymptomsSerializer(serializers.ListSerializer):
+    """Symptoms of a medicine, rendered in ID order"""
+
+    def to_representation(self, data):
+        """Sort the symptoms, prefetched or not, by ID"""
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        return super().to_representation(
+            sorted(iterable, key=attrgetter('id')),
+        )
+
+
+class MedicineSerializer(TimedDataMixin, serializers.ModelSerializer):
     """Serializer for medicine objects"""
-    symptoms = SymptomSerializer(many=True, required=False)
+    symptoms = MedicineSymptomsSerializer(
+        child=SymptomSerializer(), required=False,
+    )
+    # Only present when the list is filtered by symptoms
+    match_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Medicine
         fields = [
             'id', 'name', 'ref_text', 'dispensing_size', 'dosage' ,'precautions', 'preferred_use',
-            'symptoms',
+            'symptoms', 'match_count',
         ]
         read_only_fields = ['id']
+        list_serializer_class = TimedListSerializer
+
+    def __init__(self, *args, fields=None, **kwargs):
+        """Render only ``fields`` when given, for sparse fieldsets"""
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
-    def _get_or_create_symptom(self, symptoms, medicine):
-        """Get or create symptom"""
+    def _get_or_create_symptoms(self, symptoms):
+        """Get or create the symptoms in one SELECT and one bulk INSERT"""
         auth_user = self.context['request'].user
-        for symptom in symptoms:
-            symptom_obj, create = Symptom.objects.get_or_create(
-                user=auth_user,
-                **symptom,
-            )
-            medicine.symptoms.add(symptom_obj)
+        resolved = resolve_symptoms(
+            auth_user, (symptom['name'] for symptom in symptoms),
+        )
+        return list(resolved.values())
 
     def create(self, validated_data):
         """Create a new medicine"""
         symptoms = validated_data.pop('symptoms', [])
         medicine = Medicine.objects.create(**validated_data)
-        self._get_or_create_symptom(symptoms, medicine)
+        if symptoms:
+            medicine.symptoms.add(*self._get_or_create_symptoms(symptoms))
 
         return medicine
 
     def update(self, instance, validated_data):
         """Update a medicine"""
-        symptoms = validated_data.pop('symptoms', [])
+        symptoms = validated_data.pop('symptoms', None)
         if symptoms is not None:
-            instance.symptoms.clear()
-            self._get_or_create_symptom(symptoms, instance)
+            # set() only deletes and inserts the links that changed
+            instance.symptoms.set(self._get_or_create_symptoms(symptoms))
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
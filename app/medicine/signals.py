@@ -0,0 +1,45 @@
+"""Signal handlers for medicine API
+
+Writes invalidate the catalog once they commit. Invalidating inside the
+transaction would let a concurrent read cache the data from before the
+write under the new version.
+"""
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+)
+from django.dispatch import receiver
+
+from core.models import (
+    Medicine,
+    Symptom,
+)
+from medicine.catalog import bump_catalog_version
+from medicine.symptom_index import symptom_index
+
+
+def catalog_changed(user_id):
+    """Invalidate everything derived from the user's catalog"""
+    bump_catalog_version(user_id)
+    symptom_index.invalidate(user_id)
+
+
+@receiver(m2m_changed, sender=Medicine.symptoms.through)
+def medicine_symptoms_changed(sender, instance, action, **kwargs):
+    """Invalidate the catalog when medicines gain or lose symptoms"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(partial(catalog_changed, instance.user_id))
+
+
+@receiver(post_save, sender=Medicine)
+@receiver(post_delete, sender=Medicine)
+@receiver(post_save, sender=Symptom)
+@receiver(post_delete, sender=Symptom)
+def catalog_object_changed(sender, instance, **kwargs):
+    """Invalidate the catalog when a medicine or symptom is written"""
+    transaction.on_commit(partial(catalog_changed, instance.user_id))
@@ -0,0 +1,183 @@
+"""In-process inverted index from symptom names to medicine IDs
+
+Each worker keeps, per user, a map of normalized symptom name to a sorted
+array of the IDs of medicines treating it. It is built lazily from the
+medicine/symptom links on the first symptom filter and tagged with the
+user's catalog version, so any write to the catalog (see
+``medicine.signals``) makes the next lookup rebuild it.
+"""
+
+import logging
+import sys
+import threading
+from array import array
+from collections import (
+    Counter,
+    OrderedDict,
+    defaultdict,
+    namedtuple,
+)
+
+from django.conf import settings
+from django.db.models import (
+    Case,
+    IntegerField,
+    Value,
+    When,
+)
+
+from core.models import (
+    Medicine,
+    normalize_symptom_name,
+)
+from medicine.catalog import get_catalog_version
+
+logger = logging.getLogger(__name__)
+
+_Entry = namedtuple('_Entry', ['version', 'postings', 'links', 'size'])
+
+_EMPTY = array('q')
+
+
+def _postings_size(postings):
+    """Return the approximate memory held by a user's postings in bytes"""
+    return sys.getsizeof(postings) + sum(
+        sys.getsizeof(name) + sys.getsizeof(ids)
+        for name, ids in postings.items()
+    )
+
+
+class SymptomIndex:
+    """Map of symptom name to sorted medicine IDs, per user, LRU bounded"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _build(self, user_id, version):
+        """Read the user's medicine/symptom links into sorted arrays"""
+        links = Medicine.symptoms.through.objects.filter(
+            medicine__user_id=user_id,
+        ).values_list(
+            'symptom__normalized_name', 'medicine_id',
+        ).order_by('symptom__normalized_name', 'medicine_id')
+
+        postings = {}
+        count = 0
+        for name, medicine_id in links.iterator():
+            ids = postings.get(name)
+            if ids is None:
+                ids = postings[name] = array('q')
+            ids.append(medicine_id)
+            count += 1
+
+        entry = _Entry(version, postings, count, _postings_size(postings))
+        logger.debug(
+            'Built symptom index for user %s: %d symptoms, %d links, '
+            '%d bytes', user_id, len(postings), count, entry.size,
+        )
+        return entry
+
+    def postings(self, user_id):
+        """Return the user's symptom name to medicine IDs map"""
+        version = get_catalog_version(user_id)
+        entry = self._entries.get(user_id)
+        if entry is not None and entry.version == version:
+            with self._lock:
+                if user_id in self._entries:
+                    self._entries.move_to_end(user_id)
+            return entry.postings
+
+        entry = self._build(user_id, version)
+        with self._lock:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > settings.SYMPTOM_INDEX_MAX_USERS:
+                self._entries.popitem(last=False)
+
+        return entry.postings
+
+    def match(self, user_id, symptom_names, match='any'):
+        """Return a map of medicine ID to how many of the symptoms it treats
+
+        With ``match='all'`` only medicines treating every symptom are
+        returned, found by intersecting the arrays smallest first.
+        """
+        postings = self.postings(user_id)
+        id_lists = [
+            postings.get(key, _EMPTY)
+            for key in {normalize_symptom_name(name) for name in symptom_names}
+        ]
+        if match != 'all':
+            counts = Counter()
+            for ids in id_lists:
+                counts.update(ids)
+            return counts
+
+        if not id_lists:
+            return {}
+        id_lists.sort(key=len)
+        matched = set(id_lists[0])
+        for ids in id_lists[1:]:
+            if not matched:
+                break
+            matched.intersection_update(ids)
+
+        return dict.fromkeys(matched, len(id_lists))
+
+    def invalidate(self, user_id):
+        """Drop this worker's copy of the user's index"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        """Drop every user's index"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return the memory held by the index, in total and per user"""
+        with self._lock:
+            entries = list(self._entries.items())
+
+        return {
+            'users': len(entries),
+            'bytes': sum(entry.size for _, entry in entries),
+            'per_user': {
+                user_id: {
+                    'symptoms': len(entry.postings),
+                    'links': entry.links,
+                    'bytes': entry.size,
+                }
+                for user_id, entry in entries
+            },
+        }
+
+
+symptom_index = SymptomIndex()
+
+
+def annotate_match_counts(queryset, counts):
+    """Restrict to the matched medicines and annotate ``match_count``
+
+    Medicines are grouped by count so the CASE has at most one branch per
+    requested symptom, whatever the number of matches.
+    """
+    if not counts:
+        return queryset.annotate(
+            match_count=Value(0, output_field=IntegerField()),
+        ).none()
+
+    by_count = defaultdict(list)
+    for medicine_id, count in counts.items():
+        by_count[count].append(medicine_id)
+
+    return queryset.filter(id__in=list(counts)).annotate(
+        match_count=Case(
+            *[
+                When(id__in=ids, then=Value(count))
+                for count, ids in by_count.items()
+            ],
+            output_field=IntegerField(),
+        ),
+    )
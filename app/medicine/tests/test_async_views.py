@@ -0,0 +1,219 @@
+"""Test the async read endpoints"""
+
+import asyncio
+from urllib.parse import (
+    parse_qs,
+    urlparse,
+)
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.test import (
+    TransactionTestCase,
+    override_settings,
+)
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import (
+    Medicine,
+    Symptom,
+)
+from core.testing import (
+    AuthenticatedAPIMixin,
+    create_medicine,
+)
+from medicine import async_db
+
+
+MEDICINES_URL = reverse('medicine:medicine-list')
+SYMPTOMS_URL = reverse('medicine:symptom-list')
+ASYNC_MEDICINES_URL = reverse('medicine:async-medicine-list')
+ASYNC_SYMPTOMS_URL = reverse('medicine:async-symptom-list')
+
+
+def detail_url(medicine_id):
+    """Create and return a medicine detail URL"""
+    return reverse('medicine:medicine-detail', args=[medicine_id])
+
+
+def async_detail_url(medicine_id):
+    """Create and return an async medicine detail URL"""
+    return reverse('medicine:async-medicine-detail', args=[medicine_id])
+
+
+# The async endpoints read on connections of their own, so the rows they
+# read must be committed
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class AsyncReadTests(AuthenticatedAPIMixin, TransactionTestCase):
+    """Test the async endpoints answer like the sync ones"""
+
+    def setUp(self):
+        super().setUp()
+        symptoms = [
+            Symptom.objects.create(user=self.user, name=name)
+            for name in ('Fever', 'Cough', 'Cold')
+        ]
+        self.medicines = []
+        for i in range(5):
+            medicine = create_medicine(user=self.user, name=f'Medicine {i}')
+            medicine.symptoms.add(*symptoms[i % 3:i % 3 + 2])
+            self.medicines.append(medicine)
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+        )
+        create_medicine(user=other, name='Other medicine')
+        self.token = Token.objects.create(user=self.user)
+
+    def test_medicine_list_identical(self):
+        """Test async medicine lists are the same as the sync ones"""
+        params = [
+            {},
+            {'symptoms': 'Fever,Cough'},
+            {'symptoms': 'Fever,Cough', 'match': 'all'},
+            {'q': 'medicine'},
+        ]
+
+        for query in params:
+            res = self.client.get(ASYNC_MEDICINES_URL, query)
+            expected = self.client.get(MEDICINES_URL, query)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.content, expected.content, query)
+
+    def test_medicine_pages(self):
+        """Test async medicine lists are paginated by cursor"""
+        res = self.client.get(ASYNC_MEDICINES_URL, {'page_size': 3})
+        expected = self.client.get(MEDICINES_URL, {'page_size': 3})
+        self.assertEqual(res.json()['results'], expected.json()['results'])
+
+        cursor = parse_qs(urlparse(res.json()['next']).query)['cursor'][0]
+        res = self.client.get(
+            ASYNC_MEDICINES_URL, {'page_size': 3, 'cursor': cursor},
+        )
+
+        self.assertEqual(
+            [item['name'] for item in res.json()['results']],
+            ['Medicine 1', 'Medicine 0'],
+        )
+        self.assertIsNone(res.json()['next'])
+
+    def test_medicine_detail_identical(self):
+        """Test the async medicine detail is the same as the sync one"""
+        medicine = self.medicines[0]
+
+        res = self.client.get(async_detail_url(medicine.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.content, self.client.get(detail_url(medicine.id)).content,
+        )
+
+    def test_other_users_medicine_not_found(self):
+        """Test medicines of other users are not returned"""
+        other = Medicine.objects.get(name='Other medicine')
+
+        res = self.client.get(async_detail_url(other.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(res.json(), {'detail': 'Not found.'})
+
+    def test_sparse_fieldsets_identical(self):
+        """Test async responses honour fields and expand like the sync ones"""
+        params = [
+            {'fields': 'id,name'},
+            {'fields': 'name', 'expand': 'symptoms'},
+            {'fields': 'name,match_count', 'symptoms': 'Fever'},
+        ]
+
+        for query in params:
+            res = self.client.get(ASYNC_MEDICINES_URL, query)
+            expected = self.client.get(MEDICINES_URL, query)
+
+            self.assertEqual(res.content, expected.content, query)
+
+        medicine = self.medicines[0]
+        res = self.client.get(
+            async_detail_url(medicine.id), {'fields': 'name'},
+        )
+        self.assertEqual(res.json(), {'name': 'Medicine 0'})
+
+    def test_symptom_list_identical(self):
+        """Test async symptom lists are the same as the sync ones"""
+        for query in [
+            {}, {'assigned_only': 1}, {'symptom_names': 'Fever'},
+            {'with_counts': 1},
+        ]:
+            res = self.client.get(ASYNC_SYMPTOMS_URL, query)
+
+            self.assertEqual(
+                res.content, self.client.get(SYMPTOMS_URL, query).content,
+            )
+
+    def test_errors_as_sync(self):
+        """Test invalid requests fail like on the sync endpoints"""
+        res = self.client.get(
+            ASYNC_MEDICINES_URL, {'symptoms': 'Fever', 'match': 'some'},
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(ASYNC_MEDICINES_URL, {'cursor': 'invalid'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        res = self.client.post(ASYNC_MEDICINES_URL, {})
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_auth_required(self):
+        """Test authentication is required"""
+        res = APIClient().get(ASYNC_MEDICINES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['WWW-Authenticate'], 'Token')
+
+    async def test_served_from_pool_under_asgi(self):
+        """Test ASGI requests read on the event loop's connection pool"""
+        auth = f'Token {self.token.key}'
+        try:
+            res = await self.async_client.get(
+                ASYNC_MEDICINES_URL, AUTHORIZATION=auth,
+            )
+            detail = await self.async_client.get(
+                async_detail_url(self.medicines[0].id),
+                AUTHORIZATION=auth,
+            )
+            self.assertIn(asyncio.get_running_loop(), async_db._pools)
+        finally:
+            await async_db.close_pool()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.json()), 5)
+        self.assertEqual(detail.json()['name'], 'Medicine 0')
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True)
+class AsyncResponseCacheTests(AuthenticatedAPIMixin, TransactionTestCase):
+    """Test the async endpoints share the response cache"""
+
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+        self.medicine = create_medicine(user=self.user)
+
+    def test_cached_until_write(self):
+        """Test async responses are cached until the catalog changes"""
+        first = self.client.get(ASYNC_MEDICINES_URL)
+        second = self.client.get(ASYNC_MEDICINES_URL)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.content, second.content)
+
+        self.client.patch(
+            detail_url(self.medicine.id), {'name': 'Renamed medicine'},
+        )
+        res = self.client.get(ASYNC_MEDICINES_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.json()[0]['name'], 'Renamed medicine')
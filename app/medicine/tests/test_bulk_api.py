@@ -0,0 +1,216 @@
+"""Test the bulk medicine API"""
+
+from django.urls import reverse
+from django.test import (
+    TestCase,
+    override_settings,
+)
+
+from rest_framework import status
+
+from core.models import (
+    Medicine,
+    Symptom,
+)
+from core.testing import AuthenticatedAPIMixin
+
+
+MEDICINES_URL = reverse('medicine:medicine-list')
+BULK_URL = reverse('medicine:medicine-bulk')
+
+
+def medicine_payload(name, symptoms=()):
+    """Return a sample medicine payload"""
+    return {
+        'name': name,
+        'ref_text': 'AFI',
+        'dispensing_size': '200 ml',
+        'dosage': '12 - 24 ml',
+        'precautions': 'NS',
+        'preferred_use': 'Both',
+        'symptoms': [{'name': symptom} for symptom in symptoms],
+    }
+
+
+class BulkMedicineAPITests(AuthenticatedAPIMixin, TestCase):
+    """Test creating medicines in bulk"""
+
+    def test_bulk_create(self):
+        """Test creating medicines with new and existing symptoms"""
+        fever = Symptom.objects.create(user=self.user, name='Fever')
+        payload = [
+            medicine_payload('Medicine 1', ['Fever', 'Cough']),
+            medicine_payload('Medicine 2', ['Cough', 'Cold']),
+            medicine_payload('Medicine 3'),
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 3)
+        self.assertEqual(res.data['failed'], 0)
+        self.assertEqual(
+            [row['status'] for row in res.data['results']],
+            ['created'] * 3,
+        )
+        m1 = Medicine.objects.get(id=res.data['results'][0]['id'])
+        self.assertEqual(m1.user, self.user)
+        self.assertIn(fever, m1.symptoms.all())
+        self.assertEqual(
+            set(m1.symptoms.values_list('name', flat=True)),
+            {'Fever', 'Cough'},
+        )
+        self.assertEqual(Symptom.objects.filter(user=self.user).count(), 3)
+        m3 = Medicine.objects.get(id=res.data['results'][2]['id'])
+        self.assertFalse(m3.symptoms.exists())
+
+    def test_bulk_create_query_count_is_constant(self):
+        """Test the write does not scale queries with the items sent"""
+        payload = [
+            medicine_payload(f'Medicine {i}', [f'Symptom {i}', 'Shared'])
+            for i in range(20)
+        ]
+
+        with self.assertNumQueries(7):
+            res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            Medicine.symptoms.through.objects.filter(
+                medicine__user=self.user,
+            ).count(),
+            40,
+        )
+
+    def test_partial_failure(self):
+        """Test invalid items are reported while valid ones are written"""
+        invalid = medicine_payload('Medicine 2')
+        del invalid['dosage']
+        payload = [medicine_payload('Medicine 1'), invalid]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual(res.data['failed'], 1)
+        error = res.data['results'][1]
+        self.assertEqual(error['status'], 'error')
+        self.assertIn('dosage', error['errors'])
+        self.assertTrue(
+            Medicine.objects.filter(user=self.user, name='Medicine 1').exists()
+        )
+
+    def test_all_invalid(self):
+        """Test nothing is written when every item is invalid"""
+        res = self.client.post(BULK_URL, [{'name': 'x'}, 5], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['failed'], 2)
+        self.assertFalse(Medicine.objects.exists())
+
+    def test_requires_list(self):
+        """Test a single object is rejected"""
+        payload = medicine_payload('Medicine 1')
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(MEDICINE_BULK_MAX_ITEMS=1)
+    def test_item_limit(self):
+        """Test requests over the item limit are rejected"""
+        payload = [medicine_payload('Medicine 1'), medicine_payload('M 2')]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Medicine.objects.exists())
+
+    def test_upsert(self):
+        """Test upsert updates medicines by name and replaces symptoms"""
+        self.client.post(
+            BULK_URL,
+            [medicine_payload('Medicine 1', ['Fever'])],
+            format='json',
+        )
+        updated = medicine_payload('Medicine 1', ['Cough'])
+        updated['dosage'] = '5 ml'
+        payload = [updated, medicine_payload('Medicine 2')]
+
+        res = self.client.post(
+            f'{BULK_URL}?upsert=1', payload, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['updated'], 1)
+        self.assertEqual(res.data['created'], 1)
+        medicine = Medicine.objects.get(user=self.user, name='Medicine 1')
+        self.assertEqual(medicine.dosage, '5 ml')
+        self.assertEqual(
+            list(medicine.symptoms.values_list('name', flat=True)),
+            ['Cough'],
+        )
+
+    def test_upsert_duplicate_names(self):
+        """Test a name repeated within an upsert is reported"""
+        payload = [medicine_payload('Medicine 1')] * 2
+
+        res = self.client.post(
+            f'{BULK_URL}?upsert=1', payload, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(res.data['results'][1]['status'], 'error')
+        self.assertEqual(Medicine.objects.count(), 1)
+
+    def test_upsert_shared_name(self):
+        """Test upserting a name several medicines have is rejected"""
+        self.client.post(
+            BULK_URL, [medicine_payload('Medicine 1')] * 2, format='json',
+        )
+        updated = medicine_payload('Medicine 1', ['Cough'])
+        updated['dosage'] = '5 ml'
+
+        res = self.client.post(
+            f'{BULK_URL}?upsert=1', [updated, medicine_payload('Medicine 2')],
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(res.data['failed'], 1)
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual(res.data['results'][0]['status'], 'error')
+        self.assertIn('name', res.data['results'][0]['errors'])
+        self.assertFalse(
+            Medicine.objects.filter(name='Medicine 1', dosage='5 ml').exists()
+        )
+        self.assertFalse(Symptom.objects.filter(name='Cough').exists())
+
+        res = self.client.post(
+            f'{BULK_URL}?upsert=1', [updated], format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_upsert(self):
+        """Test an upsert flag other than 0 or 1 is rejected"""
+        res = self.client.post(
+            f'{BULK_URL}?upsert=yes', [medicine_payload('Medicine 1')],
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('upsert', res.json())
+        self.assertFalse(Medicine.objects.exists())
+
+    def test_bulk_create_visible_in_list(self):
+        """Test bulk writes refresh the cached medicine list"""
+        self.client.get(MEDICINES_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                BULK_URL, [medicine_payload('Medicine 1')], format='json',
+            )
+        res = self.client.get(MEDICINES_URL)
+
+        self.assertEqual([row['name'] for row in res.data], ['Medicine 1'])
@@ -0,0 +1,149 @@
+"""Test the streaming catalog export"""
+
+import csv
+import io
+import os
+import tempfile
+
+import orjson
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import (
+    TestCase,
+    override_settings,
+)
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.management.commands.import_medicines import read_medicines
+from core.models import Symptom
+from core.testing import (
+    AuthenticatedAPIMixin,
+    create_medicine,
+)
+
+
+EXPORT_URL = reverse('medicine:medicine-export')
+
+
+class ExportTests(AuthenticatedAPIMixin, TestCase):
+    """Test exporting a user's catalog"""
+
+    def setUp(self):
+        super().setUp()
+        fever, cough = [
+            Symptom.objects.create(user=self.user, name=name)
+            for name in ('Fever', 'Cough')
+        ]
+        create_medicine(self.user, name='Bilvadi gutika').symptoms.add(
+            fever, cough,
+        )
+        create_medicine(self.user, name='Abhayarishta', dosage='5 ml')
+        create_medicine(self.user, name='Chitrakadi vati').symptoms.add(
+            cough,
+        )
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+        )
+        create_medicine(other, name='Other medicine')
+
+    def export(self, **params):
+        """Export the catalog and return the response and its body"""
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res, b''.join(res.streaming_content)
+
+    def test_export_ndjson(self):
+        """Test medicines are streamed one per line, ready to push back"""
+        res, body = self.export()
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(
+            res['Content-Disposition'],
+            'attachment; filename="medicines.ndjson"',
+        )
+        items = [orjson.loads(line) for line in body.splitlines()]
+        self.assertEqual(
+            [item['name'] for item in items],
+            ['Abhayarishta', 'Bilvadi gutika', 'Chitrakadi vati'],
+        )
+        self.assertEqual(items[1], {
+            'name': 'Bilvadi gutika',
+            'ref_text': 'AFI',
+            'dispensing_size': '200 ml',
+            'dosage': '12 - 24 ml',
+            'precautions': 'NS',
+            'preferred_use': 'Both',
+            'symptoms': [{'name': 'Fever'}, {'name': 'Cough'}],
+        })
+        self.assertEqual(items[0]['symptoms'], [])
+
+    def test_export_csv(self):
+        """Test CSV rows follow the sheet layout, one per symptom"""
+        res, body = self.export(file_format='csv')
+
+        self.assertEqual(res['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.reader(io.StringIO(body.decode())))
+        self.assertEqual(rows, [
+            ['Abhayarishta', 'AFI', '200 ml', '5 ml', 'NS', 'Both', ''],
+            ['Bilvadi gutika', 'AFI', '200 ml', '12 - 24 ml', 'NS', 'Both',
+             'Fever'],
+            ['Bilvadi gutika', 'AFI', '200 ml', '12 - 24 ml', 'NS', 'Both',
+             'Cough'],
+            ['Chitrakadi vati', 'AFI', '200 ml', '12 - 24 ml', 'NS', 'Both',
+             'Cough'],
+        ])
+
+    def test_export_xlsx(self):
+        """Test the workbook reads back like final_data.xlsx"""
+        res, body = self.export(file_format='xlsx')
+
+        self.assertEqual(
+            res['Content-Type'],
+            'application/vnd.openxmlformats-officedocument.spreadsheetml.'
+            'sheet',
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'medicines.xlsx')
+            with open(path, 'wb') as f:
+                f.write(body)
+            medicines = list(read_medicines(path))
+
+        self.assertEqual(
+            [(medicine['name'], symptoms, rows)
+             for medicine, symptoms, rows in medicines],
+            [
+                ('Abhayarishta', [], 1),
+                ('Bilvadi gutika', ['Fever', 'Cough'], 2),
+                ('Chitrakadi vati', ['Cough'], 1),
+            ],
+        )
+        self.assertEqual(medicines[0][0]['dosage'], '5 ml')
+
+    @override_settings(MEDICINE_EXPORT_CHUNK_SIZE=2)
+    def test_symptoms_read_per_chunk(self):
+        """Test one symptom query is run per chunk of medicines"""
+        res = self.client.get(EXPORT_URL)
+
+        # The medicines through the cursor, then the symptoms of each
+        # chunk of two
+        with self.assertNumQueries(3):
+            body = b''.join(res.streaming_content)
+
+        self.assertEqual(len(body.splitlines()), 3)
+
+    def test_unknown_format(self):
+        """Test an unknown format is rejected"""
+        res = self.client.get(EXPORT_URL, {'file_format': 'pdf'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('file_format', res.json())
+
+    def test_auth_required(self):
+        """Test authentication is required"""
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,183 @@
+"""Test sparse fieldsets and symptom expansion on medicine endpoints"""
+
+from unittest.mock import patch
+from urllib.parse import (
+    parse_qs,
+    urlparse,
+)
+
+from django.db import connection
+from django.urls import reverse
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework import status
+
+from core.models import Symptom
+from core.testing import (
+    AuthenticatedAPIMixin,
+    create_medicine,
+)
+from medicine.views import MedicineViewSet
+
+
+MEDICINES_URL = reverse('medicine:medicine-list')
+
+
+def detail_url(medicine_id):
+    """Create and return a medicine detail URL"""
+    return reverse('medicine:medicine-detail', args=[medicine_id])
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class SparseFieldsetTests(AuthenticatedAPIMixin, TestCase):
+    """Test ?fields= and ?expand= on medicine endpoints"""
+
+    def setUp(self):
+        super().setUp()
+        symptoms = [
+            Symptom.objects.create(user=self.user, name=name)
+            for name in ('Fever', 'Cough', 'Cold')
+        ]
+        self.medicines = []
+        for i in range(4):
+            medicine = create_medicine(user=self.user, name=f'Medicine {i}')
+            medicine.symptoms.add(*symptoms[i % 3:i % 3 + 2])
+            self.medicines.append(medicine)
+
+    def test_list_fields(self):
+        """Test only the listed fields are returned, without symptoms"""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(MEDICINES_URL, {'fields': 'id,name'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), [
+            {'id': medicine.id, 'name': medicine.name}
+            for medicine in reversed(self.medicines)
+        ])
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn('precautions', ctx.captured_queries[0]['sql'])
+
+    def test_list_expand_symptoms(self):
+        """Test symptoms are returned with the fields when expanded"""
+        full = self.client.get(MEDICINES_URL).json()
+
+        for params in [
+            {'fields': 'name', 'expand': 'symptoms'},
+            {'fields': 'name,symptoms'},
+        ]:
+            res = self.client.get(MEDICINES_URL, params)
+
+            self.assertEqual(res.json(), [
+                {'name': item['name'], 'symptoms': item['symptoms']}
+                for item in full
+            ])
+
+    def test_expand_without_fields(self):
+        """Test expand alone returns every field, as by default"""
+        res = self.client.get(MEDICINES_URL, {'expand': 'symptoms'})
+
+        self.assertEqual(res.content, self.client.get(MEDICINES_URL).content)
+
+    def test_match_count_field(self):
+        """Test the symptom match count is returned only when listed"""
+        params = {'symptoms': 'Fever,Cough', 'match': 'all'}
+
+        res = self.client.get(MEDICINES_URL, {**params, 'fields': 'name'})
+        self.assertEqual(
+            res.json(), [{'name': 'Medicine 3'}, {'name': 'Medicine 0'}],
+        )
+
+        res = self.client.get(
+            MEDICINES_URL, {**params, 'fields': 'name,match_count'},
+        )
+        self.assertEqual(res.json(), [
+            {'name': 'Medicine 3', 'match_count': 2},
+            {'name': 'Medicine 0', 'match_count': 2},
+        ])
+
+    def test_pages_without_ordering_fields(self):
+        """Test the cursor works when the ordering fields are not returned"""
+        res = self.client.get(
+            MEDICINES_URL, {'fields': 'dosage', 'page_size': 3},
+        )
+        self.assertEqual(res.json()['results'], [{'dosage': '12 - 24 ml'}] * 3)
+
+        cursor = parse_qs(urlparse(res.json()['next']).query)['cursor'][0]
+        res = self.client.get(MEDICINES_URL, {
+            'fields': 'id', 'page_size': 3, 'cursor': cursor,
+        })
+
+        self.assertEqual(res.json()['results'], [{'id': self.medicines[0].id}])
+
+    def test_serializer_path_identical(self):
+        """Test lists rendered by the serializer honour the fieldset"""
+        params = [
+            {'fields': 'id,name'},
+            {'fields': 'name,preferred_use', 'expand': 'symptoms'},
+            {'fields': 'name,match_count', 'symptoms': 'Fever'},
+            {'fields': 'id', 'page_size': 2},
+        ]
+
+        for query in params:
+            fast = self.client.get(MEDICINES_URL, query)
+            with patch.object(MedicineViewSet, 'list_reader', None):
+                with CaptureQueriesContext(connection) as ctx:
+                    slow = self.client.get(MEDICINES_URL, query)
+
+            self.assertEqual(fast.content, slow.content, query)
+            if 'expand' not in query:
+                self.assertEqual(len(ctx.captured_queries), 1, query)
+
+    def test_detail_fields(self):
+        """Test the detail returns and reads only the listed fields"""
+        medicine = self.medicines[0]
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(
+                detail_url(medicine.id), {'fields': 'id,dosage'},
+            )
+
+        self.assertEqual(
+            res.json(), {'id': medicine.id, 'dosage': '12 - 24 ml'},
+        )
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn('precautions', ctx.captured_queries[0]['sql'])
+
+        res = self.client.get(
+            detail_url(medicine.id), {'fields': 'name', 'expand': 'symptoms'},
+        )
+        self.assertEqual(res.json(), {
+            'name': 'Medicine 0',
+            'symptoms': [
+                {'id': symptom.id, 'name': symptom.name}
+                for symptom in medicine.symptoms.order_by('id')
+            ],
+        })
+
+    def test_writes_return_every_field(self):
+        """Test fieldsets only apply to reads"""
+        medicine = self.medicines[0]
+
+        res = self.client.patch(
+            f'{detail_url(medicine.id)}?fields=id', {'dosage': '5 ml'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['dosage'], '5 ml')
+        self.assertIn('symptoms', res.json())
+
+    def test_unknown_fields_rejected(self):
+        """Test unknown fields and expansions are rejected"""
+        res = self.client.get(MEDICINES_URL, {'fields': 'id,user'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('user', res.json()['fields'])
+
+        res = self.client.get(
+            detail_url(self.medicines[0].id), {'expand': 'user'},
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('expand', res.json())
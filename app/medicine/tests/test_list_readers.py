@@ -0,0 +1,132 @@
+"""Test the values() read path of list responses"""
+
+from unittest.mock import patch
+from urllib.parse import (
+    parse_qs,
+    urlparse,
+)
+
+from django.db.models import Count
+from django.urls import reverse
+from django.test import (
+    TestCase,
+    override_settings,
+)
+
+
+from app.renderers import ORJSONRenderer
+from core.models import (
+    Medicine,
+    Symptom,
+)
+from core.testing import (
+    AuthenticatedAPIMixin,
+    create_medicine,
+)
+from medicine.readers import (
+    MedicineListReader,
+    SymptomListReader,
+)
+from medicine.serializers import (
+    MedicineSerializer,
+    SymptomSerializer,
+)
+from medicine.views import (
+    MedicineViewSet,
+    SymptomViewSet,
+)
+
+
+MEDICINES_URL = reverse('medicine:medicine-list')
+SYMPTOMS_URL = reverse('medicine:symptom-list')
+
+
+def render(data):
+    """Return data as the API renders it"""
+    return ORJSONRenderer().render(data)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class ListReaderTests(AuthenticatedAPIMixin, TestCase):
+    """Test list readers return exactly what the serializers do"""
+
+    def setUp(self):
+        super().setUp()
+        symptoms = [
+            Symptom.objects.create(user=self.user, name=name)
+            for name in ('Fever', 'Cough', 'Cold', 'Headache')
+        ]
+        for i in range(6):
+            medicine = create_medicine(
+                user=self.user, name=f'Medicine {i % 4}',
+                precautions=f'Avoid ✓ {i}',
+            )
+            # Link in reverse ID order, the response is in ID order
+            medicine.symptoms.add(*reversed(symptoms[i % 3:i % 3 + 2]))
+        create_medicine(user=self.user, name='No symptoms')
+
+    def test_medicine_reader_matches_serializer(self):
+        """Test the medicine reader renders like MedicineSerializer"""
+        reader = MedicineListReader()
+        querysets = [
+            Medicine.objects.order_by('-name', 'id'),
+            Medicine.objects.filter(
+                symptoms__name__in=['Fever', 'Cough'],
+            ).annotate(
+                match_count=Count('symptoms__name', distinct=True),
+            ).order_by('-match_count', '-name', 'id'),
+        ]
+
+        for queryset in querysets:
+            expected = MedicineSerializer(queryset, many=True).data
+
+            data = reader.data(reader.values(queryset))
+
+            self.assertEqual(render(data), render(expected))
+
+    def test_symptom_reader_matches_serializer(self):
+        """Test the symptom reader renders like SymptomSerializer"""
+        reader = SymptomListReader()
+        queryset = Symptom.objects.order_by('-name', 'id')
+        expected = SymptomSerializer(queryset, many=True).data
+
+        data = reader.data(reader.values(queryset))
+
+        self.assertEqual(render(data), render(expected))
+
+    def test_medicine_list_responses_identical(self):
+        """Test every medicine list variant is byte-identical"""
+        first_page = self.client.get(MEDICINES_URL, {'page_size': 3})
+        cursor = parse_qs(urlparse(first_page.data['next']).query)['cursor']
+        params = [
+            {},
+            {'symptoms': 'Fever,Cough'},
+            {'symptoms': 'Fever,Cough', 'match': 'all'},
+            {'q': 'medicine'},
+            {'page_size': 3},
+            {'page_size': 3, 'cursor': cursor[0]},
+        ]
+
+        for query in params:
+            fast = self.client.get(MEDICINES_URL, query)
+            with patch.object(MedicineViewSet, 'list_reader', None):
+                slow = self.client.get(MEDICINES_URL, query)
+
+            self.assertEqual(fast.status_code, 200)
+            self.assertEqual(fast.content, slow.content, query)
+
+    def test_symptom_list_responses_identical(self):
+        """Test every symptom list variant is byte-identical"""
+        params = [{}, {'assigned_only': 1}, {'symptom_names': 'Fever,Cold'}]
+
+        for query in params:
+            fast = self.client.get(SYMPTOMS_URL, query)
+            with patch.object(SymptomViewSet, 'list_reader', None):
+                slow = self.client.get(SYMPTOMS_URL, query)
+
+            self.assertEqual(fast.content, slow.content, query)
+
+    def test_medicine_list_queries(self):
+        """Test the medicine list reads rows and links in two queries"""
+        with self.assertNumQueries(2):
+            self.client.get(MEDICINES_URL)
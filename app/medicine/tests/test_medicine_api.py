@@ -252,6 +252,27 @@ class PrivateMedicineAPITests(TestCase):
             ).exists()
             self.assertTrue(exists)
 
+    def test_create_medicine_matches_symptom_names_normalized(self):
+        """Test symptom names differing in case or spacing reuse a symptom"""
+        symptom = Symptom.objects.create(user=self.user, name='High fever')
+        payload = {
+            'name': 'Sample medicine',
+            'ref_text': 'AFI',
+            'dispensing_size': '200 ml',
+            'dosage': '12 - 24 ml',
+            'precautions': 'NS',
+            'preferred_use': 'Both',
+            'symptoms': [{'name': 'high  FEVER '}, {'name': 'Cough'},
+                         {'name': 'cough'}],
+        }
+        res = self.client.post(MEDICINES_URL, payload, format = 'json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        medicine = Medicine.objects.get(id=res.data['id'])
+        self.assertEqual(medicine.symptoms.count(), 2)
+        self.assertIn(symptom, medicine.symptoms.all())
+        self.assertEqual(Symptom.objects.filter(user=self.user).count(), 2)
+
     def test_create_symptom_on_update(self):
         """Test creating a symptom on updating a medicine"""
         medicine = create_medicine(user=self.user)
@@ -302,6 +323,116 @@ class PrivateMedicineAPITests(TestCase):
         s1 = MedicineSerializer(m1)
         s2 = MedicineSerializer(m2)
         s3 = MedicineSerializer(m3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn({**s1.data, 'match_count': 1}, res.data)
+        self.assertIn({**s2.data, 'match_count': 1}, res.data)
+        self.assertNotIn(s3.data['id'], [row['id'] for row in res.data])
+
+    def test_filter_medicine_by_symptoms_normalized(self):
+        """Test the symptoms filter ignores case and extra spacing"""
+        medicine = create_medicine(user=self.user)
+        symptom = Symptom.objects.create(user=self.user, name='High fever')
+        medicine.symptoms.add(symptom)
+
+        res = self.client.get(MEDICINES_URL, {'symptoms': 'HIGH  fever'})
+
+        self.assertEqual([row['id'] for row in res.data], [medicine.id])
+
+    def test_filter_medicine_ranked_by_match_count(self):
+        """Test medicines matching more symptoms are listed first"""
+        s1 = Symptom.objects.create(user=self.user, name='Fever')
+        s2 = Symptom.objects.create(user=self.user, name='Cough')
+        s3 = Symptom.objects.create(user=self.user, name='Cold')
+        m1 = create_medicine(user=self.user, name='Z medicine')
+        m1.symptoms.add(s1)
+        m2 = create_medicine(user=self.user, name='A medicine')
+        m2.symptoms.add(s1, s2, s3)
+        m3 = create_medicine(user=self.user, name='B medicine')
+        m3.symptoms.add(s2, s3)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(MEDICINES_URL, {'symptoms': 'Fever,Cough,Cold'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row['id'], row['match_count']) for row in res.data],
+            [(m2.id, 3), (m3.id, 2), (m1.id, 1)],
+        )
+
+    def test_filter_medicine_match_all(self):
+        """Test match=all only returns medicines treating every symptom"""
+        s1 = Symptom.objects.create(user=self.user, name='Fever')
+        s2 = Symptom.objects.create(user=self.user, name='Cough')
+        m1 = create_medicine(user=self.user, name='Sample medicine 1')
+        m1.symptoms.add(s1, s2)
+        m2 = create_medicine(user=self.user, name='Sample medicine 2')
+        m2.symptoms.add(s1)
+
+        params = {'symptoms': 'Fever,Cough,Fever', 'match': 'all'}
+        res = self.client.get(MEDICINES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in res.data], [m1.id])
+        self.assertEqual(res.data[0]['match_count'], 2)
+
+    def test_filter_medicine_invalid_match(self):
+        """Test an unknown match mode returns an error"""
+        params = {'symptoms': 'Fever', 'match': 'some'}
+        res = self.client.get(MEDICINES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_medicine_symptom_queries_constant(self):
+        """Test creating with many symptoms resolves them in bulk"""
+        Symptom.objects.create(user=self.user, name='Symptom 0')
+        payload = {
+            'name': 'Sample medicine',
+            'ref_text': 'AFI',
+            'dispensing_size': '200 ml',
+            'dosage': '12 - 24 ml',
+            'precautions': 'NS',
+            'preferred_use': 'Both',
+            'symptoms': [{'name': f'Symptom {i}'} for i in range(15)],
+        }
+
+        # Insert medicine, resolve symptoms (3), link them (2), render
+        with self.assertNumQueries(7):
+            res = self.client.post(MEDICINES_URL, payload, format = 'json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        medicine = Medicine.objects.get(id=res.data['id'])
+        self.assertEqual(medicine.symptoms.count(), 15)
+        self.assertEqual(Symptom.objects.filter(user=self.user).count(), 15)
+
+    def test_update_medicine_keeps_unchanged_symptom_links(self):
+        """Test updating symptoms only touches the links that changed"""
+        symptom1 = Symptom.objects.create(user=self.user, name='Sample symptom 1')
+        symptom2 = Symptom.objects.create(user=self.user, name='Sample symptom 2')
+        medicine = create_medicine(user=self.user)
+        medicine.symptoms.add(symptom1, symptom2)
+        through = Medicine.symptoms.through
+        kept = through.objects.get(medicine=medicine, symptom=symptom1)
+
+        payload = {'symptoms': [
+            {'name': 'Sample symptom 1'}, {'name': 'Sample symptom 3'},
+        ]}
+        url = detail_url(medicine.id)
+        res = self.client.patch(url, payload, format = 'json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(through.objects.filter(id=kept.id).exists())
+        self.assertEqual(
+            set(medicine.symptoms.values_list('name', flat=True)),
+            {'Sample symptom 1', 'Sample symptom 3'},
+        )
+
+    def test_partial_update_without_symptoms_keeps_them(self):
+        """Test patching other fields leaves the symptoms alone"""
+        symptom = Symptom.objects.create(user=self.user, name='Sample symptom')
+        medicine = create_medicine(user=self.user)
+        medicine.symptoms.add(symptom)
+
+        url = detail_url(medicine.id)
+        res = self.client.patch(url, {'dosage': '5 ml'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(symptom, medicine.symptoms.all())
@@ -0,0 +1,155 @@
+"""Test keyset pagination of the medicine API"""
+
+import json
+from base64 import urlsafe_b64encode
+
+from django.urls import reverse
+from django.test import (
+    TestCase,
+    override_settings,
+)
+
+from rest_framework import status
+
+from core.models import (
+    Medicine,
+    Symptom,
+)
+from core.testing import (
+    AuthenticatedAPIMixin,
+    create_medicine,
+)
+
+
+MEDICINES_URL = reverse('medicine:medicine-list')
+SYMPTOMS_URL = reverse('medicine:symptom-list')
+
+
+class KeysetPaginationTests(AuthenticatedAPIMixin, TestCase):
+    """Test paginating medicine and symptom lists"""
+
+    def _walk(self, url, params):
+        """Follow next links and return the ids of every page"""
+        pages = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append([row['id'] for row in res.data['results']])
+            if not res.data['next']:
+                return pages
+            res = self.client.get(res.data['next'])
+
+    def test_unpaginated_by_default(self):
+        """Test lists are returned whole unless a page is requested"""
+        create_medicine(user=self.user)
+
+        res = self.client.get(MEDICINES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res.data, list)
+
+    def test_pages_cover_all_rows_in_order(self):
+        """Test walking pages returns each medicine once in list order"""
+        for name in ['b', 'a', 'c', 'b', 'a']:
+            create_medicine(user=self.user, name=name)
+
+        pages = self._walk(MEDICINES_URL, {'page_size': 2})
+
+        expected = list(
+            Medicine.objects.order_by('-name', 'id').values_list(
+                'id', flat=True,
+            )
+        )
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_rows_inserted_before_cursor_do_not_shift_pages(self):
+        """Test inserts ahead of the cursor do not repeat served rows"""
+        for name in ['d', 'c', 'b', 'a']:
+            create_medicine(user=self.user, name=name)
+
+        res = self.client.get(MEDICINES_URL, {'page_size': 2})
+        create_medicine(user=self.user, name='z')
+        res = self.client.get(res.data['next'])
+
+        names = [row['name'] for row in res.data['results']]
+        self.assertEqual(names, ['b', 'a'])
+        self.assertIsNone(res.data['next'])
+
+    def test_deep_page_uses_keyset_filter(self):
+        """Test later pages filter on the cursor instead of offsetting"""
+        for name in ['c', 'b', 'a']:
+            create_medicine(user=self.user, name=name)
+        res = self.client.get(MEDICINES_URL, {'page_size': 1})
+
+        with self.assertNumQueries(2) as ctx:
+            self.client.get(res.data['next'])
+
+        sql = ctx.captured_queries[0]['sql']
+        self.assertNotIn('OFFSET', sql)
+        self.assertIn('"core_medicine"."name" <', sql)
+
+    @override_settings(API_MAX_PAGE_SIZE=2)
+    def test_page_size_capped(self):
+        """Test the page size cannot exceed the configured maximum"""
+        for name in ['c', 'b', 'a']:
+            create_medicine(user=self.user, name=name)
+
+        res = self.client.get(MEDICINES_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor returns not found"""
+        res = self.client.get(MEDICINES_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tampered_cursor(self):
+        """Test a cursor with values that do not fit the ordering returns
+        not found"""
+        Symptom.objects.create(user=self.user, name='Fever')
+        cases = [
+            ({}, [{'x': 1}, 'a']),
+            ({}, ['a', 'b']),
+            ({}, ['a', True]),
+            ({'symptoms': 'Fever'}, ['many', 'a', 1]),
+        ]
+
+        for params, position in cases:
+            cursor = urlsafe_b64encode(json.dumps(position).encode())
+            res = self.client.get(
+                MEDICINES_URL, {**params, 'cursor': cursor.decode()},
+            )
+
+            self.assertEqual(
+                res.status_code, status.HTTP_404_NOT_FOUND, position,
+            )
+
+    def test_paginate_symptoms(self):
+        """Test symptom lists paginate the same way"""
+        for name in ['x', 'y', 'z']:
+            Symptom.objects.create(user=self.user, name=name)
+
+        pages = self._walk(SYMPTOMS_URL, {'page_size': 2})
+
+        self.assertEqual([len(page) for page in pages], [2, 1])
+
+    def test_paginate_ranked_symptom_match(self):
+        """Test pages of a ranked symptom search keep the ranking"""
+        fever = Symptom.objects.create(user=self.user, name='Fever')
+        cough = Symptom.objects.create(user=self.user, name='Cough')
+        for name in ['a', 'b', 'c']:
+            create_medicine(user=self.user, name=name).symptoms.add(fever)
+        both = create_medicine(user=self.user, name='d')
+        both.symptoms.add(fever, cough)
+
+        pages = self._walk(
+            MEDICINES_URL, {'symptoms': 'Fever,Cough', 'page_size': 2},
+        )
+
+        ids = sum(pages, [])
+        self.assertEqual(len(ids), 4)
+        self.assertEqual(ids[0], both.id)
+        self.assertEqual(len(set(ids)), 4)
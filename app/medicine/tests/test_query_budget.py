@@ -0,0 +1,77 @@
+"""Test the query count of the medicine API stays flat as data grows"""
+
+from itertools import count
+
+from django.urls import reverse
+from django.test import TestCase
+
+
+from core.models import Symptom
+from core.testing import (
+    AuthenticatedAPIMixin,
+    QueryBudgetMixin,
+    create_medicine,
+)
+
+
+MEDICINES_URL = reverse('medicine:medicine-list')
+SYMPTOMS_URL = reverse('medicine:symptom-list')
+
+_seq = count()
+
+
+def medicine_detail_url(medicine_id):
+    """Create and return a medicine detail URL"""
+    return reverse('medicine:medicine-detail', args=[medicine_id])
+
+
+def create_symptom(user):
+    """Create and return a sample symptom"""
+    return Symptom.objects.create(user=user, name=f'Symptom {next(_seq)}')
+
+
+class QueryBudgetTests(AuthenticatedAPIMixin, QueryBudgetMixin, TestCase):
+    """Test list and retrieve endpoints have a fixed query budget"""
+
+    def _add_medicine_with_symptoms(self):
+        medicine = create_medicine(user=self.user)
+        medicine.symptoms.add(
+            create_symptom(self.user),
+            create_symptom(self.user),
+        )
+
+    def test_medicine_list_budget(self):
+        """Test listing medicines does not query symptoms per row"""
+        self.assertConstantQueries(
+            MEDICINES_URL, self._add_medicine_with_symptoms, budget=2,
+        )
+
+    def test_medicine_list_filtered_budget(self):
+        """Test filtering medicines by symptom keeps a fixed budget"""
+        symptom = create_symptom(self.user)
+
+        def grow():
+            medicine = create_medicine(user=self.user)
+            medicine.symptoms.add(symptom, create_symptom(self.user))
+
+        self.assertConstantQueries(
+            MEDICINES_URL, grow, budget=2, params={'symptoms': symptom.name},
+        )
+
+    def test_medicine_detail_budget(self):
+        """Test retrieving a medicine does not query per symptom"""
+        medicine = create_medicine(user=self.user)
+
+        def grow():
+            medicine.symptoms.add(create_symptom(self.user))
+
+        self.assertConstantQueries(
+            medicine_detail_url(medicine.id), grow, budget=2,
+        )
+
+    def test_symptom_list_budget(self):
+        """Test listing symptoms keeps a fixed budget"""
+        self.assertConstantQueries(
+            SYMPTOMS_URL, self._add_medicine_with_symptoms, budget=1,
+            params={'assigned_only': 1},
+        )
@@ -0,0 +1,158 @@
+"""Test the response cache of the medicine API"""
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.test import (
+    Client,
+    TestCase,
+    override_settings,
+)
+
+from rest_framework import status
+
+from core.models import Symptom
+from core.testing import (
+    AuthenticatedAPIMixin,
+    create_medicine,
+)
+from medicine.cache import response_cache_stats
+
+
+MEDICINES_URL = reverse('medicine:medicine-list')
+SYMPTOMS_URL = reverse('medicine:symptom-list')
+
+
+def detail_url(medicine_id):
+    """Create and return a medicine detail URL"""
+    return reverse('medicine:medicine-detail', args=[medicine_id])
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True)
+class ResponseCacheTests(AuthenticatedAPIMixin, TestCase):
+    """Test caching list and retrieve responses"""
+
+    def setUp(self):
+        cache.clear()
+        response_cache_stats.reset()
+        super().setUp()
+        self.medicine = create_medicine(user=self.user)
+
+    def test_repeated_list_served_from_cache(self):
+        """Test a repeated list request runs no queries"""
+        first = self.client.get(MEDICINES_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(MEDICINES_URL)
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(
+            response_cache_stats.snapshot(),
+            {'hits': 1, 'misses': 1, 'hit_rate': 0.5},
+        )
+
+    def test_counters_exported(self):
+        """Test the hit and miss counters are exported for Prometheus"""
+        self.client.get(MEDICINES_URL)
+        self.client.get(MEDICINES_URL)
+
+        res = Client().get(reverse('metrics'))
+
+        body = res.content.decode()
+        self.assertIn(
+            'ayushpi_cache_requests_total'
+            '{cache="responses",outcome="hit"} 1',
+            body,
+        )
+        self.assertIn(
+            'ayushpi_cache_requests_total'
+            '{cache="responses",outcome="miss"} 1',
+            body,
+        )
+
+    def test_query_params_keyed_separately(self):
+        """Test different query params are cached separately"""
+        self.client.get(MEDICINES_URL)
+        res = self.client.get(MEDICINES_URL, {'symptoms': 'Fever'})
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data, [])
+
+    def test_users_keyed_separately(self):
+        """Test one user's cached list is not served to another"""
+        self.client.get(MEDICINES_URL)
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(MEDICINES_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data, [])
+
+    def test_api_write_invalidates(self):
+        """Test writing through the API refreshes cached responses"""
+        self.client.get(MEDICINES_URL)
+        self.client.get(detail_url(self.medicine.id))
+
+        payload = {'name': 'Renamed medicine'}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(detail_url(self.medicine.id), payload)
+
+        res = self.client.get(MEDICINES_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data[0]['name'], 'Renamed medicine')
+        res = self.client.get(detail_url(self.medicine.id))
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['name'], 'Renamed medicine')
+
+    def test_symptom_write_invalidates(self):
+        """Test changing a symptom refreshes the symptom list"""
+        symptom = Symptom.objects.create(user=self.user, name='Fever')
+        self.client.get(SYMPTOMS_URL)
+
+        url = reverse('medicine:symptom-detail', args=[symptom.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(url, {'name': 'High fever'})
+
+        res = self.client.get(SYMPTOMS_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data[0]['name'], 'High fever')
+
+    def test_admin_write_invalidates(self):
+        """Test editing a medicine in the admin refreshes cached responses"""
+        self.client.get(MEDICINES_URL)
+        admin = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='test123',
+        )
+        admin_client = Client()
+        admin_client.force_login(admin)
+
+        url = reverse('admin:core_medicine_delete', args=[self.medicine.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            admin_client.post(url, {'post': 'yes'})
+
+        res = self.client.get(MEDICINES_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data, [])
+
+    def test_errors_not_cached(self):
+        """Test error responses are not cached"""
+        self.client.get(detail_url(0))
+        res = self.client.get(detail_url(0))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response_cache_stats.snapshot()['hits'], 0)
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_disabled(self):
+        """Test the cache can be switched off"""
+        self.client.get(MEDICINES_URL)
+        res = self.client.get(MEDICINES_URL)
+
+        self.assertNotIn('X-Cache', res)
@@ -0,0 +1,132 @@
+"""Test searching the medicine API"""
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.urls import reverse
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework import status
+
+from core.models import Symptom
+from core.testing import (
+    AuthenticatedAPIMixin,
+    create_medicine,
+)
+from medicine.search import trigram_available
+
+
+MEDICINES_URL = reverse('medicine:medicine-list')
+SYMPTOMS_URL = reverse('medicine:symptom-list')
+
+
+class SearchAPITests(AuthenticatedAPIMixin, TestCase):
+    """Test the q search parameter"""
+
+    def _ids(self, url, q):
+        res = self.client.get(url, {'q': q})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [row['id'] for row in res.data]
+
+    def _require_trigram(self):
+        if not trigram_available(connection.alias):
+            self.skipTest('pg_trgm is not installed')
+
+    def test_search_medicine_text_fields(self):
+        """Test medicines are found by words in their text fields"""
+        m1 = create_medicine(
+            user=self.user, name='Ashwagandha Churna',
+            precautions='Avoid during pregnancy',
+        )
+        create_medicine(user=self.user, name='Triphala Churna')
+
+        self.assertEqual(self._ids(MEDICINES_URL, 'pregnancy'), [m1.id])
+        self.assertEqual(self._ids(MEDICINES_URL, 'ashwagandha'), [m1.id])
+
+    def test_search_medicine_ranks_name_first(self):
+        """Test a name match ranks above a precautions match"""
+        m1 = create_medicine(
+            user=self.user, name='Z tablet', precautions='Contains guggulu',
+        )
+        m2 = create_medicine(user=self.user, name='A guggulu')
+
+        self.assertEqual(self._ids(MEDICINES_URL, 'guggulu'), [m2.id, m1.id])
+
+    def test_search_medicine_by_symptom_name(self):
+        """Test medicines are found through their symptom names"""
+        symptom = Symptom.objects.create(user=self.user, name='Itching')
+        m1 = create_medicine(user=self.user)
+        m1.symptoms.add(symptom)
+        create_medicine(user=self.user)
+
+        self.assertEqual(self._ids(MEDICINES_URL, 'itch'), [m1.id])
+
+    def test_search_medicine_branches_listed_once(self):
+        """Test a medicine matched by its text and several symptoms is
+        listed once, the symptom match run as its own branch"""
+        medicine = create_medicine(user=self.user, name='Itch relief')
+        medicine.symptoms.add(
+            Symptom.objects.create(user=self.user, name='Itching'),
+            Symptom.objects.create(user=self.user, name='Itchy eyes'),
+        )
+
+        with CaptureQueriesContext(connection) as ctx:
+            ids = self._ids(MEDICINES_URL, 'itch')
+
+        self.assertEqual(ids, [medicine.id])
+        self.assertTrue(any(
+            'UNION' in query['sql'] for query in ctx.captured_queries
+        ))
+
+    def test_search_follows_updates(self):
+        """Test edits to a medicine are reflected in search results"""
+        medicine = create_medicine(user=self.user)
+        medicine.precautions = 'Diabetes'
+        medicine.save()
+
+        self.assertEqual(self._ids(MEDICINES_URL, 'diabetes'), [medicine.id])
+
+    def test_search_limited_to_user(self):
+        """Test search only returns the user's medicines"""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='test123',
+        )
+        create_medicine(user=other, name='Dashamoola')
+
+        self.assertEqual(self._ids(MEDICINES_URL, 'dashamoola'), [])
+
+    def test_search_symptoms(self):
+        """Test symptoms are searched by name"""
+        s1 = Symptom.objects.create(user=self.user, name='Dry cough')
+        Symptom.objects.create(user=self.user, name='Fever')
+
+        self.assertEqual(self._ids(SYMPTOMS_URL, 'coughing'), [s1.id])
+
+    def test_search_uses_index_lookup(self):
+        """Test the search filters on the indexed search vector"""
+        create_medicine(user=self.user, name='Fever tablet')
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(MEDICINES_URL, {'q': 'fever'})
+
+        self.assertTrue(any(
+            '"core_medicine"."search_vector" @@' in query['sql']
+            for query in ctx.captured_queries
+        ))
+
+    def test_search_medicine_typo(self):
+        """Test a misspelt medicine name still matches"""
+        self._require_trigram()
+        medicine = create_medicine(user=self.user, name='Ashwagandha Churna')
+
+        self.assertEqual(
+            self._ids(MEDICINES_URL, 'Ashwaganda Churna'), [medicine.id],
+        )
+
+    def test_search_symptom_typo(self):
+        """Test a misspelt symptom name still matches"""
+        self._require_trigram()
+        symptom = Symptom.objects.create(user=self.user, name='Headache')
+
+        self.assertEqual(self._ids(SYMPTOMS_URL, 'Headach'), [symptom.id])
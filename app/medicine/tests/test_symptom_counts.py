@@ -0,0 +1,204 @@
+"""Test the per-symptom medicine counts and the assigned_only filter"""
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.urls import reverse
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework import status
+
+from core.models import Symptom
+from core.testing import (
+    AuthenticatedAPIMixin,
+    create_medicine,
+)
+from medicine.bulk import bulk_write_medicines
+from medicine.views import SymptomViewSet
+
+
+SYMPTOMS_URL = reverse('medicine:symptom-list')
+
+
+class MedicineCountTests(TestCase):
+    """Test the medicine count follows every way links are written"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.fever, self.cough, self.cold = [
+            Symptom.objects.create(user=self.user, name=name)
+            for name in ('Fever', 'Cough', 'Cold')
+        ]
+
+    def assertCounts(self, fever, cough, cold):
+        """Assert the stored count of each symptom"""
+        self.assertEqual(
+            list(Symptom.objects.order_by('id').values_list(
+                'medicine_count', flat=True,
+            )),
+            [fever, cough, cold],
+        )
+
+    def test_add_remove_clear(self):
+        """Test links added, removed, set and cleared are counted"""
+        first = create_medicine(self.user, name='First')
+        second = create_medicine(self.user, name='Second')
+
+        first.symptoms.add(self.fever, self.cough)
+        second.symptoms.add(self.fever)
+        # Adding a link again does not count it twice
+        second.symptoms.add(self.fever)
+        self.assertCounts(2, 1, 0)
+
+        first.symptoms.remove(self.fever)
+        self.assertCounts(1, 1, 0)
+
+        first.symptoms.set([self.cold])
+        self.assertCounts(1, 0, 1)
+
+        self.cold.medicine_set.add(second)
+        second.symptoms.clear()
+        self.assertCounts(0, 0, 1)
+
+    def test_delete_medicine(self):
+        """Test deleting a medicine uncounts its links"""
+        medicine = create_medicine(self.user)
+        medicine.symptoms.add(self.fever, self.cough)
+
+        medicine.delete()
+
+        self.assertCounts(0, 0, 0)
+
+    def test_bulk_write(self):
+        """Test links written by the bulk path are counted"""
+        bulk_write_medicines(self.user, [
+            {'name': 'First', 'symptoms': [{'name': 'Fever'}]},
+            {'name': 'Second', 'symptoms': [
+                {'name': 'Fever'}, {'name': 'Cough'},
+            ]},
+        ])
+        self.assertCounts(2, 1, 0)
+
+        bulk_write_medicines(self.user, [
+            {'name': 'Second', 'symptoms': [{'name': 'Cold'}]},
+        ], upsert=True)
+        self.assertCounts(1, 0, 1)
+
+    def test_save_keeps_count(self):
+        """Test saving a symptom read before a link keeps the count"""
+        symptom = Symptom.objects.get(id=self.fever.id)
+        create_medicine(self.user).symptoms.add(self.fever)
+
+        symptom.name = 'High fever'
+        symptom.save()
+
+        symptom.refresh_from_db()
+        self.assertEqual(symptom.name, 'High fever')
+        self.assertEqual(symptom.medicine_count, 1)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class SymptomCountApiTests(AuthenticatedAPIMixin, TestCase):
+    """Test ?with_counts= and ?assigned_only= on the symptom list"""
+
+    def setUp(self):
+        super().setUp()
+        self.fever, self.cough, self.cold = [
+            Symptom.objects.create(user=self.user, name=name)
+            for name in ('Fever', 'Cough', 'Cold')
+        ]
+        for i in range(3):
+            medicine = create_medicine(self.user, name=f'Medicine {i}')
+            medicine.symptoms.add(*[self.fever, self.cough][:i])
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+        )
+        Symptom.objects.create(user=other, name='Fever')
+
+    def test_with_counts(self):
+        """Test each symptom is returned with its medicine count, read
+        without the through table"""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(SYMPTOMS_URL, {'with_counts': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), [
+            {'id': self.fever.id, 'name': 'Fever', 'medicine_count': 2},
+            {'id': self.cough.id, 'name': 'Cough', 'medicine_count': 1},
+            {'id': self.cold.id, 'name': 'Cold', 'medicine_count': 0},
+        ])
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn(
+            'core_medicine_symptoms', ctx.captured_queries[0]['sql'],
+        )
+
+    def test_without_counts(self):
+        """Test counts are only returned when asked for"""
+        res = self.client.get(SYMPTOMS_URL)
+
+        self.assertEqual(
+            res.json()[0], {'id': self.fever.id, 'name': 'Fever'},
+        )
+
+    def test_invalid_with_counts(self):
+        """Test a with_counts other than 0 or 1 is rejected"""
+        res = self.client.get(SYMPTOMS_URL, {'with_counts': 'abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('with_counts', res.json())
+
+    def test_invalid_assigned_only(self):
+        """Test an assigned_only other than 0 or 1 is rejected"""
+        res = self.client.get(SYMPTOMS_URL, {'assigned_only': 'abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.json(), {'assigned_only': 'Must be one of: 0, 1.'},
+        )
+
+    def test_update_without_counts(self):
+        """Test counts are only returned by the list"""
+        url = reverse('medicine:symptom-detail', args=[self.fever.id])
+        res = self.client.patch(
+            f'{url}?with_counts=1', {'name': 'High fever'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.json(), {'id': self.fever.id, 'name': 'High fever'},
+        )
+
+    def test_serializer_path_identical(self):
+        """Test lists rendered by the serializer return the same counts"""
+        params = [
+            {'with_counts': 1},
+            {'with_counts': 1, 'assigned_only': 1},
+            {'with_counts': 1, 'page_size': 2},
+        ]
+
+        for query in params:
+            fast = self.client.get(SYMPTOMS_URL, query)
+            with patch.object(SymptomViewSet, 'list_reader', None):
+                slow = self.client.get(SYMPTOMS_URL, query)
+
+            self.assertEqual(fast.content, slow.content, query)
+
+    def test_assigned_only_exists(self):
+        """Test assigned symptoms are listed once, without DISTINCT"""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(SYMPTOMS_URL, {'assigned_only': 1})
+
+        self.assertEqual(
+            [symptom['name'] for symptom in res.json()], ['Fever', 'Cough'],
+        )
+        sql = ctx.captured_queries[0]['sql']
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
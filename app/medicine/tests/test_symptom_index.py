@@ -0,0 +1,181 @@
+"""Test the in-process symptom index"""
+
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import (
+    connection,
+    transaction,
+)
+from django.urls import reverse
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+
+from rest_framework import status
+
+from core.models import Symptom
+from core.testing import (
+    AuthenticatedAPIMixin,
+    create_medicine,
+)
+from medicine.symptom_index import symptom_index
+
+
+MEDICINES_URL = reverse('medicine:medicine-list')
+
+
+@override_settings(SYMPTOM_INDEX_ENABLED=True, RESPONSE_CACHE_ENABLED=False)
+class SymptomIndexTests(AuthenticatedAPIMixin, TestCase):
+    """Test filtering medicines through the symptom index"""
+
+    def setUp(self):
+        symptom_index.clear()
+        super().setUp()
+        self.fever = Symptom.objects.create(user=self.user, name='Fever')
+        self.cough = Symptom.objects.create(user=self.user, name='Cough')
+        self.m1 = create_medicine(user=self.user, name='A medicine')
+        self.m1.symptoms.add(self.fever)
+        self.m2 = create_medicine(user=self.user, name='B medicine')
+        self.m2.symptoms.add(self.fever, self.cough)
+
+    def _matches(self, **params):
+        res = self.client.get(MEDICINES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [(row['id'], row['match_count']) for row in res.data]
+
+    def test_matches_database_results(self):
+        """Test the index ranks medicines like the database query"""
+        params = {'symptoms': 'Fever,Cough'}
+        indexed = self._matches(**params)
+        with self.settings(SYMPTOM_INDEX_ENABLED=False):
+            expected = self._matches(**params)
+
+        self.assertEqual(indexed, [(self.m2.id, 2), (self.m1.id, 1)])
+        self.assertEqual(indexed, expected)
+
+    def test_match_all(self):
+        """Test match=all intersects the symptom postings"""
+        matches = self._matches(symptoms='Fever,Cough', match='all')
+
+        self.assertEqual(matches, [(self.m2.id, 2)])
+
+    def test_normalized_names(self):
+        """Test the index matches names ignoring case and extra spacing"""
+        matches = self._matches(symptoms=' fever,COUGH', match='all')
+
+        self.assertEqual(matches, [(self.m2.id, 2)])
+
+    def test_no_match(self):
+        """Test unknown symptoms return nothing"""
+        self.assertEqual(self._matches(symptoms='Unknown'), [])
+
+    def test_index_reused_between_requests(self):
+        """Test a warm index does not read the symptom links again"""
+        self._matches(symptoms='Fever')
+
+        with self.assertNumQueries(2):
+            self._matches(symptoms='Fever')
+
+    def test_invalidated_by_symptom_changes(self):
+        """Test adding, removing and renaming symptoms refresh the index"""
+        self._matches(symptoms='Fever')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.m1.symptoms.add(self.cough)
+        self.assertIn((self.m1.id, 1), self._matches(symptoms='Cough'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.m2.symptoms.remove(self.cough)
+        self.assertNotIn((self.m2.id, 1), self._matches(symptoms='Cough'))
+
+        self.fever.name = 'High fever'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fever.save()
+        self.assertEqual(self._matches(symptoms='Fever'), [])
+
+    def test_invalidated_by_medicine_delete(self):
+        """Test deleting a medicine removes it from the index"""
+        self._matches(symptoms='Fever')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.m2.delete()
+
+        self.assertEqual(self._matches(symptoms='Fever'), [(self.m1.id, 1)])
+
+    def test_invalidated_by_api_update(self):
+        """Test updating symptoms through the API refreshes the index"""
+        self._matches(symptoms='Cough')
+
+        url = reverse('medicine:medicine-detail', args=[self.m1.id])
+        payload = {'symptoms': [{'name': 'Cough'}]}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(url, payload, format='json')
+
+        self.assertEqual(self._matches(symptoms='Cough'), [
+            (self.m2.id, 1), (self.m1.id, 1),
+        ])
+
+    def test_memory_accounting(self):
+        """Test the index reports what it holds per user"""
+        self._matches(symptoms='Fever')
+
+        stats = symptom_index.stats()
+
+        self.assertEqual(stats['users'], 1)
+        user_stats = stats['per_user'][self.user.id]
+        self.assertEqual(user_stats['symptoms'], 2)
+        self.assertEqual(user_stats['links'], 3)
+        self.assertGreater(user_stats['bytes'], 0)
+        self.assertEqual(stats['bytes'], user_stats['bytes'])
+
+    @override_settings(SYMPTOM_INDEX_MAX_USERS=1)
+    def test_least_recently_used_user_evicted(self):
+        """Test the index keeps at most the configured number of users"""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='test123',
+        )
+        self._matches(symptoms='Fever')
+        symptom_index.postings(other.id)
+
+        self.assertEqual(list(symptom_index.stats()['per_user']), [other.id])
+
+
+class SymptomIndexCommitTests(TransactionTestCase):
+    """Test the index against reads racing a write"""
+
+    def setUp(self):
+        symptom_index.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+        )
+        self.cough = Symptom.objects.create(user=self.user, name='Cough')
+        self.medicine = create_medicine(user=self.user)
+
+    def _match_in_thread(self):
+        """Match the index from another connection, as a concurrent
+        request would"""
+        def read():
+            try:
+                symptom_index.match(self.user.id, ['Cough'])
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=read)
+        thread.start()
+        thread.join()
+
+    def test_read_during_write_not_kept(self):
+        """Test an index built before a write commits is rebuilt after"""
+        with transaction.atomic():
+            self.medicine.symptoms.add(self.cough)
+            # Does not see the link yet
+            self._match_in_thread()
+
+        self.assertEqual(
+            symptom_index.match(self.user.id, ['Cough']),
+            {self.medicine.id: 1},
+        )
@@ -85,6 +85,18 @@ class PrivateSymptomsAPITests(TestCase):
         symptom.refresh_from_db()
         self.assertEqual(symptom.name, payload['name'])
 
+    def test_update_symptom_duplicate_name(self):
+        """Test renaming a symptom onto an existing one is rejected"""
+        Symptom.objects.create(user=self.user, name='Fever')
+        symptom = Symptom.objects.create(user=self.user, name='Cough')
+
+        url = detail_url(symptom.id)
+        res = self.client.patch(url, {'name': ' fever'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        symptom.refresh_from_db()
+        self.assertEqual(symptom.name, 'Cough')
+
     def test_delete_symptom(self):
         """Test deleting a symptom"""
         symptom = Symptom.objects.create(user=self.user, name='Sample symptom')
@@ -7,7 +7,10 @@ from django.urls import (
 
 from rest_framework.routers import DefaultRouter
 
-from medicine import views
+from medicine import (
+    async_views,
+    views,
+)
 
 app_name = 'medicine'
 
@@ -17,5 +20,12 @@ router.register('symptoms', views.SymptomViewSet)
 
 
 urlpatterns = [
+    # Read endpoints served without a thread per request under ASGI
+    path('async/medicines/', async_views.medicine_list,
+         name='async-medicine-list'),
+    path('async/medicines/<int:pk>/', async_views.medicine_detail,
+         name='async-medicine-detail'),
+    path('async/symptoms/', async_views.symptom_list,
+         name='async-symptom-list'),
     path('', include(router.urls)),
 ]
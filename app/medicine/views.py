@@ -7,19 +7,196 @@ from drf_spectacular.utils import (
     OpenApiTypes,
 )
 
+from django.conf import settings
+from django.db.models import (
+    Count,
+    Exists,
+    OuterRef,
+)
+
 from rest_framework import serializers
 from rest_framework import (
     viewsets,
     mixins,
+    status,
 )
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import (
+    SAFE_METHODS,
+    IsAuthenticated,
+)
+from rest_framework.response import Response
+from rest_framework.relations import ManyRelatedField
+from rest_framework.serializers import ListSerializer
 
 from core.models import (
     Medicine,
     Symptom,
+    normalize_symptom_name,
 )
 from medicine import serializers
+from medicine.bulk import bulk_write_medicines
+from medicine.cache import (
+    CachedResponseMixin,
+    CachedRetrieveMixin,
+)
+from medicine.export import (
+    EXPORT_FORMATS,
+    export_response,
+)
+from medicine.pagination import KeysetPagination
+from medicine.readers import (
+    ListReaderMixin,
+    MedicineListReader,
+    SymptomCountListReader,
+    SymptomListReader,
+)
+from medicine.search import (
+    search_medicines,
+    search_names,
+)
+from medicine.symptom_index import (
+    annotate_match_counts,
+    symptom_index,
+)
+from user.authentication import CachedTokenAuthentication
+
+
+def _many_related_fields(serializer_class):
+    """Return the names of to-many relations the serializer renders"""
+    return [
+        name for name, field in serializer_class().fields.items()
+        if isinstance(field, (ListSerializer, ManyRelatedField))
+        and not field.write_only
+    ]
+
+
+def flag_param(request, name):
+    """Return a 0/1 query parameter as a bool, 0 when it is not sent"""
+    value = request.query_params.get(name, '0')
+    if value not in ('0', '1'):
+        raise ValidationError({name: 'Must be one of: 0, 1.'})
+
+    return value == '1'
+
+
+class PrefetchSerializerRelationsMixin:
+    """Prefetch exactly the to-many relations the serializer will read"""
+
+    def get_serialized_relations(self):
+        """Return the to-many relations the serializer will render"""
+        return _many_related_fields(self.get_serializer_class())
+
+    def prefetch_serializer_relations(self, queryset):
+        """Add prefetches for the active serializer's nested relations"""
+        fields = self.get_serialized_relations()
+        if fields:
+            queryset = queryset.prefetch_related(*fields)
+
+        return queryset
+
+
+class SparseFieldsetMixin:
+    """Serve ``?fields=`` and ``?expand=`` on read requests
+
+    ``fields`` lists the serializer fields to render, and only their
+    columns (plus the ordering ones) are read. To-many relations named in
+    ``expandable`` are rendered, and read, when also listed there or in
+    ``expand``. Without ``fields`` every field is rendered as before.
+    """
+    expandable = ()
+
+    def _param_names(self, param):
+        """Return the names of a comma separated query parameter"""
+        value = self.request.query_params.get(param, '')
+        return [name.strip() for name in value.split(',') if name.strip()]
+
+    def get_fieldset(self):
+        """Return the serializer fields to render, None for all of them"""
+        if self.request.method not in SAFE_METHODS:
+            return None
+
+        expand = self._param_names('expand')
+        unknown = set(expand) - set(self.expandable)
+        if unknown:
+            raise ValidationError({
+                'expand': f'Must be among: {", ".join(self.expandable)}.'
+            })
+        fields = self._param_names('fields')
+        if not fields:
+            return None
+
+        available = self.get_serializer_class().Meta.fields
+        unknown = [name for name in fields if name not in available]
+        if unknown:
+            raise ValidationError({'fields': (
+                f'Unknown fields: {", ".join(unknown)}. Must be among: '
+                f'{", ".join(available)}.'
+            )})
+
+        return [
+            name for name in available if name in fields or name in expand
+        ]
+
+    def select_fieldset_columns(self, queryset):
+        """Read only the columns of the fieldset and of the ordering"""
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return queryset
+
+        concrete = {
+            field.name for field in queryset.model._meta.concrete_fields
+        }
+        ordering = [name.lstrip('-') for name in self.get_ordering()]
+        return queryset.only(*(
+            name for name in dict.fromkeys((*fieldset, *ordering))
+            if name in concrete
+        ))
+
+    def get_serializer(self, *args, **kwargs):
+        """Return the serializer, rendering only the fieldset"""
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            kwargs.setdefault('fields', fieldset)
+
+        return super().get_serializer(*args, **kwargs)
+
+    def get_serialized_relations(self):
+        """Return the rendered to-many relations, in the fieldset"""
+        relations = super().get_serialized_relations()
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return relations
+
+        return [name for name in relations if name in fieldset]
+
+    def get_list_reader(self):
+        """Return the list reader, rendering only the fieldset"""
+        reader = super().get_list_reader()
+        fieldset = self.get_fieldset()
+        if reader is None or fieldset is None:
+            return reader
+
+        return reader.select(fieldset)
+
+
+FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description=(
+            'Comma separated fields to return, e.g. id,name. Symptoms are '
+            'only returned, and read, when listed here or in expand'
+        ),
+    ),
+    OpenApiParameter(
+        'expand',
+        OpenApiTypes.STR, enum=['symptoms'],
+        description='Also return the symptoms with the fields',
+    ),
+]
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -28,36 +205,115 @@ from medicine import serializers
                 'symptoms',
                 OpenApiTypes.STR,
                 description='Comma separated list of symptoms',
-            )
+            ),
+            OpenApiParameter(
+                'match',
+                OpenApiTypes.STR, enum=['any', 'all'],
+                description=(
+                    'Return medicines treating any (default) or all of '
+                    'the symptoms, ranked by how many they match'
+                ),
+            ),
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                description=(
+                    'Search medicine text and symptom names, ranked by '
+                    'relevance'
+                ),
+            ),
+            *FIELDSET_PARAMETERS,
         ]
-    )
+    ),
+    retrieve=extend_schema(parameters=FIELDSET_PARAMETERS),
 )
-class MedicineViewSet(viewsets.ModelViewSet):
+class MedicineViewSet(SparseFieldsetMixin,
+                      CachedRetrieveMixin,
+                      ListReaderMixin,
+                      PrefetchSerializerRelationsMixin,
+                      viewsets.ModelViewSet):
     """View for manage medicine APIs"""
     serializer_class = serializers.MedicineDetailSerializer
     queryset = Medicine.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    list_reader = MedicineListReader()
+    ordering = ('-name', 'id')
+    match_modes = ('any', 'all')
+    expandable = ('symptoms',)
 
     def __params_to_names(self, qs):
         """Convert a list of string IDs to a list of integers"""
         return qs.split(',')
 
+    def _get_match_mode(self):
+        """Return the requested symptom match mode"""
+        match = self.request.query_params.get('match', 'any')
+        if match not in self.match_modes:
+            raise ValidationError(
+                {'match': f'Must be one of: {", ".join(self.match_modes)}.'}
+            )
+
+        return match
+
+    def _filter_symptoms(self, queryset, symptom_names, match):
+        """Annotate each medicine with how many of the symptoms it treats
+
+        Filtering on the join and counting per medicine groups the rows
+        in the database, so no DISTINCT pass is needed and `all` becomes
+        a HAVING on the count. With the symptom index enabled the counts
+        come from this worker's in-memory index instead of the join.
+        """
+        if settings.SYMPTOM_INDEX_ENABLED:
+            counts = symptom_index.match(
+                self.request.user.id, symptom_names, match,
+            )
+            return annotate_match_counts(queryset, counts)
+
+        keys = {normalize_symptom_name(name) for name in symptom_names}
+        # The user condition lets the join use the symptom name index
+        queryset = queryset.filter(
+            symptoms__user=self.request.user,
+            symptoms__normalized_name__in=keys,
+        ).annotate(
+            match_count=Count('symptoms__normalized_name', distinct=True),
+        )
+        if match == 'all':
+            queryset = queryset.filter(match_count=len(keys))
+
+        return queryset
+
     def get_queryset(self):
         """Retrieve the medicines for the authenticated user"""
         symptoms = self.request.query_params.get('symptoms')
-        queryset = self.queryset
+        search = self.request.query_params.get('q')
+        queryset = self.queryset.filter(user=self.request.user)
+        if search:
+            queryset = search_medicines(queryset, search)
         if symptoms:
             symptom_names = self.__params_to_names(symptoms)
-            queryset = queryset.filter(symptoms__name__in=symptom_names)
+            queryset = self._filter_symptoms(
+                queryset, symptom_names, self._get_match_mode(),
+            )
 
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-name').distinct()
+        queryset = self.prefetch_serializer_relations(queryset)
+        queryset = self.select_fieldset_columns(queryset)
+        return queryset.order_by(*self.get_ordering())
+
+    def get_ordering(self):
+        """Return the list ordering, unique so it can drive pagination"""
+        ranking = ()
+        if self.request.query_params.get('symptoms'):
+            ranking += ('-match_count',)
+        if self.request.query_params.get('q'):
+            ranking += ('-search_rank',)
+
+        return ranking + self.ordering
 
     def get_serializer_class(self):
         """Return the serializer class for the request"""
-        if self.action == 'list':
+        if self.action in ('list', 'bulk'):
             return serializers.MedicineSerializer
 
         return self.serializer_class
@@ -65,6 +321,123 @@ class MedicineViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         """Create a new medicine"""
         serializer.save(user=self.request.user)
+
+    @extend_schema(
+        request=serializers.MedicineSerializer(many=True),
+        responses={
+            201: OpenApiTypes.OBJECT,
+            207: OpenApiTypes.OBJECT,
+            400: OpenApiTypes.OBJECT,
+        },
+        parameters=[
+            OpenApiParameter(
+                'upsert',
+                OpenApiTypes.INT, enum=[0, 1],
+                description=(
+                    'Update the existing medicine with the same name '
+                    'instead of creating a new one'
+                ),
+            ),
+        ],
+    )
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """Create or upsert a list of medicines in one transaction
+
+        Every item is validated first, then the valid ones are written
+        together. The response reports the outcome of each item by index.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError(
+                {'non_field_errors': ['Expected a list of medicines.']}
+            )
+        if len(items) > settings.MEDICINE_BULK_MAX_ITEMS:
+            raise ValidationError({'non_field_errors': [
+                f'At most {settings.MEDICINE_BULK_MAX_ITEMS} medicines can '
+                'be sent at once.'
+            ]})
+        upsert = flag_param(request, 'upsert')
+
+        results = [None] * len(items)
+        valid, valid_indexes, names = [], [], set()
+        for index, item in enumerate(items):
+            serializer = self.get_serializer(data=item)
+            if not serializer.is_valid():
+                errors = serializer.errors
+            elif upsert and serializer.validated_data['name'] in names:
+                errors = {'name': ['Duplicate medicine name in upsert.']}
+            else:
+                names.add(serializer.validated_data['name'])
+                valid.append(serializer.validated_data)
+                valid_indexes.append(index)
+                continue
+            results[index] = {
+                'index': index, 'status': 'error', 'errors': errors,
+            }
+
+        written = bulk_write_medicines(request.user, valid, upsert=upsert)
+        for index, (medicine, created) in zip(valid_indexes, written):
+            if medicine is None:
+                results[index] = {
+                    'index': index, 'status': 'error', 'errors': {'name': [
+                        'Several medicines have this name, update them '
+                        'one by one.'
+                    ]},
+                }
+                continue
+            results[index] = {
+                'index': index,
+                'status': 'created' if created else 'updated',
+                'id': medicine.id,
+            }
+
+        written = [pair for pair in written if pair[0] is not None]
+        failed = len(items) - len(written)
+        if not failed:
+            response_status = status.HTTP_201_CREATED
+        elif not written:
+            response_status = status.HTTP_400_BAD_REQUEST
+        else:
+            response_status = status.HTTP_207_MULTI_STATUS
+
+        created = sum(1 for _, was_created in written if was_created)
+        return Response({
+            'created': created,
+            'updated': len(written) - created,
+            'failed': failed,
+            'results': results,
+        }, status=response_status)
+
+    @extend_schema(
+        responses={200: OpenApiTypes.BINARY},
+        parameters=[
+            OpenApiParameter(
+                'file_format',
+                OpenApiTypes.STR, enum=list(EXPORT_FORMATS),
+                description=(
+                    'ndjson (default), one medicine per line, or csv or '
+                    'xlsx rows laid out like final_data.xlsx'
+                ),
+            ),
+        ],
+    )
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """Stream the user's whole catalog with the symptoms
+
+        The catalog is read and written in chunks, so memory use does not
+        grow with its size.
+        """
+        file_format = request.query_params.get('file_format', 'ndjson')
+        if file_format not in EXPORT_FORMATS:
+            raise ValidationError({
+                'file_format': f'Must be one of: {", ".join(EXPORT_FORMATS)}.'
+            })
+
+        return export_response(
+            request.user, file_format, settings.MEDICINE_EXPORT_CHUNK_SIZE,
+        )
 @extend_schema_view(
     list=extend_schema(
         parameters=[
@@ -73,44 +446,105 @@ class MedicineViewSet(viewsets.ModelViewSet):
                 OpenApiTypes.INT, enum=[0, 1],
                 description='Filter only assigned symptoms',
             ),
+            OpenApiParameter(
+                'with_counts',
+                OpenApiTypes.INT, enum=[0, 1],
+                description=(
+                    'Also return how many medicines use each symptom'
+                ),
+            ),
             OpenApiParameter(
                 'symptom_names',
                 OpenApiTypes.STR,
                 description='Filter symptoms by names (comma-separated)',
-            )
+            ),
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                description='Search symptom names, ranked by relevance',
+            ),
         ]
     )
 )
-class BaseMedicineAttrViewSet(mixins.DestroyModelMixin,
+class BaseMedicineAttrViewSet(CachedResponseMixin,
+                    ListReaderMixin,
+                    PrefetchSerializerRelationsMixin,
+                    mixins.DestroyModelMixin,
                     mixins.UpdateModelMixin,
                     mixins.ListModelMixin,
                     viewsets.GenericViewSet):
     """Base viewset for medicine attributes"""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    ordering = ('-name', 'id')
 
     def get_queryset(self):
         """Filter query set to authenticated user"""
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
-        )
+        assigned_only = flag_param(self.request, 'assigned_only')
         symptom_names = self.request.query_params.get('symptom_names', '') #to remove
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(medicine__isnull=False)
+            # A semi-join stops at the first link and needs no DISTINCT
+            queryset = queryset.filter(Exists(
+                Medicine.symptoms.through.objects.filter(
+                    symptom_id=OuterRef('pk'),
+                ),
+            ))
 
         if symptom_names: #to remove
             symptom_name_list = symptom_names.split(',')
-            queryset = queryset.filter(name__in=symptom_name_list)
+            queryset = queryset.filter(normalized_name__in=[
+                normalize_symptom_name(name) for name in symptom_name_list
+            ])
+
+        search = self.request.query_params.get('q')
+        if search:
+            queryset = self.search(queryset, search)
 
+        queryset = self.prefetch_serializer_relations(queryset)
         return queryset.filter(
             user=self.request.user
-        ).order_by('-name').distinct()
+        ).order_by(*self.get_ordering())
+
+    def search(self, queryset, text):
+        """Filter the attributes by a search of their name, annotating
+        search_rank"""
+        return search_names(queryset, text)
+
+    def get_ordering(self):
+        """Return the list ordering, unique so it can drive pagination"""
+        if self.request.query_params.get('q'):
+            return ('-search_rank',) + self.ordering
+
+        return self.ordering
+
 
 class SymptomViewSet(BaseMedicineAttrViewSet):
     """Manage symptoms in the database"""
     serializer_class = serializers.SymptomSerializer
     queryset = Symptom.objects.all()
+    list_reader = SymptomListReader()
+    count_list_reader = SymptomCountListReader()
+
+    def with_counts(self):
+        """Return whether to render how many medicines use each symptom"""
+        return flag_param(self.request, 'with_counts')
+
+    def get_serializer_class(self):
+        """Return the serializer class for the request"""
+        if self.action == 'list' and self.with_counts():
+            return serializers.SymptomCountSerializer
+
+        return self.serializer_class
+
+    def get_list_reader(self):
+        """Return the reader of the request"""
+        reader = super().get_list_reader()
+        if reader is not None and self.with_counts():
+            return self.count_list_reader
+
+        return reader
 
 
 
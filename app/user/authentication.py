@@ -0,0 +1,182 @@
+"""Cached token authentication for the API
+
+DRF's ``TokenAuthentication`` reads the token joined to its user on every
+request. ``CachedTokenAuthentication`` keeps that pair in a bounded
+in-process LRU for ``TOKEN_CACHE_LOCAL_TIMEOUT`` seconds and, with
+``TOKEN_CACHE_SHARED``, in the default cache for ``TOKEN_CACHE_TIMEOUT``
+seconds. The default cache only gets the fields in ``USER_FIELDS`` and
+``TOKEN_FIELDS``, never the password hash, and the pair is rebuilt from
+them with the other fields deferred, so they are read from the database
+if used.
+
+Once deleting a token or saving or deleting its user commits, the
+entries of this worker and of the default cache are dropped (see
+``user.signals``). Other workers cannot be reached: their in-process
+copies keep authenticating the old token or user until they expire, so
+``TOKEN_CACHE_LOCAL_TIMEOUT`` is kept short.
+"""
+
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.cache import CacheStats
+
+TOKEN_KEY = 'user:token:{}'
+# Fields kept in the default cache, what authenticated requests read
+USER_FIELDS = ('id', 'email', 'name', 'is_active', 'is_staff',
+               'is_superuser')
+TOKEN_FIELDS = ('key', 'user_id', 'created')
+
+token_cache_stats = CacheStats()
+
+
+def _shared_key(key):
+    """Return the default cache key for a token, without the token in it"""
+    return TOKEN_KEY.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+def _dump(pair):
+    """Return the cached fields of a (user, token) pair"""
+    user, token = pair
+    return (
+        [getattr(user, field) for field in USER_FIELDS],
+        [getattr(token, field) for field in TOKEN_FIELDS],
+    )
+
+
+def _from_db(model, fields, values):
+    """Return an instance of ``model`` loaded with only these fields"""
+    loaded = dict(zip(fields, values))
+    # from_db() takes the values in the order of the model's fields
+    names = [
+        field.attname for field in model._meta.concrete_fields
+        if field.attname in loaded
+    ]
+    return model.from_db(
+        model.objects.db, names, [loaded[name] for name in names],
+    )
+
+
+def _load(values):
+    """Return the (user, token) pair of fields from ``_dump()``"""
+    user_values, token_values = values
+    user = _from_db(get_user_model(), USER_FIELDS, user_values)
+    token = _from_db(Token, TOKEN_FIELDS, token_values)
+    token.user = user
+    return user, token
+
+
+class TokenCache:
+    """Map of token key to its (user, token) pair, LRU bounded, expiring"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation, see set()
+        self.generation = 0
+
+    def get(self, key):
+        """Return the cached (user, token) pair for a key, or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        if settings.TOKEN_CACHE_SHARED:
+            values = cache.get(_shared_key(key))
+            if values is not None:
+                pair = _load(values)
+                self._set_local(key, pair, self.generation)
+                return pair
+
+        return None
+
+    def _set_local(self, key, pair, generation):
+        """Store a pair in-process unless an invalidation ran since
+        ``generation`` was read"""
+        expires = time.monotonic() + settings.TOKEN_CACHE_LOCAL_TIMEOUT
+        with self._lock:
+            if generation != self.generation:
+                return False
+            self._entries[key] = (expires, pair)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.TOKEN_CACHE_MAX_SIZE:
+                self._entries.popitem(last=False)
+
+        return True
+
+    def set(self, key, pair, generation):
+        """Cache a pair read from the database at ``generation``
+
+        A pair read before an invalidation may be stale and is dropped.
+        """
+        if self._set_local(key, pair, generation) and (
+                settings.TOKEN_CACHE_SHARED):
+            cache.set(
+                _shared_key(key), _dump(pair),
+                timeout=settings.TOKEN_CACHE_TIMEOUT,
+            )
+
+    def invalidate(self, key):
+        """Forget a token"""
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(key, None)
+        if settings.TOKEN_CACHE_SHARED:
+            cache.delete(_shared_key(key))
+
+    def invalidate_user(self, user_id):
+        """Forget every token of a user"""
+        with self._lock:
+            self.generation += 1
+            for key, (_, (user, _)) in list(self._entries.items()):
+                if user.pk == user_id:
+                    del self._entries[key]
+        if settings.TOKEN_CACHE_SHARED:
+            keys = Token.objects.filter(
+                user_id=user_id,
+            ).values_list('key', flat=True)
+            cache.delete_many([_shared_key(key) for key in keys])
+
+    def clear(self):
+        """Forget every token held by this worker"""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication answering repeated tokens from the cache"""
+
+    def authenticate_credentials(self, key):
+        """Return the (user, token) pair for a key, cached after the first
+        successful lookup"""
+        if not settings.TOKEN_CACHE_ENABLED:
+            return super().authenticate_credentials(key)
+
+        pair = token_cache.get(key)
+        token_cache_stats.record('miss' if pair is None else 'hit')
+        if pair is None:
+            generation = token_cache.generation
+            # Raises for unknown tokens and inactive users, never cached
+            pair = super().authenticate_credentials(key)
+            token_cache.set(key, pair, generation)
+
+        user, token = pair
+        # Views may change request.user, keep the cached one intact
+        return copy.copy(user), token
@@ -7,7 +7,9 @@ from django.contrib.auth import (
 from django.utils.translation import gettext as _
 from rest_framework import serializers
 
-class UserSerializer(serializers.ModelSerializer):
+from app.metrics import TimedDataMixin
+
+class UserSerializer(TimedDataMixin, serializers.ModelSerializer):
     """Serializer for the user object"""
 
     class Meta:
@@ -0,0 +1,37 @@
+"""Signal handlers for the user API
+
+Tokens are forgotten once the write commits. Forgetting them inside the
+transaction would let a concurrent request cache the token and user from
+before the write again.
+"""
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+)
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from user.authentication import token_cache
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def token_changed(sender, instance, **kwargs):
+    """Forget a cached token once it is written or deleted"""
+    transaction.on_commit(partial(token_cache.invalidate, instance.key))
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    """Forget the cached tokens of a user once it is changed or deleted
+
+    The tokens of a deleted user are gone by then, deleting them forgets
+    them from the default cache (see ``token_changed``).
+    """
+    transaction.on_commit(partial(token_cache.invalidate_user, instance.pk))
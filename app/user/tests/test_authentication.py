@@ -0,0 +1,200 @@
+"""Tests for the cached token authentication"""
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import (
+    _shared_key,
+    token_cache,
+    token_cache_stats,
+)
+
+ME_URL = reverse('user:me')
+MEDICINES_URL = reverse('medicine:medicine-list')
+
+
+def create_user(email='test@example.com', password='testpass123'):
+    """Create and return a new user"""
+    return get_user_model().objects.create_user(
+        email=email, password=password, name='Test Name',
+    )
+
+
+@override_settings(TOKEN_CACHE_ENABLED=True, TOKEN_CACHE_SHARED=False)
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating with cached tokens"""
+
+    def setUp(self):
+        token_cache.clear()
+        token_cache_stats.reset()
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeated_token_not_queried(self):
+        """Test the token is only read from the database once"""
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+        self.assertEqual(
+            token_cache_stats.snapshot(),
+            {'hits': 1, 'misses': 1, 'hit_rate': 0.5},
+        )
+
+    def test_shared_between_views(self):
+        """Test a token cached by one view authenticates another"""
+        self.client.get(ME_URL)
+
+        res = self.client.get(MEDICINES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(token_cache_stats.snapshot()['hits'], 1)
+
+    def test_invalid_token_not_cached(self):
+        """Test unknown tokens are rejected every time"""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        for _ in range(2):
+            res = self.client.get(ME_URL)
+            self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.assertEqual(token_cache_stats.snapshot()['hits'], 0)
+
+    def test_deleted_token_rejected(self):
+        """Test deleting a token takes effect immediately"""
+        self.client.get(ME_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user takes effect immediately"""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_update_visible(self):
+        """Test changes to the user are seen on the next request"""
+        self.client.get(ME_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.patch(ME_URL, {'name': 'Updated name'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'Updated name')
+
+    def test_invalidated_after_commit(self):
+        """Test a pair cached while a write is uncommitted is forgotten
+        once it commits"""
+        key = self.token.key
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.token.delete()
+            # A concurrent request still reads the token until the commit
+            token_cache.set(
+                key, (self.user, Token(key=key, user=self.user)),
+                token_cache.generation,
+            )
+            self.assertIsNotNone(token_cache.get(key))
+
+        for callback in callbacks:
+            callback()
+
+        self.assertIsNone(token_cache.get(key))
+
+    @override_settings(TOKEN_CACHE_LOCAL_TIMEOUT=0)
+    def test_local_timeout(self):
+        """Test in-process entries expire after TOKEN_CACHE_LOCAL_TIMEOUT"""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+    @override_settings(TOKEN_CACHE_MAX_SIZE=1)
+    def test_least_recently_used_token_evicted(self):
+        """Test the cache holds at most TOKEN_CACHE_MAX_SIZE tokens"""
+        other = create_user(email='other@example.com')
+        other_token = Token.objects.create(user=other)
+        self.client.get(ME_URL)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {other_token.key}')
+        self.client.get(ME_URL)
+
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.assertIsNotNone(token_cache.get(other_token.key))
+
+    def test_stale_read_not_cached(self):
+        """Test a pair read before an invalidation is not stored"""
+        generation = token_cache.generation
+        token_cache.invalidate_user(self.user.pk)
+
+        token_cache.set(self.token.key, (self.user, self.token), generation)
+
+        self.assertIsNone(token_cache.get(self.token.key))
+
+    @override_settings(TOKEN_CACHE_SHARED=True)
+    def test_shared_cache(self):
+        """Test tokens are shared through the default cache"""
+        cache.clear()
+        self.client.get(ME_URL)
+        token_cache.clear()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        token_cache.clear()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_CACHE_SHARED=True)
+    def test_shared_cache_without_password(self):
+        """Test the default cache never holds the password hash, and a
+        user rebuilt from it is saved without losing it"""
+        cache.clear()
+        self.client.get(ME_URL)
+        token_cache.clear()
+
+        values = cache.get(_shared_key(self.token.key))
+        self.assertNotIn(self.user.password, repr(values))
+
+        res = self.client.patch(ME_URL, {'name': 'New Name'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'New Name')
+        self.assertTrue(self.user.check_password('testpass123'))
+
+    @override_settings(TOKEN_CACHE_ENABLED=False)
+    def test_disabled(self):
+        """Test the cache can be switched off"""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
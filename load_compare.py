@@ -0,0 +1,164 @@
+"""
+Compare the sync and async read endpoints under concurrent load
+
+The same read requests are sent to the sync endpoints, served by a WSGI
+server, and to their async twins under /api/medicine/async/, served by an
+ASGI server, at a fixed concurrency. Throughput and latency percentiles
+are reported per endpoint and per server.
+
+Usage:
+    AYUSHPI_TOKEN=<token> python load_compare.py \\
+        --sync-url http://localhost:8000/api/medicine/ \\
+        --async-url http://localhost:8001/api/medicine/async/
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def parse_args(argv=None):
+    """Parse the command line, falling back to environment variables"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sync-url",
+        default="http://localhost:8000/api/medicine/",
+        help="Base URL of the sync endpoints",
+    )
+    parser.add_argument(
+        "--async-url",
+        default="http://localhost:8001/api/medicine/async/",
+        help="Base URL of the async endpoints",
+    )
+    parser.add_argument(
+        "--token",
+        default=os.environ.get("AYUSHPI_TOKEN"),
+        help="API token of a user with a catalog (env AYUSHPI_TOKEN)",
+    )
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args(argv)
+    if not args.token:
+        parser.error("an API token is required (--token or AYUSHPI_TOKEN)")
+
+    return args
+
+
+def percentile(latencies, fraction):
+    """Return the latency below which ``fraction`` of the sorted ones are"""
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+
+class Client:
+    """GET requests on a pooled keep-alive session"""
+
+    def __init__(self, args):
+        self.timeout = args.timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=2, pool_maxsize=args.concurrency,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Authorization"] = f"Token {args.token}"
+
+    def get(self, url, params=None):
+        """Return the status code and latency of one request"""
+        start = time.perf_counter()
+        try:
+            status = self.session.get(
+                url, params=params, timeout=self.timeout,
+            ).status_code
+        except (requests.ConnectionError, requests.Timeout):
+            status = None
+
+        return status, time.perf_counter() - start
+
+    def scenarios(self, sync_url):
+        """Return the read requests to compare as (label, path, params)"""
+        page = self.session.get(
+            f"{sync_url}medicines/", params={"page_size": 50},
+            timeout=self.timeout,
+        )
+        page.raise_for_status()
+        medicines = page.json()["results"]
+        if not medicines:
+            raise SystemExit("The token's user has no medicines to read")
+        symptoms = {
+            symptom["name"]
+            for medicine in medicines for symptom in medicine["symptoms"]
+        }
+
+        scenarios = [
+            ("medicine list", "medicines/", {}),
+            ("medicine page", "medicines/", {"page_size": 50}),
+            ("medicine detail", f"medicines/{medicines[0]['id']}/", {}),
+            ("symptom list", "symptoms/", {}),
+        ]
+        if symptoms:
+            scenarios.append((
+                "medicine symptoms filter", "medicines/",
+                {"symptoms": ",".join(sorted(symptoms)[:3])},
+            ))
+
+        return scenarios
+
+
+def run(client, url, params, args):
+    """Send ``args.requests`` GETs at ``args.concurrency``, return stats"""
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        start = time.perf_counter()
+        results = list(executor.map(
+            lambda _: client.get(url, params), range(args.requests),
+        ))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for status, latency in results)
+    return {
+        "rps": len(results) / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "errors": sum(1 for status, _ in results if status != 200),
+    }
+
+
+def main(argv=None):
+    """Run every scenario against both servers and print the comparison"""
+    args = parse_args(argv)
+    client = Client(args)
+    scenarios = client.scenarios(args.sync_url)
+    print(
+        f"{args.requests} requests per scenario at concurrency "
+        f"{args.concurrency}"
+    )
+    print(
+        f"{'scenario':<26}{'server':<7}{'req/s':>9}{'p50 ms':>9}"
+        f"{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}"
+    )
+
+    failed = False
+    for (label, path, params), (server, base) in itertools.product(
+            scenarios, [("sync", args.sync_url), ("async", args.async_url)]):
+        # Warm up connections, caches and the async pool
+        client.get(f"{base}{path}", params)
+        stats = run(client, f"{base}{path}", params, args)
+        failed = failed or stats["errors"] > 0
+        print(
+            f"{label:<26}{server:<7}{stats['rps']:>9.1f}"
+            f"{stats['p50'] * 1000:>9.1f}{stats['p95'] * 1000:>9.1f}"
+            f"{stats['p99'] * 1000:>9.1f}{stats['errors']:>8}"
+        )
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,366 @@
+"""
+Load test the API endpoints with the users seeded by seed_load_test
+
+Each scenario (token login, medicine list with and without symptom filters,
+medicine detail, create and update, symptom list with and without
+assigned_only) sends the same number of requests at a fixed concurrency,
+spread over the seeded users. Throughput and latency percentiles are
+printed and written to a JSON report; pass a previous report as
+--baseline to see how a change moved them.
+
+Usage:
+    docker-compose run --rm app sh -c "python manage.py seed_load_test"
+    python load_test.py --output load_test.json [--baseline before.json]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from load_compare import percentile
+
+PERCENTILES = {"p50": 0.5, "p90": 0.9, "p95": 0.95, "p99": 0.99}
+
+
+def parse_args(argv=None):
+    """Parse the command line"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--url",
+        default="http://localhost:8000/api/",
+        help="Base URL of the API",
+    )
+    parser.add_argument(
+        "--users", type=int, default=10,
+        help="Seeded users to spread the requests over",
+    )
+    parser.add_argument(
+        "--prefix", default="loadtest",
+        help="Email prefix the users were seeded with",
+    )
+    parser.add_argument(
+        "--password", default="loadtest",
+        help="Password the users were seeded with",
+    )
+    parser.add_argument(
+        "--requests", type=int, default=500,
+        help="Requests per scenario",
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument(
+        "--scenario", action="append", dest="scenarios",
+        help="Only run this scenario, may be repeated",
+    )
+    parser.add_argument("--output", default="load_test.json")
+    parser.add_argument(
+        "--baseline",
+        help="Report of a previous run to compare against",
+    )
+
+    return parser.parse_args(argv)
+
+
+def git_revision():
+    """Return the checked out commit, or None outside a git checkout"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class User:
+    """A seeded user, its token and parts of its catalog to request"""
+
+    def __init__(self, email, token, medicine_ids, symptom_names):
+        self.email = email
+        self.headers = {"Authorization": f"Token {token}"}
+        self.medicine_ids = medicine_ids
+        self.symptom_names = symptom_names
+
+    def symptoms(self, index, count=2):
+        """Return ``count`` symptom names picked by ``index``"""
+        return [
+            self.symptom_names[(index + offset) % len(self.symptom_names)]
+            for offset in range(count)
+        ]
+
+
+class LoadTest:
+    """Requests to the API on a pooled keep-alive session"""
+
+    def __init__(self, args):
+        self.args = args
+        self.base = args.url.rstrip("/") + "/"
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=args.concurrency,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.run_id = int(time.time())
+        self.users = []
+
+    def email(self, index):
+        """Return the email of a seeded user, as seed_load_test names it"""
+        return f"{self.args.prefix}-{index}@example.com"
+
+    def request(self, method, path, **kwargs):
+        """Return the status code and latency of one request"""
+        start = time.perf_counter()
+        try:
+            status = self.session.request(
+                method, f"{self.base}{path}", timeout=self.args.timeout,
+                **kwargs,
+            ).status_code
+        except (requests.ConnectionError, requests.Timeout):
+            status = None
+
+        return status, time.perf_counter() - start
+
+    def log_in(self):
+        """Log every seeded user in and read a page of its catalog"""
+        for index in range(self.args.users):
+            email = self.email(index)
+            res = self.session.post(
+                f"{self.base}user/token/",
+                data={"email": email, "password": self.args.password},
+                timeout=self.args.timeout,
+            )
+            if res.status_code != 200:
+                raise SystemExit(
+                    f"Could not log in as {email} ({res.status_code}), "
+                    "run the seed_load_test command first"
+                )
+            headers = {"Authorization": f"Token {res.json()['token']}"}
+            page = self.session.get(
+                f"{self.base}medicine/medicines/",
+                params={"page_size": 100}, headers=headers,
+                timeout=self.args.timeout,
+            )
+            page.raise_for_status()
+            medicines = page.json()["results"]
+            symptoms = sorted({
+                symptom["name"]
+                for medicine in medicines for symptom in medicine["symptoms"]
+            })
+            if not medicines or not symptoms:
+                raise SystemExit(f"{email} has no catalog to load test")
+            self.users.append(User(
+                email, res.json()["token"],
+                [medicine["id"] for medicine in medicines], symptoms,
+            ))
+
+    def user(self, index):
+        """Return the user sending the ``index``-th request"""
+        return self.users[index % len(self.users)]
+
+    def token_login(self, index):
+        """Log a user in"""
+        user = self.user(index)
+        return self.request(
+            "POST", "user/token/",
+            data={"email": user.email, "password": self.args.password},
+        )
+
+    def medicine_list(self, index):
+        """List a user's medicines"""
+        return self.request(
+            "GET", "medicine/medicines/", headers=self.user(index).headers,
+        )
+
+    def medicine_list_any_symptom(self, index):
+        """List the medicines with any of two symptoms"""
+        user = self.user(index)
+        return self.request(
+            "GET", "medicine/medicines/", headers=user.headers,
+            params={"symptoms": ",".join(user.symptoms(index))},
+        )
+
+    def medicine_list_all_symptoms(self, index):
+        """List the medicines with both of two symptoms"""
+        user = self.user(index)
+        return self.request(
+            "GET", "medicine/medicines/", headers=user.headers,
+            params={
+                "symptoms": ",".join(user.symptoms(index)), "match": "all",
+            },
+        )
+
+    def medicine_detail(self, index):
+        """Read a medicine"""
+        user = self.user(index)
+        medicine_id = user.medicine_ids[index % len(user.medicine_ids)]
+        return self.request(
+            "GET", f"medicine/medicines/{medicine_id}/", headers=user.headers,
+        )
+
+    def medicine_create(self, index):
+        """Create a medicine with two existing symptoms"""
+        user = self.user(index)
+        return self.request(
+            "POST", "medicine/medicines/", headers=user.headers,
+            json={
+                "name": f"Load test {self.run_id}-{index}",
+                "ref_text": "AFI Part-I",
+                "dispensing_size": "200 ml",
+                "dosage": "12 - 24 ml in divided doses",
+                "precautions": "Not to be used during pregnancy",
+                "preferred_use": "Both",
+                "symptoms": [
+                    {"name": name} for name in user.symptoms(index)
+                ],
+            },
+        )
+
+    def medicine_update(self, index):
+        """Change a medicine's dosage"""
+        user = self.user(index)
+        medicine_id = user.medicine_ids[index % len(user.medicine_ids)]
+        return self.request(
+            "PATCH", f"medicine/medicines/{medicine_id}/",
+            headers=user.headers,
+            json={"dosage": f"{index % 24 + 1} ml in divided doses"},
+        )
+
+    def symptom_list(self, index):
+        """List a user's symptoms"""
+        return self.request(
+            "GET", "medicine/symptoms/", headers=self.user(index).headers,
+        )
+
+    def symptom_list_assigned_only(self, index):
+        """List the symptoms used by a medicine"""
+        return self.request(
+            "GET", "medicine/symptoms/", headers=self.user(index).headers,
+            params={"assigned_only": 1},
+        )
+
+    def scenarios(self):
+        """Return the scenarios as (name, request function, expected
+        status)"""
+        scenarios = [
+            ("token login", self.token_login, 200),
+            ("medicine list", self.medicine_list, 200),
+            ("medicine list, any symptom",
+             self.medicine_list_any_symptom, 200),
+            ("medicine list, all symptoms",
+             self.medicine_list_all_symptoms, 200),
+            ("medicine detail", self.medicine_detail, 200),
+            ("medicine create", self.medicine_create, 201),
+            ("medicine update", self.medicine_update, 200),
+            ("symptom list", self.symptom_list, 200),
+            ("symptom list, assigned only",
+             self.symptom_list_assigned_only, 200),
+        ]
+        if self.args.scenarios:
+            scenarios = [
+                scenario for scenario in scenarios
+                if scenario[0] in self.args.scenarios
+            ]
+
+        return scenarios
+
+    def run(self, send, expected):
+        """Send the scenario's requests at the concurrency, return stats"""
+        count = self.args.requests
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as executor:
+            start = time.perf_counter()
+            results = list(executor.map(send, range(count)))
+            elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency for _, latency in results)
+        stats = {
+            "requests": count,
+            "errors": sum(1 for status, _ in results if status != expected),
+            "seconds": round(elapsed, 3),
+            "rps": round(count / elapsed, 1),
+            "latency_ms": {
+                "mean": round(sum(latencies) / count * 1000, 2),
+                **{
+                    name: round(percentile(latencies, fraction) * 1000, 2)
+                    for name, fraction in PERCENTILES.items()
+                },
+                "max": round(latencies[-1] * 1000, 2),
+            },
+        }
+
+        return stats
+
+
+def print_row(name, stats, baseline=None):
+    """Print the stats of a scenario, and their change from ``baseline``"""
+    latency = stats["latency_ms"]
+    row = (
+        f"{name:<30}{stats['rps']:>9.1f}{latency['p50']:>9.1f}"
+        f"{latency['p95']:>9.1f}{latency['p99']:>9.1f}{stats['errors']:>8}"
+    )
+    if baseline:
+        rps = stats["rps"] / baseline["rps"] - 1
+        p95 = latency["p95"] / baseline["latency_ms"]["p95"] - 1
+        row += f"{rps:>+10.0%}{p95:>+10.0%}"
+    print(row)
+
+
+def main(argv=None):
+    """Run the scenarios, print their stats and write the report"""
+    args = parse_args(argv)
+    if args.requests < 1 or args.users < 1:
+        raise SystemExit("--requests and --users must be at least 1")
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["scenarios"]
+
+    test = LoadTest(args)
+    test.log_in()
+    report = {
+        "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "config": {
+            "url": args.url,
+            "users": args.users,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "scenarios": {},
+    }
+    print(
+        f"{args.requests} requests per scenario at concurrency "
+        f"{args.concurrency} over {args.users} users"
+    )
+    header = (
+        f"{'scenario':<30}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+        f"{'p99 ms':>9}{'errors':>8}"
+    )
+    if baseline:
+        header += f"{'req/s +/-':>10}{'p95 +/-':>10}"
+    print(header)
+
+    for name, send, expected in test.scenarios():
+        # Warm up connections and caches
+        send(0)
+        stats = test.run(send, expected)
+        report["scenarios"][name] = stats
+        print_row(name, stats, baseline.get(name))
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+    failed = any(stats["errors"] for stats in report["scenarios"].values())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
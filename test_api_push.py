@@ -0,0 +1,81 @@
+"""
+Test reading final_data.xlsx in api_push.py
+
+Run from the repository root with ``python -m unittest test_api_push``.
+"""
+
+import os
+import tempfile
+import unittest
+
+from openpyxl import Workbook
+
+from api_push import read_medicines
+
+HEADER = (
+    "Name of Medicine", "Reference text", "Dispensing Pack Size", "Dose",
+    "Precaution/ Contraindication", "Preferred use (OPD/ IPD)",
+    " Normal Understandable Term",
+)
+ROWS = [
+    ("Medicine 1", "AFI", "200 ml", "12 - 24 ml", None, "Both", "Fever"),
+    ("Medicine 1", "AFI", "200 ml", "12 - 24 ml", None, "Both", "Cough"),
+    ("Medicine 2", "AFI", "100 ml", "5 ml", "NS", "Adult", None),
+]
+
+
+class ReadMedicinesTests(unittest.TestCase):
+    """Test grouping the sheet rows into medicines"""
+
+    def write_sheet(self, rows):
+        """Save the rows to a temporary workbook and return its path"""
+        workbook = Workbook()
+        for row in rows:
+            workbook.active.append(row)
+        tmp = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+        tmp.close()
+        workbook.save(tmp.name)
+        self.addCleanup(os.remove, tmp.name)
+
+        return tmp.name
+
+    def test_header_skipped(self):
+        """Test the header row of final_data.xlsx is not pushed"""
+        medicines = read_medicines(self.write_sheet([HEADER] + ROWS))
+
+        self.assertEqual(
+            medicines,
+            [
+                {
+                    "name": "Medicine 1",
+                    "ref_text": "AFI",
+                    "dispensing_size": "200 ml",
+                    "dosage": "12 - 24 ml",
+                    "precautions": None,
+                    "preferred_use": "Both",
+                    "symptoms": [{"name": "Fever"}, {"name": "Cough"}],
+                },
+                {
+                    "name": "Medicine 2",
+                    "ref_text": "AFI",
+                    "dispensing_size": "100 ml",
+                    "dosage": "5 ml",
+                    "precautions": "NS",
+                    "preferred_use": "Adult",
+                    "symptoms": [],
+                },
+            ],
+        )
+
+    def test_without_header(self):
+        """Test a sheet without a header, like the catalog export, is read
+        from its first row"""
+        with_header = read_medicines(self.write_sheet([HEADER] + ROWS))
+
+        medicines = read_medicines(self.write_sheet(ROWS))
+
+        self.assertEqual(medicines, with_header)
+
+
+if __name__ == "__main__":
+    unittest.main()